@@ -1,17 +1,22 @@
 # agent.py
-import re
+import argparse
 import time
 import logging
-import requests
-import json
 import os
-import websocket
+
+from blocklist_mirror import BlocklistMirror
+from matcher import ThreatMatcher
+from tailer import LogTailer
+from transport import FirewallClient, ThreatBroadcaster
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 LOG_FILE = os.path.abspath(os.path.join(os.path.dirname(__file__), "attacker_logs.log"))
 WEBSOCKET_URL = "ws://localhost:8765"
 FLASK_BLOCK_URL = "http://localhost:5000/block_ip"
+FLASK_BLOCKED_URL = "http://localhost:5000/blocked_ips"
+BLOCKLIST_SYNC_INTERVAL = 10.0  # seconds between pulls of the server's blocklist changes
+REJECTED_CACHE_SIZE = 10000  # IPs the server refused to block, remembered so they aren't resent
 
 # Patterns to detect
 SUSPICIOUS_PATTERNS = [
@@ -22,10 +27,62 @@ SUSPICIOUS_PATTERNS = [
     (r"Port scan detected from IP:\s+(\d+\.\d+\.\d+\.\d+)", "Port Scan", "medium")
 ]
 
+def sync_blocklist(firewall, mirror, since):
+    """Apply the server's blocklist changes after ``since`` to ``mirror``; returns the new cursor.
+
+    The agent mirrors the dashboard's list so CIDR ranges, expiries and blocks
+    made by anyone else are honoured here too.
+    """
+    try:
+        more = True
+        while more:
+            page = firewall.changes(since)
+            mirror.apply(page)
+            since, more = page["seq"], page["more"]
+    except Exception as e:
+        logging.error("Failed to sync blocklist from Firewall API: %s", e)
+    return since
+
+
+def record_block(response, ips, mirror, rejected_ips):
+    """Cache a /block_ip response for ``ips``; returns the IPs it blocked, or None if it failed.
+
+    Blocked IPs go into ``mirror``. IPs the server refused (loopback, malformed
+    addresses) go into ``rejected_ips`` ({ip: reason}) whatever the status, so
+    one bad address neither sinks its batch nor gets resent with every batch.
+    """
+    try:
+        body = response.json()
+    except ValueError:
+        body = {}
+    rejected = body.get("rejected") or {}
+    for ip, reason in rejected.items():
+        logging.error("Firewall refused to block IP %s: %s", ip, reason)
+        rejected_ips[ip] = reason
+    while len(rejected_ips) > REJECTED_CACHE_SIZE:
+        del rejected_ips[next(iter(rejected_ips))]
+    if response.status_code != 200 or not body.get("blocked", True):
+        return None
+    blocked = [ip for ip in ips if ip not in rejected]
+    mirror.update(blocked)
+    return blocked
+
+
 class CybersecurityAgent:
     def __init__(self):
         self.processed_lines = 0
-        self.blocked_ips = set()
+        self.blocked_ips = BlocklistMirror()  # in-memory mirror of the server's list
+        self.rejected_ips = {}  # ip -> why the server refused it; see record_block()
+        self.blocklist_seq = 0
+        self._last_sync = None
+        self.matcher = ThreatMatcher.from_config(SUSPICIOUS_PATTERNS)
+        # Persistent connections: one keep-alive HTTP session and one WebSocket
+        self.firewall = FirewallClient(FLASK_BLOCK_URL, blocked_url=FLASK_BLOCKED_URL)
+        self.broadcaster = ThreatBroadcaster(WEBSOCKET_URL)
+
+    def sync_blocklist(self):
+        self.blocklist_seq = sync_blocklist(self.firewall, self.blocked_ips, self.blocklist_seq)
+        self._last_sync = time.monotonic()
         
     def start(self):
         logging.info("Cybersecurity Agent started. Monitoring log: %s", LOG_FILE)
@@ -36,47 +93,78 @@ class CybersecurityAgent:
             with open(LOG_FILE, "w") as f:
                 f.write("")
 
-        # Read from end of file
-        with open(LOG_FILE, "r") as file:
-            file.seek(0, 2)  # Go to end
-            while True:
-                line = file.readline()
-                if not line:
-                    file.seek(file.tell())  # Clear EOF flag on Windows
-                    time.sleep(0.5)
-                    continue
-                
-                self.analyze_line(line.strip())
+        # Follow from end of file; wakes on inotify where available and survives rotation
+        tailer = LogTailer(LOG_FILE)
+        logging.info("Log tailer running in %s mode", tailer.mode)
+        try:
+            for batch in tailer.batches():
+                self.analyze_batch(batch)
+        finally:
+            tailer.close()
+
+    def analyze_batch(self, lines):
+        threats = []
+        for line in lines:
+            threat = self.matcher.match(line.strip())
+            if threat:
+                threats.append(threat)
+        self.processed_lines += len(lines)
+        if not threats:
+            return
+        if self._last_sync is None or time.monotonic() - self._last_sync >= BLOCKLIST_SYNC_INTERVAL:
+            self.sync_blocklist()
+
+        for attack_type, ip, severity in threats:
+            logging.warning("DETECTED threat: %s from IP: %s (Severity: %s)", attack_type, ip, severity)
+        # One firewall call for every new IP in the batch; broadcasts coalesce into one frame
+        self.block_ips([ip for _, ip, _ in threats])
+        for attack_type, ip, severity in threats:
+            self.broadcast_threat(attack_type, ip, severity)
 
     def analyze_line(self, line):
-        logging.info("Analyzing: %s", line)
-        for pattern, attack_type, severity in SUSPICIOUS_PATTERNS:
-            match = re.search(pattern, line)
-            if match:
-                ip = match.group(1)
-                logging.warning("DETECTED threat: %s from IP: %s (Severity: %s)", attack_type, ip, severity)
-                
-                # Apply firewall rules via Flask Block Endpoint
-                self.block_ip(ip)
-                
-                # Broadcast real event data to WebSocket clients
-                self.broadcast_threat(attack_type, ip, severity)
-                break
+        logging.debug("Analyzing: %s", line)
+        threat = self.matcher.match(line)
+        if threat:
+            attack_type, ip, severity = threat
+            logging.warning("DETECTED threat: %s from IP: %s (Severity: %s)", attack_type, ip, severity)
+            
+            # Apply firewall rules via Flask Block Endpoint
+            self.block_ip(ip)
+            
+            # Broadcast real event data to WebSocket clients
+            self.broadcast_threat(attack_type, ip, severity)
 
     def block_ip(self, ip):
-        if ip in self.blocked_ips:
+        if ip in self.blocked_ips or ip in self.rejected_ips:
             return
         
         try:
-            response = requests.post(FLASK_BLOCK_URL, json={"ip": ip}, timeout=2.0)
-            if response.status_code == 200:
+            response = self.firewall.block(ip)
+            # 200 with "blocked": false means the dashboard's shield is off; don't cache it
+            if record_block(response, [ip], self.blocked_ips, self.rejected_ips):
                 logging.info("Agent firewall rule: IP %s blocked successfully", ip)
-                self.blocked_ips.add(ip)
-            else:
+            elif ip not in self.rejected_ips:
                 logging.error("Failed to block IP %s on firewall: %s", ip, response.text)
         except Exception as e:
             logging.error("Failed to connect to Firewall API: %s", e)
 
+    def block_ips(self, ips):
+        new_ips = [ip for ip in dict.fromkeys(ips) if ip not in self.blocked_ips and ip not in self.rejected_ips]
+        if len(new_ips) <= 1:
+            for ip in new_ips:
+                self.block_ip(ip)
+            return
+
+        try:
+            response = self.firewall.block(new_ips)
+            blocked = record_block(response, new_ips, self.blocked_ips, self.rejected_ips)
+            if blocked is not None:
+                logging.info("Agent firewall rule: %d IPs blocked successfully", len(blocked))
+            elif not all(ip in self.rejected_ips for ip in new_ips):
+                logging.error("Failed to block %d IPs on firewall: %s", len(new_ips), response.text)
+        except Exception as e:
+            logging.error("Failed to connect to Firewall API: %s", e)
+
     def broadcast_threat(self, attack_type, ip, severity):
         payload = {
             "type": attack_type,
@@ -86,16 +174,23 @@ class CybersecurityAgent:
             "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
         }
         
-        try:
-            ws = websocket.create_connection(WEBSOCKET_URL, timeout=2.0)
-            ws.send(json.dumps(payload))
-            ws.close()
-            logging.info("Threat broadcast completed over WebSockets.")
-        except Exception as e:
-            logging.error("Agent failed to transmit packet to WebSocket server: %s", e)
+        # Queued for the long-lived WebSocket connection; never blocks detection
+        self.broadcaster.publish(payload)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cybersecurity log monitoring agent")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="run the asyncio pipeline (concurrent tail/detect/block/broadcast)")
+    parser.add_argument("--block-concurrency", type=int, default=4,
+                        help="parallel firewall calls in --async mode (ordering is kept per IP)")
+    args = parser.parse_args()
+
     # Wait for servers to wake up
     time.sleep(2)
-    agent = CybersecurityAgent()
-    agent.start()
\ No newline at end of file
+    if args.use_async:
+        import asyncio
+        from async_agent import AsyncCybersecurityAgent
+        asyncio.run(AsyncCybersecurityAgent(block_concurrency=args.block_concurrency).run())
+    else:
+        agent = CybersecurityAgent()
+        agent.start()
\ No newline at end of file
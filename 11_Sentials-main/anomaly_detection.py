@@ -1,51 +1,321 @@
 import logging
+import queue
+import threading
+import time
 import numpy as np
 import re
-from typing import List, Optional
-from sklearn.ensemble import IsolationForest
-import pickle  # Import pickle
+from typing import Callable, Iterable, List, NamedTuple, Optional
+
+from features import FeaturePipeline
+from model_store import ForestScorer, export_isolation_forest, is_model_dir
+
+IP_RE = re.compile(r"(\d+\.\d+\.\d+\.\d+)")
+
+
+class AnomalyResult(NamedTuple):
+    line: str
+    features: Optional[List[int]]
+    is_anomaly: bool
+    score: float
+
+
+class FeatureRingBuffer:
+    """Fixed-capacity FIFO of feature rows backed by a single NumPy array.
+
+    Appends are O(1) and overwrite the oldest row once full, so memory is
+    bounded by ``capacity`` regardless of how long the agent runs.
+    """
+
+    def __init__(self, capacity: int, n_features: int = 2):
+        self._rows = np.zeros((capacity, n_features), dtype=np.float64)
+        self._next = 0
+        self._size = 0
+        self._lock = threading.Lock()
+        self.total = 0
+
+    @property
+    def capacity(self) -> int:
+        return self._rows.shape[0]
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, row) -> None:
+        with self._lock:
+            self._rows[self._next] = row
+            self._next = (self._next + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+            self.total += 1
+
+    def extend(self, rows) -> None:
+        rows = np.asarray(rows, dtype=np.float64)
+        if len(rows) == 0:
+            return
+        with self._lock:
+            self.total += len(rows)
+            if len(rows) >= self.capacity:
+                self._rows[:] = rows[-self.capacity:]
+                self._next, self._size = 0, self.capacity
+                return
+            first = min(len(rows), self.capacity - self._next)
+            self._rows[self._next:self._next + first] = rows[:first]
+            self._rows[:len(rows) - first] = rows[first:]
+            self._next = (self._next + len(rows)) % self.capacity
+            self._size = min(self._size + len(rows), self.capacity)
+
+    def snapshot(self) -> np.ndarray:
+        """Copy of the buffered rows, oldest first."""
+        with self._lock:
+            if self._size < self.capacity:
+                return self._rows[:self._size].copy()
+            return np.concatenate((self._rows[self._next:], self._rows[:self._next]))
+
 
 class AnomalyDetection:
-    def __init__(self):
-        self.model = IsolationForest(n_estimators=100, contamination=0.1)
-        self.data: List[List[int]] = []
+    def __init__(self, window_size: int = 10000, feature_pipeline: Optional[FeaturePipeline] = None,
+                 n_estimators: int = 100, contamination: float = 0.1):
+        # Fitted by train_model() or loaded by load_model(); scoring a loaded
+        # model needs only NumPy, so sklearn is imported on the training path alone
+        self.model = None
+        self.n_estimators = n_estimators
+        self.contamination = contamination
+        # Optional rolling per-IP/subnet features; default is [ip_last_octet, hour_of_day]
+        self.feature_pipeline = feature_pipeline
+        self.n_features = feature_pipeline.n_features if feature_pipeline is not None else 2
+        # Sliding training window; the oldest features fall out once it is full
+        self.data = FeatureRingBuffer(window_size, self.n_features)
+        self.learn_online = False
+        self._scored_since_fit = 0
+        self._anomalies_since_fit = 0
+        self._retrain_stop: Optional[threading.Event] = None
+        self._retrain_thread: Optional[threading.Thread] = None
 
     def train_model(self, data: List[List[int]]) -> None:
-        self.model.fit(data)
+        # Fit a fresh estimator and swap it in, so concurrent scoring keeps
+        # using the old model until the new one is complete
+        from sklearn.base import clone
+        from sklearn.ensemble import IsolationForest
+
+        if self.model is None or isinstance(self.model, ForestScorer):
+            # Loaded artifacts are inference-only; retrain from equivalent settings
+            model = IsolationForest(n_estimators=self.n_estimators, contamination=self.contamination)
+        else:
+            model = clone(self.model)
+        model.fit(data)
+        self.model = model
+        self._scored_since_fit = 0
+        self._anomalies_since_fit = 0
         logging.info("Anomaly detection model trained with %d data points.", len(data))
 
+    def _fitted_model(self):
+        model = self.model
+        if model is None:
+            raise ValueError("Anomaly detection model is not trained; call train_model() or load_model() first")
+        return model
+
     def detect_anomaly(self, features: List[int]) -> bool:
-        is_anomaly = self.model.predict([features])[0] == -1
-        logging.info("Anomaly detection result for features %s: %s", features, is_anomaly)
+        is_anomaly = self._fitted_model().predict([features])[0] == -1
+        logging.debug("Anomaly detection result for features %s: %s", features, is_anomaly)
         return is_anomaly
 
     def extract_features(self, log_entry: str) -> Optional[List[int]]:
-        ip_match = re.search(r"(\d+\.\d+\.\d+\.\d+)", log_entry)
+        if self.feature_pipeline is not None:
+            return self.feature_pipeline.extract(log_entry)
+        ip_match = IP_RE.search(log_entry)
         if ip_match:
             ip = ip_match.group(1)
             try:
                 hour_of_day = int(log_entry.split()[1].split(":")[0])
-                ip_last_octet = int(ip.split(".")[-1])
+                ip_last_octet = int(ip.rsplit(".", 1)[-1])
                 features = [ip_last_octet, hour_of_day]
-                logging.info("Extracted features from log entry: %s", features)
+                logging.debug("Extracted features from log entry: %s", features)
                 return features
             except (IndexError, ValueError):
                 logging.error("Error extracting features from log entry: %s", log_entry)
         return None
 
+    def extract_features_batch(self, log_entries: Iterable[str]):
+        """Extract features for many lines in one pass.
+
+        Returns ``(X, rows)``: an ``(n, n_features)`` array for the lines that
+        yielded features and, for each of those rows, its index in the input.
+        """
+        entries = log_entries if isinstance(log_entries, list) else list(log_entries)
+        rows = np.empty(len(entries), dtype=np.int64)
+        n = 0
+        if self.feature_pipeline is not None:
+            X = np.empty((len(entries), self.n_features), dtype=np.float64)
+            for i, log_entry in enumerate(entries):
+                features = self.feature_pipeline.extract(log_entry)
+                if features is not None:
+                    X[n] = features
+                    rows[n] = i
+                    n += 1
+            return X[:n], rows[:n]
+
+        X = np.empty((len(entries), 2), dtype=np.int64)
+        for i, log_entry in enumerate(entries):
+            ip_match = IP_RE.search(log_entry)
+            if not ip_match:
+                continue
+            try:
+                X[n, 1] = int(log_entry.split(None, 2)[1].split(":", 1)[0])
+                X[n, 0] = int(ip_match.group(1).rsplit(".", 1)[-1])
+            except (IndexError, ValueError):
+                continue
+            rows[n] = i
+            n += 1
+        return X[:n], rows[:n]
+
+    def detect_anomalies(self, log_entries: Iterable[str]) -> List[Optional[AnomalyResult]]:
+        """Score a batch of log lines with a single forest evaluation.
+
+        Returns one entry per input line; lines without extractable features
+        map to None.
+        """
+        entries = log_entries if isinstance(log_entries, list) else list(log_entries)
+        results: List[Optional[AnomalyResult]] = [None] * len(entries)
+        X, rows = self.extract_features_batch(entries)
+        if len(X) == 0:
+            return results
+        # score_samples once; predict() would walk the forest a second time.
+        # Read the model once so a concurrent retrain can't swap it mid-batch.
+        model = self._fitted_model()
+        scores = model.score_samples(X)
+        anomalies = scores < model.offset_
+        self._scored_since_fit += len(X)
+        self._anomalies_since_fit += int(anomalies.sum())
+        if self.learn_online:
+            self.data.extend(X)
+        for row, features, score, is_anomaly in zip(rows.tolist(), X.tolist(), scores.tolist(), anomalies.tolist()):
+            results[row] = AnomalyResult(entries[row], features, is_anomaly, score)
+        logging.debug("Scored %d/%d log lines, %d anomalies", len(X), len(entries), int(anomalies.sum()))
+        return results
+
     def update_features(self, features: List[int]) -> None:
         if features:
             self.data.append(features)
-            logging.info("Updated features list with: %s", features)
+            logging.debug("Updated features window with: %s", features)
+
+    def start_incremental(self, interval: float = 300.0, min_samples: int = 256,
+                          drift_factor: float = 2.0, check_every: float = 5.0) -> None:
+        """Retrain from the sliding window in a background thread.
+
+        A retrain happens every ``interval`` seconds, or sooner when the
+        observed anomaly rate since the last fit drifts more than
+        ``drift_factor`` times away from the model's contamination. Scored
+        batches are added to the window while this mode is on.
+        """
+        if self._retrain_thread is not None:
+            return
+        self.learn_online = True
+        self._retrain_stop = threading.Event()
+        self._retrain_thread = threading.Thread(
+            target=self._retrain_loop, args=(interval, min_samples, drift_factor, check_every),
+            name="anomaly-retrainer", daemon=True)
+        self._retrain_thread.start()
+
+    def stop_incremental(self) -> None:
+        if self._retrain_thread is None:
+            return
+        self._retrain_stop.set()
+        self._retrain_thread.join()
+        self._retrain_thread = None
+        self.learn_online = False
+
+    def has_drifted(self, min_samples: int = 256, drift_factor: float = 2.0) -> bool:
+        if self._scored_since_fit < min_samples:
+            return False
+        contamination = self.model.contamination
+        expected = contamination if isinstance(contamination, float) else 0.1
+        observed = self._anomalies_since_fit / self._scored_since_fit
+        return observed > expected * drift_factor or observed < expected / drift_factor
+
+    def _retrain_loop(self, interval: float, min_samples: int, drift_factor: float, check_every: float) -> None:
+        last_fit = time.monotonic()
+        while not self._retrain_stop.wait(check_every):
+            if len(self.data) < min_samples:
+                continue
+            due = time.monotonic() - last_fit >= interval
+            drifted = self.has_drifted(min_samples, drift_factor)
+            if not (due or drifted):
+                continue
+            try:
+                self.train_model(self.data.snapshot())
+                last_fit = time.monotonic()
+                if drifted:
+                    logging.info("Anomaly model retrained after drift in anomaly rate")
+            except Exception as e:
+                logging.error("Background anomaly retrain failed: %s", e)
 
     def save_model(self, filename: str) -> None:
-        """Save the anomaly detection model to a file."""
-        with open(filename, "wb") as file:
-            pickle.dump(self.model, file)
+        """Save the anomaly detection model as a memory-mappable model directory."""
+        model = self._fitted_model()
+        if isinstance(model, ForestScorer):
+            raise ValueError("A loaded model artifact is read-only; retrain before saving")
+        export_isolation_forest(model, filename)
         logging.info("Anomaly detection model saved to %s", filename)
 
     def load_model(self, filename: str) -> None:
-        """Load the anomaly detection model from a file."""
-        with open(filename, "rb") as file:
-            self.model = pickle.load(file)
-        logging.info("Anomaly detection model loaded from %s", filename)
\ No newline at end of file
+        """Load the anomaly detection model from a model directory written by save_model()."""
+        if not is_model_dir(filename):
+            # Pickles are not loaded: unpickling runs arbitrary code. Convert a trusted
+            # legacy .pkl by unpickling it once and passing the estimator to save_model().
+            raise ValueError(f"{filename} is not a model directory")
+        model = ForestScorer.load(filename)
+        self.model = model
+        self.n_estimators = model.manifest["n_estimators"]
+        self.contamination = model.contamination
+        logging.info("Anomaly detection model loaded from %s", filename)
+
+class MicroBatcher:
+    """Streams log lines into batched ``detect_anomalies`` calls.
+
+    Lines are scored once ``max_batch`` of them are waiting or the oldest has
+    waited ``max_latency`` seconds, whichever comes first. Results are passed
+    to ``on_results`` from the batcher's thread, in submission order.
+    """
+
+    _STOP = object()
+
+    def __init__(self, detector: AnomalyDetection, on_results: Callable[[List[Optional[AnomalyResult]]], None],
+                 max_batch: int = 1024, max_latency: float = 0.05, max_queue: int = 100000):
+        self.detector = detector
+        self.on_results = on_results
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="anomaly-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, log_entry: str, timeout: Optional[float] = None) -> None:
+        """Queue a line for scoring; blocks while the queue is full."""
+        self._queue.put(log_entry, timeout=timeout)
+
+    def close(self) -> None:
+        """Score whatever is still queued, then stop the worker."""
+        self._queue.put(self._STOP)
+        self._thread.join()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is self._STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.max_latency
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is self._STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                self.on_results(self.detector.detect_anomalies(batch))
+            except Exception as e:
+                logging.error("Anomaly micro-batch of %d lines failed: %s", len(batch), e)
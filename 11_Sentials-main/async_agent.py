@@ -0,0 +1,198 @@
+# async_agent.py
+import asyncio
+import json
+import logging
+import random
+import time
+
+import websockets
+
+from agent import (
+    SUSPICIOUS_PATTERNS, LOG_FILE, WEBSOCKET_URL, FLASK_BLOCK_URL, FLASK_BLOCKED_URL,
+    BLOCKLIST_SYNC_INTERVAL, record_block, sync_blocklist
+)
+from blocklist_mirror import BlocklistMirror
+from matcher import ThreatMatcher
+from tailer import LogTailer
+from transport import FirewallClient
+
+
+class StageStats:
+    """Throughput and queue-to-done latency for one pipeline stage."""
+
+    __slots__ = ("queues", "processed", "total_latency", "max_latency")
+
+    def __init__(self, *queues):
+        self.queues = queues
+        self.processed = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def record(self, enqueued_at, count=1):
+        latency = time.monotonic() - enqueued_at
+        self.processed += count
+        self.total_latency += latency * count
+        if latency > self.max_latency:
+            self.max_latency = latency
+
+    def as_dict(self):
+        return {
+            "queue_depth": sum(queue.qsize() for queue in self.queues),
+            "processed": self.processed,
+            "avg_latency_ms": round(self.total_latency / self.processed * 1000, 3) if self.processed else 0.0,
+            "max_latency_ms": round(self.max_latency * 1000, 3)
+        }
+
+
+class AsyncCybersecurityAgent:
+    """CybersecurityAgent as an asyncio pipeline.
+
+    tail -> classify -> block (N shards) -> broadcast, joined by bounded
+    queues. Threats are sharded by IP, so events for one IP are blocked and
+    broadcast in the order they were detected while different IPs proceed
+    concurrently. A slow firewall response only stalls its own shard.
+    """
+
+    def __init__(self, log_file=LOG_FILE, block_concurrency=4, queue_size=1000,
+                 max_frame_batch=100, stats_interval=30.0):
+        self.log_file = log_file
+        self.block_concurrency = block_concurrency
+        self.queue_size = queue_size
+        self.max_frame_batch = max_frame_batch
+        self.stats_interval = stats_interval
+        self.blocked_ips = BlocklistMirror()  # in-memory mirror of the server's list
+        self.rejected_ips = {}  # ip -> why the server refused it; see record_block()
+        self.blocklist_seq = 0
+        self.processed_lines = 0
+        self.matcher = ThreatMatcher.from_config(SUSPICIOUS_PATTERNS)
+        self.firewall = FirewallClient(FLASK_BLOCK_URL, pool_size=block_concurrency, blocked_url=FLASK_BLOCKED_URL)
+        self._stats = {}
+
+    def stats(self):
+        return {stage: stats.as_dict() for stage, stats in self._stats.items()}
+
+    async def run(self):
+        self._lines = asyncio.Queue(self.queue_size)
+        self._shards = [asyncio.Queue(self.queue_size) for _ in range(self.block_concurrency)]
+        self._outbound = asyncio.Queue(self.queue_size)
+        self._stats = {
+            "tail": StageStats(),
+            "classify": StageStats(self._lines),
+            "block": StageStats(*self._shards),
+            "broadcast": StageStats(self._outbound),
+        }
+        self.tailer = LogTailer(self.log_file)
+        logging.info("Async agent started (%s tailer, %d block shards). Monitoring log: %s",
+                     self.tailer.mode, self.block_concurrency, self.log_file)
+
+        tasks = [
+            asyncio.create_task(self._tail()),
+            asyncio.create_task(self._classify()),
+            asyncio.create_task(self._broadcast()),
+            asyncio.create_task(self._report()),
+            asyncio.create_task(self._sync_blocklist()),
+        ]
+        tasks.extend(asyncio.create_task(self._block_worker(shard)) for shard in self._shards)
+        self._read = None
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            await self._shutdown(tasks)
+
+    async def _shutdown(self, tasks):
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # Cancelling _tail doesn't stop its read thread; let it return before closing the file
+        if self._read is not None:
+            await asyncio.gather(self._read, return_exceptions=True)
+        self.tailer.close()
+        self.firewall.close()
+
+    async def _tail(self):
+        stats = self._stats["tail"]
+        while True:
+            # Shielded so shutdown can wait for the thread, which cancellation can't stop
+            self._read = asyncio.ensure_future(asyncio.to_thread(self.tailer.read_timed, 0.5))
+            lines, wake_latency_ms = await asyncio.shield(self._read)
+            if lines:
+                # Tail latency is wake-up to delivery, not time spent idle waiting for lines
+                woke_at = time.monotonic() - wake_latency_ms / 1000
+                await self._lines.put((time.monotonic(), lines))
+                stats.record(woke_at, len(lines))
+
+    async def _classify(self):
+        stats = self._stats["classify"]
+        while True:
+            enqueued_at, lines = await self._lines.get()
+            for line in lines:
+                threat = self.matcher.match(line.strip())
+                if threat:
+                    attack_type, ip, severity = threat
+                    logging.warning("DETECTED threat: %s from IP: %s (Severity: %s)", attack_type, ip, severity)
+                    shard = self._shards[hash(ip) % len(self._shards)]
+                    await shard.put((time.monotonic(), threat))
+            self.processed_lines += len(lines)
+            stats.record(enqueued_at, len(lines))
+
+    async def _block_worker(self, shard):
+        stats = self._stats["block"]
+        while True:
+            enqueued_at, (attack_type, ip, severity) = await shard.get()
+            if ip not in self.blocked_ips and ip not in self.rejected_ips:
+                await asyncio.to_thread(self._block, ip)
+            await self._outbound.put((time.monotonic(), {
+                "type": attack_type,
+                "ip": ip,
+                "severity": severity,
+                "details": "Intrusion attempt blocked by firewall block rules.",
+                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
+            }))
+            stats.record(enqueued_at)
+
+    def _block(self, ip):
+        try:
+            response = self.firewall.block(ip)
+            if record_block(response, [ip], self.blocked_ips, self.rejected_ips):
+                logging.info("Agent firewall rule: IP %s blocked successfully", ip)
+            elif ip not in self.rejected_ips:
+                logging.error("Failed to block IP %s on firewall: %s", ip, response.text)
+        except Exception as e:
+            logging.error("Failed to connect to Firewall API: %s", e)
+
+    async def _broadcast(self):
+        stats = self._stats["broadcast"]
+        ws = None
+        delay = 0.5
+        while True:
+            batch = [await self._outbound.get()]
+            while len(batch) < self.max_frame_batch and not self._outbound.empty():
+                batch.append(self._outbound.get_nowait())
+            payloads = [payload for _, payload in batch]
+            frame = json.dumps(payloads[0] if len(payloads) == 1 else payloads)
+
+            while True:
+                try:
+                    if ws is None:
+                        ws = await websockets.connect(WEBSOCKET_URL, open_timeout=2.0)
+                        delay = 0.5
+                    await ws.send(frame)
+                    break
+                except Exception as e:
+                    logging.error("Agent failed to transmit packet to WebSocket server: %s (retrying in %.1fs)", e, delay)
+                    ws = None
+                    await asyncio.sleep(delay * random.uniform(0.8, 1.2))
+                    delay = min(delay * 2, 30.0)
+            for enqueued_at, _ in batch:
+                stats.record(enqueued_at)
+
+    async def _sync_blocklist(self):
+        while True:
+            self.blocklist_seq = await asyncio.to_thread(
+                sync_blocklist, self.firewall, self.blocked_ips, self.blocklist_seq)
+            await asyncio.sleep(BLOCKLIST_SYNC_INTERVAL)
+
+    async def _report(self):
+        while True:
+            await asyncio.sleep(self.stats_interval)
+            logging.info("Pipeline stats: %s", json.dumps(self.stats()))
@@ -13,7 +13,7 @@ if not os.path.exists(LOG_FILE):
         log_file.write("")
     logging.info("Created attacker_logs.log")
 
-ATTACKER_IPS = ["192.168.1.101", "10.0.0.5", "203.0.113.45"]
+ATTACKER_IPS = ["192.0.2.101", "198.51.100.5", "203.0.113.45"]  # documentation ranges (RFC 5737)
 MALICIOUS_LOGS = [
     "Brute force attack detected from IP: {}",
     "Failed login attempt from IP: {}",
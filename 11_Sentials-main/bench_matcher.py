@@ -0,0 +1,73 @@
+# bench_matcher.py
+"""Lines/sec of the threat matcher vs the original per-pattern re.search loop.
+
+Usage: python bench_matcher.py [--lines 2000000] [--attack-every 10]
+"""
+import argparse
+import os
+import random
+import re
+import time
+
+from agent import SUSPICIOUS_PATTERNS
+from matcher import ThreatMatcher
+
+MOCK_LOGS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mock_logs.txt")
+ATTACK_LINES = [
+    "Brute force attack detected from IP: {}",
+    "Failed login attempt from IP: {}",
+    "SQL Injection detected from IP: {}",
+    "Unauthorized admin access attempt from IP: {}",
+    "Port scan detected from IP: {}"
+]
+
+
+def build_corpus(total, attack_every):
+    with open(MOCK_LOGS, "r") as f:
+        base = [line.rstrip("\n") for line in f if line.strip()]
+    rng = random.Random(7)
+    lines = []
+    for i in range(total):
+        if attack_every and i % attack_every == 0:
+            ip = f"10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+            lines.append("2025-01-21 04:40:07 - " + rng.choice(ATTACK_LINES).format(ip))
+        else:
+            lines.append(base[i % len(base)])
+    return lines
+
+
+def baseline(line):
+    # The original CybersecurityAgent.analyze_line loop
+    for pattern, attack_type, severity in SUSPICIOUS_PATTERNS:
+        match = re.search(pattern, line)
+        if match:
+            return attack_type, match.group(1), severity
+    return None
+
+
+def run(name, classify, lines):
+    start = time.perf_counter()
+    hits = 0
+    for line in lines:
+        if classify(line):
+            hits += 1
+    elapsed = time.perf_counter() - start
+    print(f"{name:<22} {len(lines) / elapsed:>12,.0f} lines/s  ({hits} threats)")
+    return hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=2000000)
+    parser.add_argument("--attack-every", type=int, default=10, help="inject an attack line every N lines (0 = none)")
+    args = parser.parse_args()
+
+    lines = build_corpus(args.lines, args.attack_every)
+    matcher = ThreatMatcher.from_config(SUSPICIOUS_PATTERNS)
+    expected = run("re.search loop", baseline, lines)
+    found = run("ThreatMatcher", matcher.match, lines)
+    assert expected == found, "matcher disagrees with the baseline classification"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# bench_tailer.py
+"""Detection latency and lines/sec of LogTailer in inotify and polling modes.
+
+Usage: python bench_tailer.py [--lines 500000] [--probes 50]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from tailer import LogTailer
+
+LINE = "2025-01-21 04:40:07 - Port scan detected from IP: 10.0.0.{}\n"
+
+
+def throughput(path, lines, force_polling):
+    tailer = LogTailer(path, force_polling=force_polling, poll_interval=0.05)
+    payload = "".join(LINE.format(i % 250) for i in range(lines))
+
+    def write():
+        with open(path, "a") as f:
+            for start in range(0, len(payload), 1 << 20):
+                f.write(payload[start:start + (1 << 20)])
+                f.flush()
+
+    writer = threading.Thread(target=write)
+    start = time.perf_counter()
+    writer.start()
+    seen = 0
+    while seen < lines:
+        seen += len(tailer.read_batch(timeout=5.0) or [])
+    elapsed = time.perf_counter() - start
+    writer.join()
+    tailer.close()
+    return lines / elapsed
+
+
+def latency(path, probes, force_polling, poll_interval):
+    """Milliseconds from a line hitting the file to the tailer returning it."""
+    tailer = LogTailer(path, force_polling=force_polling, poll_interval=poll_interval)
+    samples = []
+    for i in range(probes):
+        result = {}
+
+        def consume():
+            tailer.read_batch(timeout=5.0)
+            result["at"] = time.perf_counter()
+
+        consumer = threading.Thread(target=consume)
+        consumer.start()
+        time.sleep(0.02 + (i % 7) * 0.011)  # land at varying points in the poll cycle
+        with open(path, "a") as f:
+            written = time.perf_counter()
+            f.write(LINE.format(i))
+        consumer.join()
+        samples.append((result["at"] - written) * 1000)
+    tailer.close()
+    return statistics.median(samples), max(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=500000)
+    parser.add_argument("--probes", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "attacker_logs.log")
+        open(path, "w").close()
+        for name, polling in (("inotify", False), ("polling", True)):
+            rate = throughput(path, args.lines, polling)
+            p50, worst = latency(path, args.probes, polling, poll_interval=0.5)
+            print(f"{name:<8} {rate:>12,.0f} lines/s   latency p50 {p50:7.2f} ms   max {worst:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
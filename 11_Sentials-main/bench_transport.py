@@ -0,0 +1,132 @@
+# bench_transport.py
+"""Per-event connections vs the persistent broadcaster and keep-alive firewall session.
+
+Starts a local WebSocket sink and HTTP sink, then pushes --events threats through
+each path. Usage: python bench_transport.py [--events 2000]
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+import websocket
+import websockets
+
+from transport import FirewallClient, ThreatBroadcaster
+
+WS_PORT = 8795
+HTTP_PORT = 8796
+received = {"payloads": 0}
+
+
+async def _sink(ws, path=None):
+    async for message in ws:
+        data = json.loads(message)
+        received["payloads"] += len(data) if isinstance(data, list) else 1
+
+
+def start_ws_sink():
+    ready = threading.Event()
+
+    def run():
+        async def main():
+            async with websockets.serve(_sink, "127.0.0.1", WS_PORT):
+                ready.set()
+                await asyncio.Future()
+        asyncio.run(main())
+
+    threading.Thread(target=run, daemon=True).start()
+    ready.wait()
+
+
+class _BlockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = b'{"blocked": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_http_sink():
+    server = ThreadingHTTPServer(("127.0.0.1", HTTP_PORT), _BlockHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def payload(i):
+    return {"type": "Port Scan", "ip": f"10.0.0.{i % 250}", "severity": "medium",
+            "details": "bench", "timestamp": "2025-01-21 04:40:07"}
+
+
+def timed(fn, n):
+    start = time.perf_counter()
+    fn(n)
+    return n / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=2000)
+    args = parser.parse_args()
+
+    start_ws_sink()
+    start_http_sink()
+    ws_url = f"ws://127.0.0.1:{WS_PORT}"
+    http_url = f"http://127.0.0.1:{HTTP_PORT}/block_ip"
+
+    def ws_per_event(n):
+        for i in range(n):
+            ws = websocket.create_connection(ws_url, timeout=2.0)
+            ws.send(json.dumps(payload(i)))
+            ws.close()
+
+    broadcaster = ThreatBroadcaster(ws_url)
+
+    def ws_persistent(n):
+        for i in range(n):
+            broadcaster.publish(payload(i))
+        broadcaster.flush(timeout=60)
+
+    def http_per_event(n):
+        for i in range(n):
+            requests.post(http_url, json={"ip": payload(i)["ip"]}, timeout=2.0)
+
+    firewall = FirewallClient(http_url)
+
+    def http_session(n):
+        for i in range(n):
+            firewall.block(payload(i)["ip"])
+
+    def http_batched(n):
+        for start in range(0, n, 100):
+            firewall.block([payload(i)["ip"] for i in range(start, min(n, start + 100))])
+
+    results = [
+        ("websocket connect-per-event", timed(ws_per_event, args.events)),
+        ("websocket persistent+batched", timed(ws_persistent, args.events)),
+        ("http requests.post", timed(http_per_event, args.events)),
+        ("http keep-alive session", timed(http_session, args.events)),
+        ("http session, 100 IPs/request", timed(http_batched, args.events)),
+    ]
+    broadcaster.close()
+    firewall.close()
+
+    for name, rate in results:
+        print(f"{name:<32} {rate:>10,.0f} events/s")
+    print(f"broadcaster sent {broadcaster.sent_payloads} payloads in {broadcaster.sent_frames} frames")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+# bench_websocket.py
+"""Fan-out latency with hundreds of dashboards, a few of which stop reading.
+
+Runs the broadcaster (or the old gather-per-message handler with --legacy) in
+a child process, connects --clients readers plus --slow clients that never
+read, and publishes --messages threats at --rate per second. Reports delivery
+latency seen by the healthy clients. The server's per-connection send buffer
+is capped (--sndbuf, both modes), so a stalled client backs up after a few
+messages rather than after the kernel's multi-megabyte default.
+
+With --filter, readers subscribe (e.g. '{"severity": "critical"}') and the
+server routes only matching threats; severities cycle low..critical.
+
+Usage: python bench_websocket.py [--clients 300] [--slow 5] [--messages 400] [--rate 20]
+                                 [--legacy] [--filter JSON]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import socket
+import statistics
+import time
+
+import psutil
+import websockets
+
+from websocket_server import SEVERITY_RANK, Subscription
+
+PORT = 8797
+
+
+def serve(legacy, policy, sndbuf, ready):
+    import websocket_server
+
+    async def legacy_handler(websocket, path=None):
+        # websocket_server.handle_connection as it was: gather a send to every client per message
+        clients.add(websocket)
+        try:
+            async for message in websocket:
+                targets = [client for client in clients if client != websocket]
+                if targets:
+                    await asyncio.gather(*[client.send(message) for client in targets])
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            clients.remove(websocket)
+
+    async def main():
+        websocket_server.broadcaster = websocket_server.Broadcaster(policy=policy)
+        handler = legacy_handler if legacy else websocket_server.handle_connection
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, sndbuf)  # inherited by accepted sockets
+        listener.bind(("127.0.0.1", PORT))
+        async with websockets.serve(handler, sock=listener, max_size=None):
+            ready.set()
+            await asyncio.Future()
+
+    clients = set()
+    logging.getLogger().setLevel(logging.WARNING)
+    asyncio.run(main())
+
+
+async def reader(latencies, expected, done, subscribe):
+    async with websockets.connect(f"ws://127.0.0.1:{PORT}", max_size=None) as ws:
+        if subscribe:
+            await ws.send(json.dumps(subscribe))
+            await ws.recv()  # acknowledgement
+        done["connected"] += 1
+        seen = 0
+        while seen < expected:
+            try:
+                message = await asyncio.wait_for(ws.recv(), timeout=15.0)
+            except asyncio.TimeoutError:
+                break
+            now = time.time()
+            data = json.loads(message)
+            for item in data if isinstance(data, list) else (data,):
+                done["bytes"] += len(message) // (len(data) if isinstance(data, list) else 1)
+                latencies.append(now - item["sent_at"])
+                seen += 1
+        done["finished"] += 1
+
+
+async def stalled(stop):
+    # Completes the handshake on a raw socket and never reads again (a client
+    # library would keep draining the socket into its own buffers). The small
+    # receive buffer stands in for a slow link.
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    sock.connect(("127.0.0.1", PORT))
+    sock.sendall(b"GET / HTTP/1.1\r\nHost: 127.0.0.1\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                 b"Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\nSec-WebSocket-Version: 13\r\n\r\n")
+    response = b""
+    while b"\r\n\r\n" not in response:
+        response += await asyncio.to_thread(sock.recv, 1)
+    try:
+        await stop.wait()
+    finally:
+        sock.close()
+
+
+async def run(args):
+    latencies = []
+    done = {"connected": 0, "finished": 0, "bytes": 0}
+    stop = asyncio.Event()
+    slow = [asyncio.create_task(stalled(stop)) for _ in range(args.slow)]
+    subscribe = dict(json.loads(args.filter), action="subscribe") if args.filter else None
+    severities = list(SEVERITY_RANK)
+    threats = [{"type": "Port Scan", "ip": "10.0.0.1", "severity": severities[i % len(severities)]}
+               for i in range(args.messages)]
+    expected = sum(Subscription.from_message(subscribe).matches(t) for t in threats) if subscribe else len(threats)
+    readers = [asyncio.create_task(reader(latencies, expected, done, subscribe)) for _ in range(args.clients)]
+    while done["connected"] < args.clients:
+        await asyncio.sleep(0.05)
+    await asyncio.sleep(0.5)
+
+    padding = "x" * args.payload
+    async with websockets.connect(f"ws://127.0.0.1:{PORT}") as publisher:
+        interval = 1.0 / args.rate
+        start = time.perf_counter()
+        for i in range(args.messages):
+            await publisher.send(json.dumps(dict(threats[i], seq=i, sent_at=time.time(), details=padding)))
+            delay = start + (i + 1) * interval - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        await asyncio.gather(*readers)
+    stop.set()
+    await asyncio.gather(*slow, return_exceptions=True)
+    return latencies, expected * args.clients, done["bytes"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=300)
+    parser.add_argument("--slow", type=int, default=5)
+    parser.add_argument("--messages", type=int, default=400)
+    parser.add_argument("--rate", type=float, default=20)
+    parser.add_argument("--payload", type=int, default=1024, help="bytes of padding per message")
+    parser.add_argument("--sndbuf", type=int, default=65536, help="server SO_SNDBUF per connection")
+    parser.add_argument("--policy", default="coalesce")
+    parser.add_argument("--legacy", action="store_true", help="benchmark the old gather-per-message handler")
+    parser.add_argument("--filter", help='subscription for every reader, e.g. \'{"severity": "critical"}\'')
+    args = parser.parse_args()
+    if args.legacy and args.filter:
+        parser.error("the legacy handler has no subscriptions; drop --filter")
+
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(target=serve, args=(args.legacy, args.policy, args.sndbuf, ready), daemon=True)
+    server.start()
+    ready.wait()
+    try:
+        latencies, expected, received = asyncio.run(run(args))
+        server_cpu = sum(psutil.Process(server.pid).cpu_times()[:2])
+    finally:
+        server.terminate()
+
+    latencies.sort()
+    label = "legacy gather" if args.legacy else f"broadcaster ({args.policy}{', ' + args.filter if args.filter else ''})"
+    print(f"{label}: {args.clients} readers + {args.slow} stalled, {args.messages} msgs @ {args.rate:.0f}/s")
+    print(f"  delivered {len(latencies)}/{expected}   {received / 1e6:.1f} MB to readers   server CPU {server_cpu:.2f} s")
+    if latencies:
+        print(f"  latency p50 {statistics.median(latencies) * 1000:8.2f} ms"
+              f"   p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:8.2f} ms"
+              f"   max {latencies[-1] * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# blocklist_mirror.py
+"""The agent's copy of the dashboard's blocklist, fed by ``/blocked_ips`` pages.
+
+The server owns the list (Hackathon_M/blocklist.py and its SQLite file); the
+agent only needs membership checks that honour CIDR ranges and expiries, so
+this module keeps a small in-memory index and nothing else. Pages come from
+``FirewallClient.changes(since)``; see ``sync_blocklist`` in agent.py.
+"""
+import ipaddress
+import threading
+import time
+
+_MISSING = object()
+
+
+def _parse(network):
+    """``(key, version, prefixlen, prefix)``, keyed the way the server keys its entries."""
+    parsed = ipaddress.ip_network(str(network).strip(), strict=False)
+    key = str(parsed.network_address) if parsed.prefixlen == parsed.max_prefixlen else str(parsed)
+    prefix = int(parsed.network_address) >> (parsed.max_prefixlen - parsed.prefixlen)
+    return key, parsed.version, parsed.prefixlen, prefix
+
+
+class BlocklistMirror:
+    """Blocked addresses and ranges with optional expiry, in memory only."""
+
+    def __init__(self):
+        self._tables = {}  # (version, prefixlen) -> {prefix: expires_at or None}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return sum(len(table) for table in self._tables.values())
+
+    def __contains__(self, ip):
+        try:
+            address = ipaddress.ip_address(ip)
+        except ValueError:
+            return False
+        number = int(address)
+        now = None
+        for (version, prefixlen), table in list(self._tables.items()):
+            if version != address.version:
+                continue
+            expires_at = table.get(number >> (address.max_prefixlen - prefixlen), _MISSING)
+            if expires_at is _MISSING:
+                continue
+            if expires_at is None:
+                return True
+            now = time.time() if now is None else now
+            if expires_at > now:
+                return True
+        return False
+
+    def add(self, network, ttl=None):
+        self.update([network], ttl)
+
+    def update(self, networks, ttl=None):
+        """Record blocks the agent just made (ValueError, nothing recorded, if any is invalid)."""
+        parsed = [_parse(network) for network in networks]
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            for _, version, prefixlen, prefix in parsed:
+                self._tables.setdefault((version, prefixlen), {})[prefix] = expires_at
+
+    def remove(self, network):
+        _, version, prefixlen, prefix = _parse(network)
+        with self._lock:
+            table = self._tables.get((version, prefixlen))
+            if table is None or table.pop(prefix, _MISSING) is _MISSING:
+                return False
+            if not table:
+                del self._tables[(version, prefixlen)]
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._tables = {}
+
+    def apply(self, page):
+        """Apply one ``/blocked_ips`` page: a reset, then removals, then blocks."""
+        if page.get('reset'):
+            self.clear()
+        for network in page.get('removed', ()):
+            self.remove(network)
+        expires = page.get('expires_at', {})
+        now = time.time()
+        for network in page.get('blocked_ips', ()):
+            expires_at = expires.get(network)
+            if expires_at is None:
+                self.add(network)
+            elif expires_at > now:
+                self.add(network, expires_at - now)
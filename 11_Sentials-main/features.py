@@ -0,0 +1,200 @@
+# features.py
+"""Per-IP rolling features for anomaly detection.
+
+Every event updates a handful of decayed counters for its source IP and its
+/24 subnet in O(1). Per-IP and per-subnet state lives in LRU tables that also
+expire idle entries after a TTL, so memory stays bounded under millions of
+distinct sources.
+"""
+import calendar
+import math
+import re
+import time
+from collections import OrderedDict
+
+IP_RE = re.compile(r"(\d+)\.(\d+)\.(\d+)\.(\d+)")
+
+FEATURE_NAMES = [
+    "ip_last_octet",
+    "hour_of_day",
+    "ip_event_rate",        # events/sec, exponentially decayed
+    "ip_attack_types",      # distinct attack types seen from this IP
+    "ip_inter_arrival_s",   # EWMA of seconds between events
+    "subnet_event_rate",    # events/sec across the /24
+    "subnet_active_ips",    # tracked IPs currently in the /24
+]
+
+
+class _DecayedRate:
+    """Event counter whose weight halves every ``half_life`` seconds."""
+
+    __slots__ = ("value", "last")
+
+    def __init__(self, now):
+        self.value = 0.0
+        self.last = now
+
+    def hit(self, now, decay):
+        dt = now - self.last
+        if dt > 0:
+            self.value *= math.exp(-dt * decay)
+            self.last = now
+        self.value += 1.0
+
+
+class IPState:
+    __slots__ = ("rate", "last_seen", "iat", "attack_mask", "subnet")
+
+    def __init__(self, now, subnet):
+        self.rate = _DecayedRate(now)
+        self.last_seen = None
+        self.iat = 0.0
+        self.attack_mask = 0
+        self.subnet = subnet
+
+
+class SubnetState:
+    __slots__ = ("rate", "ips", "last_seen")
+
+    def __init__(self, now):
+        self.rate = _DecayedRate(now)
+        self.ips = set()  # the tracked IPs in this subnet
+        self.last_seen = now
+
+    @property
+    def active_ips(self):
+        return len(self.ips)
+
+
+class FeaturePipeline:
+    """Turns log lines into rolling per-IP / per-subnet feature vectors."""
+
+    def __init__(self, max_ips=100000, max_subnets=20000, ttl=3600.0, half_life=60.0,
+                 iat_alpha=0.2, classify=None):
+        self.max_ips = max_ips
+        self.max_subnets = max_subnets
+        self.ttl = ttl
+        self.half_life = half_life
+        self.iat_alpha = iat_alpha
+        # Optional line -> (attack_type, ip, severity) classifier such as ThreatMatcher.match
+        self.classify = classify
+        self._decay = math.log(2) / half_life
+        self._ips = OrderedDict()
+        self._subnets = OrderedDict()
+        self._attack_bits = {}
+        self._day_epoch = {}
+        self.evicted = 0
+
+    @property
+    def n_features(self):
+        return len(FEATURE_NAMES)
+
+    def __len__(self):
+        return len(self._ips)
+
+    def parse_timestamp(self, line):
+        """Epoch seconds and hour from a ``YYYY-MM-DD HH:MM:SS`` prefix, or None."""
+        if len(line) < 19 or line[4] != "-" or line[13] != ":":
+            return None
+        day = line[:10]
+        base = self._day_epoch.get(day)
+        try:
+            if base is None:
+                base = calendar.timegm(time.strptime(day, "%Y-%m-%d"))
+                if len(self._day_epoch) > 1024:
+                    self._day_epoch.clear()
+                self._day_epoch[day] = base
+            hour = int(line[11:13])
+            return base + hour * 3600 + int(line[14:16]) * 60 + int(line[17:19]), hour
+        except ValueError:
+            return None
+
+    def _attack_bit(self, attack_type):
+        bit = self._attack_bits.get(attack_type)
+        if bit is None:
+            bit = min(len(self._attack_bits), 62)  # types past 63 share the last bit
+            self._attack_bits[attack_type] = bit
+        return 1 << bit
+
+    def _attack_type(self, line):
+        if self.classify is not None:
+            threat = self.classify(line)
+            return threat[0] if threat else None
+        # Without a classifier, the message text up to " from" names the event
+        start = line.find(" - ")
+        end = line.find(" from", start + 3)
+        return line[start + 3:end] if start >= 0 and end > start else None
+
+    def _expire(self, now):
+        horizon = now - self.ttl
+        while self._ips:
+            ip, state = next(iter(self._ips.items()))
+            if len(self._ips) <= self.max_ips and state.last_seen >= horizon:
+                break
+            self._drop_ip(ip)
+        while self._subnets:
+            subnet, state = next(iter(self._subnets.items()))
+            if len(self._subnets) <= self.max_subnets and state.last_seen >= horizon:
+                break
+            # An expired subnet's IPs have expired already (it is seen whenever they are); one
+            # evicted for room takes its IPs along, or it would come back undercounted
+            for ip in state.ips:
+                del self._ips[ip]
+                self.evicted += 1
+            del self._subnets[subnet]
+
+    def _drop_ip(self, ip):
+        state = self._ips.pop(ip)
+        self._subnets[state.subnet].ips.discard(ip)
+        self.evicted += 1
+
+    def update(self, ip, octets, now, attack_type=None):
+        """Record one event from ``ip`` at ``now`` and return its rolling stats."""
+        subnet_key = octets[:3]
+        subnet = self._subnets.get(subnet_key)
+        if subnet is None:
+            subnet = self._subnets[subnet_key] = SubnetState(now)
+        else:
+            self._subnets.move_to_end(subnet_key)
+        subnet.rate.hit(now, self._decay)
+        subnet.last_seen = now
+
+        state = self._ips.get(ip)
+        if state is None:
+            state = self._ips[ip] = IPState(now, subnet_key)
+            subnet.ips.add(ip)
+        else:
+            self._ips.move_to_end(ip)
+            gap = max(0.0, now - state.last_seen)
+            state.iat = gap if state.iat == 0.0 else state.iat + self.iat_alpha * (gap - state.iat)
+        state.rate.hit(now, self._decay)
+        state.last_seen = now
+        if attack_type:
+            state.attack_mask |= self._attack_bit(attack_type)
+
+        self._expire(now)
+        return state, subnet
+
+    def extract(self, log_entry, now=None):
+        """Feature vector for one log line (see FEATURE_NAMES), or None."""
+        ip_match = IP_RE.search(log_entry)
+        if not ip_match:
+            return None
+        parsed = self.parse_timestamp(log_entry)
+        if parsed is None:
+            return None
+        event_time, hour = parsed
+        if now is None:
+            now = event_time
+        octets = ip_match.groups()
+        state, subnet = self.update(ip_match.group(0), octets, now, self._attack_type(log_entry))
+        per_second = self._decay  # a decayed count times ln2/half_life approximates events/sec
+        return [
+            int(octets[3]),
+            hour,
+            state.rate.value * per_second,
+            bin(state.attack_mask).count("1"),
+            state.iat,
+            subnet.rate.value * per_second,
+            subnet.active_ips,
+        ]
@@ -0,0 +1,165 @@
+# matcher.py
+import logging
+import os
+import re
+
+DEFAULT_ATTACK_TYPE = "Suspicious Activity"
+DEFAULT_SEVERITY = "medium"
+CONFIG_FILE = os.path.abspath(os.path.join(os.path.dirname(__file__), "config.yaml"))
+
+_REGEX_META = set("\\.^$*+?{}[]|()")
+_QUANTIFIERS = set("*+?{")
+# A run of literal spaces or \s, optionally with "+": the ways config.yaml and the
+# built-ins spell "whitespace here" (e.g. "IP: (" vs "IP:\s+(")
+_WHITESPACE_RUN = re.compile(r"(?:\\s| )+\+?")
+MIN_PREFIX_LEN = 4
+
+
+def has_top_level_alternation(pattern):
+    """True if ``pattern`` has a ``|`` outside any group or character class."""
+    depth = 0
+    in_class = escaped = False
+    for ch in pattern:
+        if escaped:
+            escaped = False
+        elif ch == "\\":
+            escaped = True
+        elif in_class:
+            in_class = ch != "]"
+        elif ch == "[":
+            in_class = True
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "|" and depth == 0:
+            return True
+    return False
+
+
+def literal_prefix(pattern):
+    """Return the literal text every match of ``pattern`` must start with."""
+    if has_top_level_alternation(pattern):
+        return ""  # "a|b" matches lines without a's prefix
+    prefix = []
+    for ch in pattern:
+        if ch in _REGEX_META:
+            # A quantifier applies to the previous char, which is then optional
+            if ch in _QUANTIFIERS and prefix:
+                prefix.pop()
+            break
+        prefix.append(ch)
+    return "".join(prefix)
+
+
+def dedupe_key(pattern):
+    """``pattern`` with every whitespace run spelled the same, for spotting duplicates."""
+    return _WHITESPACE_RUN.sub(r"\\s+", pattern)
+
+
+def load_config_patterns(path=CONFIG_FILE):
+    """Read ``suspicious_patterns`` from config.yaml (PyYAML is optional)."""
+    try:
+        import yaml
+    except ImportError:
+        return []
+    try:
+        with open(path, "r") as f:
+            config = yaml.safe_load(f) or {}
+    except OSError:
+        return []
+    return list(config.get("suspicious_patterns") or [])
+
+
+class ThreatMatcher:
+    """Classifies log lines against many threat patterns with one regex run at most.
+
+    Each pattern is compiled once. Its literal prefix (e.g. "Port scan detected
+    from IP:") is checked with a plain substring test first, which runs at C
+    speed, and the regex only runs for the pattern whose prefix is present.
+    Patterns with no usable literal prefix are folded into a single alternation
+    with named groups, which rejects a non-matching line in one run; on a hit,
+    the lower-numbered fallback patterns are tried one at a time, since the
+    alternation reports whichever matches earliest in the line. A line that
+    matches more than one pattern is classified by the first one in
+    ``patterns`` order. Patterns that differ only in how they spell whitespace
+    are duplicates, and only the first is kept.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = []
+        self._prefiltered = []
+        fallback = []
+        seen = set()
+        for pattern, attack_type, severity in patterns:
+            key = dedupe_key(pattern)
+            if key in seen:
+                continue  # duplicate of an earlier, better-labelled pattern
+            seen.add(key)
+            prefix = literal_prefix(pattern)
+            index = len(self.patterns)
+            compiled = re.compile(pattern)
+            self.patterns.append((compiled, attack_type, severity))
+            if len(prefix) >= MIN_PREFIX_LEN:
+                self._prefiltered.append((prefix, index, compiled))
+            else:
+                fallback.append((index, pattern))
+
+        self._fallback = None
+        self._fallback_first = None
+        self._fallback_patterns = [(index, self.patterns[index][0]) for index, _ in fallback]
+        self._fallback_ip_groups = {}
+        if fallback:
+            parts = []
+            group = 1
+            for index, pattern in fallback:
+                name = f"p{index}"
+                parts.append(f"(?P<{name}>{pattern})")
+                # The IP is the first capture group inside this alternative, if any
+                inner_groups = self.patterns[index][0].groups
+                self._fallback_ip_groups[name] = group + 1 if inner_groups else None
+                group += 1 + inner_groups
+            self._fallback = re.compile("|".join(parts))
+            self._fallback_first = fallback[0][0]
+
+    @classmethod
+    def from_config(cls, builtin_patterns, config_path=CONFIG_FILE):
+        """Combine the built-in labelled patterns with config.yaml's extra ones."""
+        patterns = list(builtin_patterns)
+        patterns.extend(
+            (pattern, DEFAULT_ATTACK_TYPE, DEFAULT_SEVERITY)
+            for pattern in load_config_patterns(config_path)
+        )
+        matcher = cls(patterns)
+        logging.info("Threat matcher compiled %d patterns (%d prefiltered)",
+                     len(matcher.patterns), len(matcher._prefiltered))
+        return matcher
+
+    def match(self, line):
+        """Return ``(attack_type, ip, severity)`` for ``line``, or None."""
+        best = None
+        for prefix, index, compiled in self._prefiltered:
+            if prefix in line:
+                m = compiled.search(line)
+                if m:
+                    best = (index, m.group(1) if compiled.groups else None)
+                    break
+        if self._fallback is not None and (best is None or best[0] > self._fallback_first):
+            m = self._fallback.search(line)
+            if m:
+                index = int(m.lastgroup[1:])
+                if best is None or index < best[0]:
+                    ip_group = self._fallback_ip_groups[m.lastgroup]
+                    best = (index, m.group(ip_group) if ip_group else None)
+                # m is the earliest match in the line; a lower-numbered pattern may match later on
+                for lower, compiled in self._fallback_patterns:
+                    if lower >= best[0]:
+                        break
+                    m = compiled.search(line)
+                    if m:
+                        best = (lower, m.group(1) if compiled.groups else None)
+                        break
+        if best is None:
+            return None
+        _, attack_type, severity = self.patterns[best[0]]
+        return attack_type, best[1], severity
@@ -0,0 +1,164 @@
+# model_store.py
+"""Versioned, memory-mappable storage for IsolationForest models.
+
+A saved model is a directory holding ``manifest.json`` and one ``.npy`` file
+per array. Every tree is flattened into shared node arrays, so loading is a
+handful of ``np.load(mmap_mode="r")`` calls. Worker processes that load the
+same directory share the pages through the OS cache instead of each holding a
+private copy. Scoring uses plain NumPy; this module never imports sklearn.
+"""
+import json
+import math
+import os
+
+import numpy as np
+
+FORMAT = "isolation-forest"
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+_EULER_GAMMA = 0.5772156649015329
+
+
+def average_path_length(n):
+    """Expected path length of an unsuccessful BST search over ``n`` points."""
+    if n <= 1:
+        return 0.0
+    if n == 2:
+        return 1.0
+    return 2.0 * (math.log(n - 1.0) + _EULER_GAMMA) - 2.0 * (n - 1.0) / n
+
+
+def export_isolation_forest(model, path):
+    """Flatten a fitted sklearn IsolationForest into ``path`` (a directory)."""
+    n_features = int(model.n_features_in_)
+    subsample_features = getattr(model, "_max_features", n_features) != n_features
+    max_samples = int(getattr(model, "_max_samples", model.max_samples_))
+
+    children, feature, threshold, path_length, offsets = [], [], [], [], []
+    max_depth = 0
+    offset = 0
+    for estimator, features in zip(model.estimators_, model.estimators_features_):
+        tree = estimator.tree_
+        n_nodes = tree.node_count
+        is_leaf = tree.children_left == -1
+
+        depth = np.zeros(n_nodes, dtype=np.int64)
+        for node in range(n_nodes):  # children always come after their parent
+            if not is_leaf[node]:
+                depth[tree.children_left[node]] = depth[node] + 1
+                depth[tree.children_right[node]] = depth[node] + 1
+        max_depth = max(max_depth, int(depth.max()))
+
+        node_feature = np.where(is_leaf, 0, tree.feature)
+        if subsample_features:
+            node_feature = np.asarray(features)[node_feature]
+        offsets.append(offset)
+        # (left, right) as global node ids. A leaf points at itself, so the
+        # scorer can take a fixed number of steps without masking finished walks.
+        own = np.arange(n_nodes) + offset
+        children.append(np.stack((
+            np.where(is_leaf, own, tree.children_left + offset),
+            np.where(is_leaf, own, tree.children_right + offset),
+        ), axis=1))
+        feature.append(node_feature)
+        threshold.append(tree.threshold)
+        # Same per-leaf term sklearn adds: nodes on the path - 1 + c(samples in leaf)
+        path_length.append(depth + np.array([average_path_length(n) for n in tree.n_node_samples]))
+        offset += n_nodes
+
+    arrays = {
+        "children": np.concatenate(children).astype(np.int32),
+        "feature": np.concatenate(feature).astype(np.int32),
+        "threshold": np.concatenate(threshold).astype(np.float64),
+        "path_length": np.concatenate(path_length).astype(np.float64),
+        "roots": np.asarray(offsets, dtype=np.int32),
+    }
+
+    os.makedirs(path, exist_ok=True)
+    manifest = {
+        "format": FORMAT,
+        "version": FORMAT_VERSION,
+        "n_features": n_features,
+        "n_estimators": len(model.estimators_),
+        "max_samples": max_samples,
+        "max_depth": max_depth,
+        "offset": float(model.offset_),
+        "contamination": model.contamination,
+        "arrays": {},
+    }
+    for name, array in arrays.items():
+        filename = f"{name}.npy"
+        np.save(os.path.join(path, filename), array)
+        manifest["arrays"][name] = {"file": filename, "dtype": str(array.dtype), "shape": list(array.shape)}
+    # Manifest goes last and atomically, so a half-written directory never loads
+    tmp = os.path.join(path, MANIFEST + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, os.path.join(path, MANIFEST))
+    return manifest
+
+
+def is_model_dir(path):
+    return os.path.isfile(os.path.join(path, MANIFEST))
+
+
+class ForestScorer:
+    """NumPy-only IsolationForest inference over a flattened, mmapped forest.
+
+    Exposes the parts of the sklearn estimator API that AnomalyDetection uses:
+    ``score_samples``, ``decision_function``, ``predict``, ``offset_`` and
+    ``contamination``.
+    """
+
+    def __init__(self, manifest, arrays):
+        self.manifest = manifest
+        self.offset_ = manifest["offset"]
+        self.contamination = manifest["contamination"]
+        self.n_features_in_ = manifest["n_features"]
+        self._max_depth = manifest["max_depth"]
+        self._denominator = manifest["n_estimators"] * average_path_length(manifest["max_samples"])
+        self._children = arrays["children"].reshape(-1)
+        self._feature = arrays["feature"]
+        self._threshold = arrays["threshold"]
+        self._path_length = arrays["path_length"]
+        self._roots = arrays["roots"]
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        with open(os.path.join(path, MANIFEST), "r") as f:
+            manifest = json.load(f)
+        if manifest.get("format") != FORMAT or manifest.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported model format in {path}: "
+                             f"{manifest.get('format')} v{manifest.get('version')}")
+        arrays = {
+            name: np.load(os.path.join(path, spec["file"]), mmap_mode="r" if mmap else None)
+            for name, spec in manifest["arrays"].items()
+        }
+        return cls(manifest, arrays)
+
+    def _leaves(self, X):
+        # Walk every (sample, tree) pair one level per step; depth is tiny (~log2(max_samples))
+        n_samples, n_features = X.shape
+        nodes = np.broadcast_to(self._roots, (n_samples, len(self._roots))).copy()
+        flat_X = X.reshape(-1)
+        row_base = (np.arange(n_samples) * n_features)[:, None]
+        for _ in range(self._max_depth):
+            go_right = flat_X[row_base + self._feature[nodes]] > self._threshold[nodes]
+            nodes = self._children[2 * nodes + go_right]
+        return nodes
+
+    def score_samples(self, X):
+        # sklearn's trees compare float32 inputs; match that so scores agree exactly
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected input of shape (n, {self.n_features_in_}), got {X.shape}")
+        depths = self._path_length[self._leaves(X)].sum(axis=1)
+        if self._denominator == 0:
+            return -np.ones(X.shape[0])
+        return -(2.0 ** (-depths / self._denominator))
+
+    def decision_function(self, X):
+        return self.score_samples(X) - self.offset_
+
+    def predict(self, X):
+        return np.where(self.decision_function(X) < 0, -1, 1)
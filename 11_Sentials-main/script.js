@@ -1,7 +1,11 @@
 // Dynamic Threat Simulation Frontend Client
 let attacks = [];
-let blockedIps = [];
+let blockedIps = new Set();     // addresses and CIDR ranges, oldest first
+let blockedRanges = new Map();  // IPv4 CIDR ranges in blockedIps -> [network, mask]
+let blockedCursor = 0;          // /blocked_ips?since= cursor: only changes after it are fetched
+let blockedTotal = 0;
 let autoDefend = true;
+const BLOCKED_FEED_LIMIT = 50;
 
 const attackIcons = {
     'Port Scan': '<path d="M12 2a10 10 0 1 0 10 10A10 10 0 0 0 12 2zm0 18a8 8 0 1 1 8-8 8 8 0 0 1-8 8z"/><path d="M12 6a6 6 0 1 0 6 6 6 6 0 0 0-6-6zm0 10a4 4 0 1 1 4-4 4 4 0 0 1-4 4z"/>',
@@ -44,7 +48,7 @@ function createIncidentCard(attack) {
     card.className = 'incident-card';
     
     // Check if threat IP is in our blocked IPs list
-    const isDefended = blockedIps.includes(attack.ip) && autoDefend;
+    const isDefended = isBlocked(attack.ip) && autoDefend;
     const shieldStatus = isDefended 
         ? `<span class="severity-badge" style="background-color: #10b981; color: white;">DEFENDED</span>`
         : `<span class="severity-badge" style="background-color: #ef4444; color: white;">ACTIVE</span>`;
@@ -90,12 +94,14 @@ function updateBlockedIpsFeed() {
     const feed = document.getElementById('blocked-ips-feed');
     feed.innerHTML = '';
 
-    if (blockedIps.length === 0) {
+    if (blockedIps.size === 0) {
         feed.innerHTML = `<div class="text-center py-8 text-gray-500 font-medium">Firewall clean: No IPs blocked</div>`;
         return;
     }
 
-    blockedIps.forEach(ip => {
+    // Newest rules first; the full list can be far too long to render
+    const newest = Array.from(blockedIps).slice(-BLOCKED_FEED_LIMIT).reverse();
+    newest.forEach(ip => {
         const div = document.createElement('div');
         div.className = 'incident-card border-l-4 border-emerald-500 bg-[#0e1614]';
         div.innerHTML = `
@@ -113,6 +119,13 @@ function updateBlockedIpsFeed() {
         `;
         feed.appendChild(div);
     });
+
+    if (blockedTotal > newest.length) {
+        const more = document.createElement('div');
+        more.className = 'text-center py-2 text-xs text-gray-500';
+        more.textContent = `+ ${blockedTotal - newest.length} more blocked`;
+        feed.appendChild(more);
+    }
 }
 
 // REST Client requests
@@ -149,12 +162,53 @@ async function checkDbStatus() {
     }
 }
 
+function ipv4ToInt(ip) {
+    const parts = ip.split('.');
+    if (parts.length !== 4) return null;
+    return parts.reduce((acc, part) => ((acc << 8) | (parseInt(part, 10) & 255)) >>> 0, 0);
+}
+
+function isBlocked(ip) {
+    if (blockedIps.has(ip)) return true;
+    const address = ipv4ToInt(ip);
+    if (address === null) return false;
+    for (const [network, mask] of blockedRanges.values()) {
+        if (((address & mask) >>> 0) === network) return true;
+    }
+    return false;
+}
+
+function applyBlockedChange(ip, blocked) {
+    blockedIps.delete(ip);
+    blockedRanges.delete(ip);
+    if (!blocked) return;
+    blockedIps.add(ip);
+    const [network, bits] = ip.split('/');
+    const base = ipv4ToInt(network);
+    if (bits !== undefined && base !== null) {
+        const mask = bits === '0' ? 0 : (0xFFFFFFFF << (32 - parseInt(bits, 10))) >>> 0;
+        blockedRanges.set(ip, [(base & mask) >>> 0, mask]);
+    }
+}
+
 async function fetchBlockedIps() {
     try {
-        const response = await fetch('http://localhost:5000/blocked_ips');
-        const data = await response.json();
-        blockedIps = data.blocked_ips || [];
-        autoDefend = data.auto_defend;
+        // Pages through changes since the last poll (everything, the first time)
+        let more = true;
+        while (more) {
+            const response = await fetch(`http://localhost:5000/blocked_ips?since=${blockedCursor}`);
+            const data = await response.json();
+            if (data.reset) {
+                blockedIps.clear();
+                blockedRanges.clear();
+            }
+            (data.removed || []).forEach(ip => applyBlockedChange(ip, false));
+            (data.blocked_ips || []).forEach(ip => applyBlockedChange(ip, true));
+            blockedCursor = data.seq;
+            blockedTotal = data.total;
+            autoDefend = data.auto_defend;
+            more = data.more;
+        }
         updateBlockedIpsFeed();
         updateIncidentsFeed(); // Refresh statuses
         updateDefenseButtonUI();
@@ -272,6 +326,14 @@ function updateDefenseButtonUI() {
     }
 }
 
+// Optional server-side filter from the page URL, e.g. ?severity=high&types=SQL%20Injection&ip_prefixes=10.0.
+function subscriptionFromUrl() {
+    const params = new URLSearchParams(window.location.search);
+    const list = (name) => params.get(name) ? params.get(name).split(',').map(v => v.trim()).filter(Boolean) : null;
+    const filter = { severity: params.get('severity'), types: list('types'), ip_prefixes: list('ip_prefixes') };
+    return (filter.severity || filter.types || filter.ip_prefixes) ? { action: 'subscribe', ...filter } : null;
+}
+
 // WebSocket connection to broadcast agent
 function initWebsocket() {
     const ws = new WebSocket('ws://localhost:8765');
@@ -279,6 +341,10 @@ function initWebsocket() {
 
     ws.addEventListener('open', () => {
         console.log('Incident Console connected to Agent WebSocket');
+        const subscription = subscriptionFromUrl();
+        if (subscription) {
+            ws.send(JSON.stringify(subscription));
+        }
         if (monitoringText) {
             monitoringText.textContent = "Live Stream Connected";
             monitoringText.parentElement.style.borderColor = "rgba(16, 185, 129, 0.4)";
@@ -287,20 +353,26 @@ function initWebsocket() {
 
     ws.addEventListener('message', (event) => {
         try {
-            const data = JSON.parse(event.data);
+            const packet = JSON.parse(event.data);
+            // The agent coalesces queued threats into one frame (a JSON array)
+            // Subscription acknowledgements carry an "action" key and are not threats
+            const events = (Array.isArray(packet) ? packet : [packet]).filter(data => !data.action);
+            if (events.length === 0) {
+                return;
+            }
             
-            // Format incoming payload
-            const newAttack = {
-                id: Date.now(),
+            // Format incoming payloads, newest first
+            const newAttacks = events.map((data, i) => ({
+                id: Date.now() + i,
                 type: data.type || "Suspicious Activity",
                 ip: data.ip || "127.0.0.1",
                 details: data.details || "No details provided",
                 severity: data.severity || "medium",
                 timestamp: new Date(data.timestamp || Date.now()).toLocaleTimeString()
-            };
+            })).reverse();
 
             // Prepend to list
-            attacks = [newAttack, ...attacks].slice(0, 30);
+            attacks = [...newAttacks, ...attacks].slice(0, 30);
             updateStats();
             updateIncidentsFeed();
             
@@ -0,0 +1,220 @@
+# tailer.py
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import time
+
+# inotify(7) flags
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class _Inotify:
+    """Minimal ctypes binding: watches a directory for changes to one file name."""
+
+    def __init__(self, directory, filename):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        # Watch the directory rather than the file so rotation (rename + create) is seen
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            err = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(err, "inotify_add_watch failed")
+        self.filename = os.fsencode(filename)
+
+    def wait(self, timeout):
+        """Block until our file changes or ``timeout`` expires. Returns True on an event."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        relevant = False
+        try:
+            while True:
+                data = os.read(self.fd, 64 * 1024)
+                offset = 0
+                while offset < len(data):
+                    _, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                    offset += _EVENT_HEADER.size
+                    name = data[offset:offset + length].rstrip(b"\0")
+                    offset += length
+                    if name == self.filename:
+                        relevant = True
+        except BlockingIOError:
+            pass
+        return relevant
+
+    def close(self):
+        os.close(self.fd)
+
+
+class LogTailer:
+    """Follows a growing log file and yields complete lines in batches.
+
+    Wakes on inotify events on Linux and falls back to polling elsewhere (or
+    when ``force_polling`` is set). Reads in blocks of ``block_size`` bytes and
+    splits them into lines in bulk. Rotation is detected by an inode change and
+    truncation by the file shrinking below the read offset.
+    """
+
+    def __init__(self, path, block_size=256 * 1024, poll_interval=0.5, max_batch=10000,
+                 start_at_end=True, force_polling=False):
+        self.path = os.path.abspath(path)
+        self.block_size = block_size
+        self.poll_interval = poll_interval
+        self.max_batch = max_batch
+        self._file = None
+        self._inode = None
+        self._offset = 0
+        self._partial = b""
+        self._closed = False
+
+        self.lines = 0
+        self.bytes = 0
+        self.batch_count = 0
+        self.rotations = 0
+        self.truncations = 0
+        self.last_wake_latency_ms = 0.0
+        self._started = time.monotonic()
+
+        self._notifier = None
+        if not force_polling and sys.platform.startswith("linux"):
+            try:
+                self._notifier = _Inotify(os.path.dirname(self.path), os.path.basename(self.path))
+            except OSError as e:
+                logging.warning("inotify unavailable (%s); polling %s every %.2fs", e, self.path, poll_interval)
+
+        self._open(seek_end=start_at_end)
+
+    @property
+    def mode(self):
+        return "inotify" if self._notifier else "polling"
+
+    def _open(self, seek_end=False):
+        try:
+            self._file = open(self.path, "rb")
+        except FileNotFoundError:
+            self._file, self._inode = None, None
+            return
+        st = os.fstat(self._file.fileno())
+        self._inode = st.st_ino
+        self._offset = st.st_size if seek_end else 0
+        self._file.seek(self._offset)
+        self._partial = b""
+
+    def _check_rotation(self):
+        """Reopen on rotation, rewind on truncation. Returns lines still buffered in the old file."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            # Rotated away and not recreated yet; keep reading the old handle
+            return []
+        if self._file is None:
+            self._open()
+            return []
+        if st.st_ino != self._inode:
+            # Drain whatever was appended to the old file before it was rotated away
+            drained = self._read_available(flush_partial=True)
+            self._file.close()
+            self._open()
+            self.rotations += 1
+            return drained
+        if st.st_size < self._offset:
+            self._file.seek(0)
+            self._offset = 0
+            self._partial = b""
+            self.truncations += 1
+        return []
+
+    def _read_available(self, flush_partial=False):
+        if self._file is None:
+            return []
+        chunks = []
+        while True:
+            block = self._file.read(self.block_size)
+            if not block:
+                break
+            chunks.append(block)
+            self._offset += len(block)
+        if not chunks and not (flush_partial and self._partial):
+            return []
+        data = self._partial + b"".join(chunks)
+        self.bytes += len(data) - len(self._partial)
+        lines = data.split(b"\n")
+        self._partial = b"" if flush_partial else lines.pop()
+        return [line.decode("utf-8", "replace").rstrip("\r") for line in lines if line]
+
+    def read_batch(self, timeout=None):
+        """Wait up to ``timeout`` seconds (default: forever) for new lines and return them."""
+        return self.read_timed(timeout)[0]
+
+    def read_timed(self, timeout=None):
+        """Like ``read_batch``, but returns ``(lines, wake_latency_ms)``.
+
+        The latency is from the wakeup that found the lines to their return
+        (0.0 if they were already there), measured by this call, so a reader on
+        another thread never pairs its lines with a later call's figure.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        woke = None
+        while not self._closed:
+            lines = self._check_rotation()
+            lines.extend(self._read_available())
+            if lines:
+                latency_ms = 0.0
+                if woke is not None:
+                    latency_ms = self.last_wake_latency_ms = (time.monotonic() - woke) * 1000
+                self.lines += len(lines)
+                return lines, latency_ms
+            wait = self.poll_interval
+            if deadline is not None:
+                wait = min(wait, deadline - time.monotonic())
+                if wait <= 0:
+                    return [], 0.0
+            if self._notifier:
+                self._notifier.wait(wait)
+            else:
+                time.sleep(wait)
+            woke = time.monotonic()
+        return [], 0.0
+
+    def batches(self):
+        """Yield lists of at most ``max_batch`` new lines, forever."""
+        while not self._closed:
+            lines = self.read_batch()
+            for i in range(0, len(lines), self.max_batch):
+                self.batch_count += 1
+                yield lines[i:i + self.max_batch]
+
+    def stats(self):
+        elapsed = max(time.monotonic() - self._started, 1e-9)
+        return {
+            "mode": self.mode,
+            "lines": self.lines,
+            "bytes": self.bytes,
+            "batches": self.batch_count,
+            "rotations": self.rotations,
+            "truncations": self.truncations,
+            "lines_per_sec": round(self.lines / elapsed, 1),
+            "last_wake_latency_ms": round(self.last_wake_latency_ms, 3)
+        }
+
+    def close(self):
+        self._closed = True
+        if self._file is not None:
+            self._file.close()
+        if self._notifier is not None:
+            self._notifier.close()
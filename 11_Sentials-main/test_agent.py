@@ -1,9 +1,7 @@
 import unittest
-from unittest.mock import patch, mock_open, MagicMock
-from agent import CybersecurityAgent, AnomalyDetection
-from datetime import datetime
-import os
-import pickle  # Import pickle
+from unittest.mock import patch, MagicMock
+from agent import CybersecurityAgent
+from anomaly_detection import AnomalyDetection
 
 class TestAnomalyDetection(unittest.TestCase):
     def setUp(self):
@@ -24,97 +22,87 @@ class TestAnomalyDetection(unittest.TestCase):
         features = self.anomaly_detection.extract_features(log_entry)
         self.assertIsNone(features)
 
-    def test_detect_anomaly_with_insufficient_data(self):
+    def test_detect_anomaly_untrained(self):
         with self.assertRaises(ValueError):
             self.anomaly_detection.detect_anomaly([1, 2])
 
-    def test_save_and_load_model(self):
-        # Train the model with some data
-        data = [[1, 2], [2, 3], [3, 4], [4, 5], [5, 6]]
-        self.anomaly_detection.train_model(data)
-        
-        # Save the model to a file
-        with open("test_model.pkl", "wb") as file:
-            pickle.dump(self.anomaly_detection.model, file)
-        
-        # Load the model from the file
-        with open("test_model.pkl", "rb") as file:
-            loaded_model = pickle.load(file)
-        
-        # Check if the loaded model is the same as the original model
-        self.assertEqual(self.anomaly_detection.model.get_params(), loaded_model.get_params())
+def firewall_response(status_code=200, blocked=True, rejected=None):
+    response = MagicMock(status_code=status_code, text="")
+    response.json.return_value = {"blocked": blocked, "rejected": rejected or {}}
+    return response
 
 class TestCybersecurityAgent(unittest.TestCase):
     def setUp(self):
+        patches = [
+            patch("agent.FirewallClient"),
+            patch("agent.ThreatBroadcaster"),
+            patch("agent.sync_blocklist", lambda firewall, mirror, since: since),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
         self.agent = CybersecurityAgent()
+        self.firewall = self.agent.firewall
+        self.firewall.block.return_value = firewall_response()
 
-    @patch("builtins.open", new_callable=mock_open, read_data="2025-01-21 04:40:07 - Normal operation from 214.72.27.242\n")
-    def test_monitor_logs(self, mock_file):
-        with patch.object(self.agent, 'analyze_log_entry') as mock_analyze:
-            self.agent.monitor_logs("mock_logs.txt", duration=1)
-            mock_analyze.assert_called()
+    def test_block_ip(self):
+        self.agent.block_ip("214.72.27.242")
+        self.firewall.block.assert_called_once_with("214.72.27.242")
+        self.assertIn("214.72.27.242", self.agent.blocked_ips)
 
-    @patch("requests.post")
-    def test_block_ip(self, mock_post):
-        mock_post.return_value.status_code = 200
+        # Already blocked: no second firewall call
         self.agent.block_ip("214.72.27.242")
-        mock_post.assert_called_with("http://example.com/api/block_ip", json={"ip": "214.72.27.242"})
+        self.firewall.block.assert_called_once()
+
+    def test_block_ip_failure(self):
+        self.firewall.block.return_value = firewall_response(status_code=500)
+        with self.assertLogs(level="ERROR"):
+            self.agent.block_ip("214.72.27.242")
+        self.assertNotIn("214.72.27.242", self.agent.blocked_ips)
 
-    @patch("requests.post")
-    def test_block_ip_failure(self, mock_post):
-        mock_post.return_value.status_code = 500
+    def test_block_ip_with_shield_off_is_not_cached(self):
+        self.firewall.block.return_value = firewall_response(blocked=False)
         with self.assertLogs(level="ERROR"):
             self.agent.block_ip("214.72.27.242")
-        mock_post.assert_called_with("http://example.com/api/block_ip", json={"ip": "214.72.27.242"})
-
-    @patch("builtins.open", new_callable=mock_open)
-    def test_log_action(self, mock_file):
-        self.agent.log_action("214.72.27.242")
-        mock_file().write.assert_called_with(f"{datetime.now()} - Blocked IP: 214.72.27.242\n")
-
-    @patch("requests.post")
-    def test_analyze_with_llm(self, mock_post):
-        mock_post.return_value.status_code = 200
-        mock_post.return_value.json.return_value = {"analysis": "Suspicious activity detected"}
-        self.agent.analyze_with_llm("2025-01-21 04:40:07 - Failed login from 214.72.27.242")
-        mock_post.assert_called_once_with(
-            self.agent.groq_api_url,
-            headers={
-                "Authorization": f"Bearer {self.agent.groq_api_key}",
-                "Content-Type": "application/json"
-            },
-            json={
-                "log_entry": "2025-01-21 04:40:07 - Failed login from 214.72.27.242",
-                "prompt": "Analyze the following log entry for suspicious activity:"
-            }
-        )
-
-    @patch("smtplib.SMTP")
-    def test_send_email_alert(self, mock_smtp):
-        mock_server = MagicMock()
-        mock_smtp.return_value = mock_server
-        self.agent.send_email_alert("Test alert message")
-        mock_server.sendmail.assert_called()
-
-    @patch("requests.post")
-    def test_send_slack_alert(self, mock_post):
-        mock_post.return_value.status_code = 200
-        self.agent.send_slack_alert("Test Slack alert message")
-        mock_post.assert_called_with(os.getenv("SLACK_WEBHOOK_URL"), json={"text": "Test Slack alert message"})
-
-    @patch("builtins.open", new_callable=mock_open, read_data="2025-01-21 04:40:07 - Failed login from 214.72.27.242\n")
-    @patch("requests.post")
-    @patch("smtplib.SMTP")
-    def test_end_to_end_workflow(self, mock_smtp, mock_post, mock_file):
-        mock_post.return_value.status_code = 200
-        mock_post.return_value.json.return_value = {"analysis": "Suspicious activity detected"}
-        mock_server = MagicMock()
-        mock_smtp.return_value = mock_server
-
-        self.agent.monitor_logs("mock_logs.txt", duration=1)
-
-        mock_post.assert_called_with("http://example.com/api/block_ip", json={"ip": "214.72.27.242"})
-        mock_server.sendmail.assert_called()
+        self.assertNotIn("214.72.27.242", self.agent.blocked_ips)
+
+    def test_analyze_batch_blocks_once_and_broadcasts_each_threat(self):
+        with self.assertLogs(level="WARNING"):
+            self.agent.analyze_batch([
+                "2025-01-21 04:40:07 - Brute force attack detected from IP: 214.72.27.242\n",
+                "2025-01-21 04:40:08 - Port scan detected from IP: 198.51.100.7\n",
+                "2025-01-21 04:40:09 - Normal operation from 203.0.113.1\n",
+            ])
+        self.firewall.block.assert_called_once_with(["214.72.27.242", "198.51.100.7"])
+        published = [c.args[0] for c in self.agent.broadcaster.publish.call_args_list]
+        self.assertEqual([(p["type"], p["ip"]) for p in published],
+                         [("Brute Force", "214.72.27.242"), ("Port Scan", "198.51.100.7")])
+        self.assertEqual(self.agent.processed_lines, 3)
+
+    def test_refused_ips_in_a_batch_are_not_resent(self):
+        self.firewall.block.return_value = firewall_response(rejected={"127.0.0.1": "overlaps protected network"})
+        with self.assertLogs(level="ERROR"):
+            self.agent.block_ips(["198.51.100.7", "127.0.0.1", "203.0.113.9"])
+        self.firewall.block.assert_called_once_with(["198.51.100.7", "127.0.0.1", "203.0.113.9"])
+        self.assertIn("198.51.100.7", self.agent.blocked_ips)
+        self.assertIn("203.0.113.9", self.agent.blocked_ips)
+        self.assertNotIn("127.0.0.1", self.agent.blocked_ips)
+
+        self.firewall.block.reset_mock()
+        self.agent.block_ips(["127.0.0.1", "198.51.100.7"])
+        self.firewall.block.assert_not_called()
+
+    def test_ip_refused_on_its_own_is_not_resent(self):
+        self.firewall.block.return_value = firewall_response(status_code=400, rejected={"127.0.0.1": "loopback"})
+        with self.assertLogs(level="ERROR"):
+            self.agent.block_ip("127.0.0.1")
+        self.agent.block_ip("127.0.0.1")
+        self.firewall.block.assert_called_once()
+
+    def test_analyze_batch_without_threats_does_nothing(self):
+        self.agent.analyze_batch(["2025-01-21 04:40:07 - Normal operation from 214.72.27.242\n"])
+        self.firewall.block.assert_not_called()
+        self.agent.broadcaster.publish.assert_not_called()
 
 if __name__ == "__main__":
-    unittest.main()
\ No newline at end of file
+    unittest.main()
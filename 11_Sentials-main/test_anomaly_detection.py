@@ -0,0 +1,136 @@
+import os
+import pickle
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+import numpy as np
+
+from anomaly_detection import AnomalyDetection, FeatureRingBuffer
+from model_store import ForestScorer
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SHIPPED_MODEL = os.path.join(HERE, "anomaly_model")
+
+
+class TestAnomalyModelStorage(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_scoring_a_loaded_model_does_not_import_sklearn(self):
+        script = (
+            "import sys\n"
+            "from anomaly_detection import AnomalyDetection\n"
+            f"d = AnomalyDetection(); d.load_model({SHIPPED_MODEL!r})\n"
+            "d.detect_anomalies(['2025-01-21 04:40:07 - Normal operation from 214.72.27.242'])\n"
+            "print(any(name.split('.')[0] == 'sklearn' for name in sys.modules))\n"
+        )
+        out = subprocess.run([sys.executable, "-c", script], cwd=HERE, capture_output=True, text=True, check=True)
+        self.assertEqual(out.stdout.strip(), "False")
+
+    def test_saved_model_scores_like_the_estimator(self):
+        rng = np.random.default_rng(0)
+        X = rng.integers(0, 255, size=(500, 2))
+        detector = AnomalyDetection()
+        detector.train_model(X)
+        path = os.path.join(self.dir, "model")
+        detector.save_model(path)
+
+        loaded = AnomalyDetection()
+        loaded.load_model(path)
+        self.assertIsInstance(loaded.model, ForestScorer)
+        np.testing.assert_allclose(loaded.model.score_samples(X), detector.model.score_samples(X))
+
+    def test_pickles_are_not_loaded(self):
+        path = os.path.join(self.dir, "model.pkl")
+        with open(path, "wb") as f:
+            pickle.dump({"not": "a model"}, f)
+        with self.assertRaises(ValueError):
+            AnomalyDetection().load_model(path)
+
+    def test_untrained_detector_raises(self):
+        with self.assertRaises(ValueError):
+            AnomalyDetection().detect_anomaly([1, 2])
+
+
+class TestFeatureRingBuffer(unittest.TestCase):
+    def test_append_overwrites_the_oldest_row_once_full(self):
+        buffer = FeatureRingBuffer(3)
+        for i in range(5):
+            buffer.append([i, i])
+        self.assertEqual(len(buffer), 3)
+        self.assertEqual(buffer.total, 5)
+        self.assertEqual(buffer.snapshot()[:, 0].tolist(), [2, 3, 4])
+
+    def test_extend_wraps_around_the_end(self):
+        buffer = FeatureRingBuffer(4)
+        buffer.extend([[0, 0], [1, 1], [2, 2]])
+        buffer.extend([[3, 3], [4, 4]])
+        self.assertEqual(buffer.snapshot()[:, 0].tolist(), [1, 2, 3, 4])
+
+    def test_extend_larger_than_capacity_keeps_the_newest(self):
+        buffer = FeatureRingBuffer(3)
+        buffer.append([9, 9])
+        buffer.extend([[i, i] for i in range(10)])
+        self.assertEqual(buffer.snapshot()[:, 0].tolist(), [7, 8, 9])
+        self.assertEqual(buffer.total, 11)
+        buffer.extend([])
+        self.assertEqual(len(buffer), 3)
+
+
+class TestIncrementalRetrain(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.detector = AnomalyDetection(window_size=1000, n_estimators=10)
+        self.detector.train_model(rng.integers(0, 255, size=(200, 2)))
+        self.detector.data.extend(rng.integers(0, 255, size=(200, 2)))
+        self.addCleanup(self.detector.stop_incremental)
+
+    def wait_for_new_model(self, model, timeout):
+        deadline = time.monotonic() + timeout
+        while self.detector.model is model and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return self.detector.model is not model
+
+    def test_drift_in_the_anomaly_rate_triggers_a_retrain(self):
+        model = self.detector.model
+        self.detector.start_incremental(interval=3600, min_samples=100, check_every=0.01)
+        self.assertFalse(self.wait_for_new_model(model, 0.1))
+        # Nine in ten lines flagged against a 10% contamination
+        self.detector._scored_since_fit, self.detector._anomalies_since_fit = 100, 90
+        self.assertTrue(self.detector.has_drifted(min_samples=100))
+        self.assertTrue(self.wait_for_new_model(model, 5))
+        self.assertEqual(self.detector._scored_since_fit, 0)
+
+    def test_expected_anomaly_rate_waits_for_the_interval(self):
+        self.detector._scored_since_fit, self.detector._anomalies_since_fit = 100, 10
+        self.assertFalse(self.detector.has_drifted(min_samples=100))
+        model = self.detector.model
+        self.detector.start_incremental(interval=0.2, min_samples=100, check_every=0.01)
+        self.assertTrue(self.wait_for_new_model(model, 5))
+
+    def test_too_few_samples_never_retrain(self):
+        detector = AnomalyDetection(window_size=1000, n_estimators=10)
+        detector.train_model([[1, 2], [3, 4], [5, 6]])
+        self.addCleanup(detector.stop_incremental)
+        model = detector.model
+        detector.start_incremental(interval=0, min_samples=100, check_every=0.01)
+        time.sleep(0.1)
+        self.assertIs(detector.model, model)
+
+    def test_scored_batches_join_the_window_while_learning(self):
+        self.detector.start_incremental(interval=3600, check_every=60)
+        self.detector.detect_anomalies(["2025-01-21 04:40:07 - Normal operation from 214.72.27.242"])
+        self.assertEqual(len(self.detector.data), 201)
+        self.detector.stop_incremental()
+        self.assertFalse(self.detector.learn_online)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from async_agent import AsyncCybersecurityAgent
+
+
+class TestAsyncCybersecurityAgent(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.log_file = os.path.join(self.dir, "attacker_logs.log")
+        open(self.log_file, "w").close()
+
+        self.ws = MagicMock(send=AsyncMock())
+        response = MagicMock(status_code=200, text="")
+        response.json.return_value = {"blocked": True, "rejected": {}}
+        patches = [
+            patch("async_agent.FirewallClient"),
+            patch("async_agent.sync_blocklist", lambda firewall, mirror, since: since),
+            patch("async_agent.websockets.connect", AsyncMock(return_value=self.ws)),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        self.agent = AsyncCybersecurityAgent(log_file=self.log_file, block_concurrency=2)
+        self.agent.firewall.block.return_value = response
+
+    def frames(self):
+        payloads = []
+        for call in self.ws.send.call_args_list:
+            frame = json.loads(call.args[0])
+            payloads.extend(frame if isinstance(frame, list) else [frame])
+        return payloads
+
+    def test_batch_is_blocked_broadcast_and_shut_down(self):
+        async def main():
+            run = asyncio.create_task(self.agent.run())
+            await asyncio.sleep(0.1)  # the tailer starts at the end of the file
+            with open(self.log_file, "a") as f:
+                f.write("2025-01-21 04:40:07 - Port scan detected from IP: 198.51.100.7\n"
+                        "2025-01-21 04:40:08 - Normal operation from 203.0.113.1\n"
+                        "2025-01-21 04:40:09 - SQL Injection detected from IP: 203.0.113.9\n")
+            for _ in range(100):
+                if len(self.frames()) == 2:
+                    break
+                await asyncio.sleep(0.02)
+            run.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await run
+
+        with self.assertLogs(level="WARNING"):
+            asyncio.run(main())
+        self.assertEqual(sorted((p["type"], p["ip"]) for p in self.frames()),
+                         [("Port Scan", "198.51.100.7"), ("SQL Injection", "203.0.113.9")])
+        self.assertEqual(sorted(c.args[0] for c in self.agent.firewall.block.call_args_list),
+                         ["198.51.100.7", "203.0.113.9"])
+        self.assertEqual(self.agent.processed_lines, 3)
+        self.assertEqual(self.agent.stats()["tail"]["processed"], 3)
+        # The tailer's read thread had returned before the tailer was closed
+        self.assertTrue(self.agent._read.done())
+        self.assertTrue(self.agent.tailer._closed)
+        self.agent.firewall.close.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
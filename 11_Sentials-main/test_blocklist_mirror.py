@@ -0,0 +1,66 @@
+import os
+import subprocess
+import sys
+import unittest
+
+from agent import sync_blocklist
+from blocklist_mirror import BlocklistMirror
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class FakeFirewall:
+    """Serves canned /blocked_ips pages the way FirewallClient.changes() returns them."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.calls = []
+
+    def changes(self, since=0):
+        self.calls.append(since)
+        return self.pages[since]
+
+
+class TestBlocklistMirror(unittest.TestCase):
+    def test_ranges_and_hosts(self):
+        mirror = BlocklistMirror()
+        mirror.update(["10.0.0.0/8", "192.0.2.7", "2001:db8::/32"])
+        self.assertIn("10.9.9.9", mirror)
+        self.assertIn("192.0.2.7", mirror)
+        self.assertIn("2001:db8::1", mirror)
+        self.assertNotIn("192.0.2.8", mirror)
+        self.assertNotIn("not an ip", mirror)
+        self.assertTrue(mirror.remove("192.0.2.7/32"))
+        self.assertNotIn("192.0.2.7", mirror)
+        self.assertEqual(len(mirror), 2)
+
+    def test_apply_honours_expiry_and_reset(self):
+        mirror = BlocklistMirror()
+        mirror.add("198.51.100.1")
+        mirror.apply({"blocked_ips": ["203.0.113.0/24", "192.0.2.1"], "expires_at": {"192.0.2.1": 1.0},
+                      "removed": [], "reset": True})
+        self.assertNotIn("198.51.100.1", mirror)  # reset dropped it
+        self.assertNotIn("192.0.2.1", mirror)  # already expired
+        self.assertIn("203.0.113.77", mirror)
+        mirror.apply({"blocked_ips": [], "removed": ["203.0.113.0/24"]})
+        self.assertNotIn("203.0.113.77", mirror)
+
+    def test_sync_pages_through_changes(self):
+        firewall = FakeFirewall({
+            0: {"blocked_ips": ["10.0.0.1"], "removed": [], "seq": 5, "more": True, "reset": False},
+            5: {"blocked_ips": ["10.0.0.2"], "removed": ["10.0.0.1"], "seq": 9, "more": False, "reset": False},
+        })
+        mirror = BlocklistMirror()
+        self.assertEqual(sync_blocklist(firewall, mirror, 0), 9)
+        self.assertEqual(firewall.calls, [0, 5])
+        self.assertNotIn("10.0.0.1", mirror)
+        self.assertIn("10.0.0.2", mirror)
+
+    def test_agent_does_not_import_server_modules(self):
+        script = "import sys, agent, async_agent; print(sorted({'db', 'blocklist', 'app'} & set(sys.modules)))"
+        out = subprocess.run([sys.executable, "-c", script], cwd=HERE, capture_output=True, text=True, check=True)
+        self.assertEqual(out.stdout.strip(), "[]")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import math
+import unittest
+
+from features import FEATURE_NAMES, FeaturePipeline
+
+SUBNET_RATE = FEATURE_NAMES.index("subnet_event_rate")
+ACTIVE_IPS = FEATURE_NAMES.index("subnet_active_ips")
+
+
+def octets(ip):
+    return tuple(ip.split("."))
+
+
+class TestFeaturePipeline(unittest.TestCase):
+    def hit(self, pipeline, ip, now, attack_type=None):
+        return pipeline.update(ip, octets(ip), now, attack_type)
+
+    def test_extract(self):
+        pipeline = FeaturePipeline()
+        line = "2025-01-21 04:40:07 - Port scan detected from IP: 10.0.0.5"
+        features = pipeline.extract(line)
+        self.assertEqual(len(features), pipeline.n_features)
+        self.assertEqual(features[:2], [5, 4])
+        self.assertEqual(features[3], 1)  # one attack type so far
+        self.assertEqual(features[ACTIVE_IPS], 1)
+        self.assertIsNone(pipeline.extract("no timestamp from 10.0.0.5"))
+
+    def test_rate_halves_every_half_life(self):
+        pipeline = FeaturePipeline(half_life=10.0)
+        self.hit(pipeline, "10.0.0.5", 0.0)
+        state, _ = self.hit(pipeline, "10.0.0.5", 10.0)
+        self.assertAlmostEqual(state.rate.value, 1.5)
+        state, _ = self.hit(pipeline, "10.0.0.5", 30.0)
+        self.assertAlmostEqual(state.rate.value, 1.5 / 4 + 1)
+        self.assertEqual(state.iat, 10.0 + 0.2 * (20.0 - 10.0))
+
+    def test_idle_entries_expire_after_the_ttl(self):
+        pipeline = FeaturePipeline(ttl=100.0)
+        self.hit(pipeline, "10.0.0.5", 0.0)
+        self.hit(pipeline, "10.0.1.5", 50.0)
+        self.hit(pipeline, "10.0.2.5", 101.0)
+        self.assertEqual(len(pipeline), 2)
+        self.assertNotIn(octets("10.0.0.5")[:3], pipeline._subnets)
+        self.assertEqual(pipeline.evicted, 1)
+
+    def test_least_recently_seen_ip_is_evicted_at_capacity(self):
+        pipeline = FeaturePipeline(max_ips=2)
+        self.hit(pipeline, "10.0.0.1", 0.0)
+        self.hit(pipeline, "10.0.0.2", 1.0)
+        self.hit(pipeline, "10.0.0.1", 2.0)
+        _, subnet = self.hit(pipeline, "10.0.0.3", 3.0)
+        self.assertEqual(list(pipeline._ips), ["10.0.0.1", "10.0.0.3"])
+        self.assertEqual(subnet.active_ips, 2)
+
+    def test_subnet_counts_its_tracked_ips(self):
+        pipeline = FeaturePipeline()
+        for i in range(3):
+            _, subnet = self.hit(pipeline, f"10.0.0.{i}", float(i))
+        self.hit(pipeline, "10.0.1.1", 3.0)
+        self.assertEqual(subnet.active_ips, 3)
+        self.assertAlmostEqual(subnet.rate.value, sum(math.exp(-i * pipeline._decay) for i in range(3)))
+
+    def test_subnet_evicted_for_room_takes_its_ips_along(self):
+        pipeline = FeaturePipeline(max_subnets=2)
+        self.hit(pipeline, "10.0.0.1", 0.0)
+        self.hit(pipeline, "10.0.0.2", 1.0)
+        self.hit(pipeline, "10.0.1.1", 2.0)
+        self.hit(pipeline, "10.0.2.1", 3.0)  # evicts 10.0.0.x
+        self.assertNotIn("10.0.0.1", pipeline._ips)
+        _, subnet = self.hit(pipeline, "10.0.0.1", 4.0)
+        self.assertEqual(subnet.active_ips, 1)
+        self.assertEqual(sum(s.active_ips for s in pipeline._subnets.values()), len(pipeline))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+
+import os
+import tempfile
+
+from matcher import ThreatMatcher, has_top_level_alternation, literal_prefix
+
+IP = r"(\d+\.\d+\.\d+\.\d+)"
+PATTERNS = [
+    (r"Brute force attack detected from IP:\s+" + IP, "Brute Force", "high"),
+    (r"Port scan detected from IP:\s+" + IP, "Port Scan", "medium"),
+]
+
+
+class TestLiteralPrefix(unittest.TestCase):
+    def test_prefix_stops_at_first_metacharacter(self):
+        self.assertEqual(literal_prefix(r"Port scan detected from IP:\s+(\S+)"), "Port scan detected from IP:")
+
+    def test_quantified_char_is_not_part_of_prefix(self):
+        self.assertEqual(literal_prefix(r"Errors? in (\S+)"), "Error")
+
+    def test_top_level_alternation_has_no_prefix(self):
+        self.assertEqual(literal_prefix(r"Login failed|Access denied for (\S+)"), "")
+
+    def test_alternation_inside_group_or_class_keeps_prefix(self):
+        self.assertFalse(has_top_level_alternation(r"Login (failed|denied) for (\S+)"))
+        self.assertFalse(has_top_level_alternation(r"Login [|] for \| (\S+)"))
+        self.assertEqual(literal_prefix(r"Login (failed|denied)"), "Login ")
+
+
+class TestThreatMatcher(unittest.TestCase):
+    def test_prefiltered_match_extracts_ip(self):
+        matcher = ThreatMatcher(PATTERNS)
+        self.assertEqual(matcher.match("2025-01-21 - Port scan detected from IP: 10.0.0.5"),
+                         ("Port Scan", "10.0.0.5", "medium"))
+        self.assertIsNone(matcher.match("2025-01-21 - Normal operation from 10.0.0.5"))
+
+    def test_both_sides_of_an_alternation_match(self):
+        matcher = ThreatMatcher([(r"Login failed|Access denied for (\S+)", "Auth", "low")])
+        self.assertEqual(matcher.match("Login failed"), ("Auth", None, "low"))
+        self.assertEqual(matcher.match("Access denied for 1.2.3.4"), ("Auth", "1.2.3.4", "low"))
+
+    def test_patterns_sharing_a_prefix_are_kept(self):
+        matcher = ThreatMatcher([
+            (r"Error: (\S+) disk full", "Disk", "high"),
+            (r"Error: (\S+) timed out", "Timeout", "low"),
+        ])
+        self.assertEqual(len(matcher.patterns), 2)
+        self.assertEqual(matcher.match("Error: db1 disk full"), ("Disk", "db1", "high"))
+        self.assertEqual(matcher.match("Error: db1 timed out"), ("Timeout", "db1", "low"))
+
+    def test_identical_patterns_keep_the_first_label(self):
+        matcher = ThreatMatcher(PATTERNS + [(PATTERNS[0][0], "Suspicious Activity", "medium")])
+        self.assertEqual(len(matcher.patterns), 2)
+        self.assertEqual(matcher.match("Brute force attack detected from IP: 1.2.3.4")[0], "Brute Force")
+
+    def test_first_pattern_in_order_wins_across_prefilter_and_fallback(self):
+        matcher = ThreatMatcher([
+            (r"(\S+) scan", "Generic", "low"),  # no prefix: fallback alternation
+            (r"Port scan detected from IP:\s+" + IP, "Port Scan", "medium"),
+        ])
+        self.assertEqual(matcher.match("Port scan detected from IP: 1.2.3.4")[0], "Generic")
+
+    def test_lower_fallback_pattern_wins_even_if_it_matches_later_in_the_line(self):
+        matcher = ThreatMatcher([
+            (r"\w+ late " + IP, "A", "low"),
+            (r"^\w+ early", "B", "low"),
+        ])
+        self.assertEqual(matcher.match("xx early yy late 1.2.3.4"), ("A", "1.2.3.4", "low"))
+        self.assertEqual(matcher.match("xx early"), ("B", None, "low"))
+
+    def test_config_patterns_differing_only_in_whitespace_are_dropped(self):
+        try:
+            import yaml  # noqa: F401
+        except ImportError:
+            self.skipTest("PyYAML is not installed")
+        with tempfile.NamedTemporaryFile("w", suffix=".yaml", delete=False) as f:
+            f.write('suspicious_patterns:\n'
+                    '  - "Port scan detected from IP: (\\\\d+\\\\.\\\\d+\\\\.\\\\d+\\\\.\\\\d+)"\n'
+                    '  - "Malware beacon to (\\\\S+)"\n')
+        self.addCleanup(os.unlink, f.name)
+        matcher = ThreatMatcher.from_config(PATTERNS, config_path=f.name)
+        self.assertEqual(len(matcher.patterns), 3)
+        self.assertEqual(matcher.match("Port scan detected from IP: 10.0.0.5")[0], "Port Scan")
+
+
+if __name__ == "__main__":
+    unittest.main()
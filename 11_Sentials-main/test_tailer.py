@@ -0,0 +1,72 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from tailer import LogTailer
+
+
+class TestLogTailer(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.path = os.path.join(self.dir, "attacker_logs.log")
+        self.write("old line from before the agent started\n")
+        self.tailer = self.open_tailer(force_polling=True)
+
+    def open_tailer(self, **kwargs):
+        tailer = LogTailer(self.path, poll_interval=0.01, **kwargs)
+        self.addCleanup(tailer.close)
+        return tailer
+
+    def write(self, text, mode="a", path=None):
+        with open(path or self.path, mode) as f:
+            f.write(text)
+
+    def test_starts_at_the_end_and_reads_appended_lines(self):
+        self.assertEqual(self.tailer.mode, "polling")
+        self.assertEqual(self.tailer.read_batch(0.05), [])
+        self.write("first\nsecond\n")
+        self.assertEqual(self.tailer.read_batch(0.5), ["first", "second"])
+        self.assertEqual(self.tailer.read_batch(0.05), [])
+
+    def test_line_written_in_two_pieces_is_returned_once_complete(self):
+        self.write("Port scan detected ")
+        self.assertEqual(self.tailer.read_batch(0.05), [])
+        self.write("from IP: 10.0.0.5\n")
+        self.assertEqual(self.tailer.read_batch(0.5), ["Port scan detected from IP: 10.0.0.5"])
+
+    def test_truncate_then_write_rewinds(self):
+        self.write("first\nsecond\n")
+        self.assertEqual(self.tailer.read_batch(0.5), ["first", "second"])
+        self.write("new\n", mode="w")
+        self.assertEqual(self.tailer.read_batch(0.5), ["new"])
+        self.assertEqual(self.tailer.truncations, 1)
+
+    def test_rename_and_recreate_is_followed(self):
+        self.write("before rotation\n")
+        rotated = self.path + ".1"
+        os.rename(self.path, rotated)
+        self.write("late write to the old file\n", path=rotated)
+        self.write("after rotation\n")
+        # Lines left in the old file come first, then the new file from its start
+        lines = self.tailer.read_batch(0.5)
+        lines += self.tailer.read_batch(0.05)
+        self.assertEqual(lines, ["before rotation", "late write to the old file", "after rotation"])
+        self.assertEqual(self.tailer.rotations, 1)
+
+    def test_read_timed_reports_its_own_wake_latency(self):
+        self.write("already there\n")
+        self.assertEqual(self.tailer.read_timed(0.5), (["already there"], 0.0))
+        self.assertEqual(self.tailer.read_timed(0.02), ([], 0.0))
+
+    def test_inotify_wakes_on_append(self):
+        tailer = self.open_tailer()
+        if tailer.mode != "inotify":
+            self.skipTest("inotify is not available here")
+        self.write("first\n")
+        self.assertEqual(tailer.read_batch(0.5), ["first"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import asyncio
+import json
+import unittest
+
+import websockets.exceptions  # loaded by websockets.serve() in the real server
+
+from websocket_server import Broadcaster, ClientChannel, Subscription
+
+
+class StalledSocket:
+    """A client that never reads: every send blocks until the test ends."""
+
+    remote_address = ("127.0.0.1", 0)
+
+    async def send(self, frame, text=False):
+        await asyncio.Event().wait()
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def threat(i, severity="high"):
+    return json.dumps({"type": "Port Scan", "ip": f"10.0.0.{i}", "severity": severity}).encode()
+
+
+class TestClientChannel(unittest.TestCase):
+    def queued(self, channel):
+        return [(json.loads(frame), data) for _, frame, data in channel.frames]
+
+    def test_coalesce_folds_threats_but_not_acks(self):
+        async def main():
+            channel = ClientChannel(StalledSocket(), max_queue=4, policy="coalesce")
+            await asyncio.sleep(0)
+            channel.push(threat(0), 0.0)
+            await asyncio.sleep(0)  # the writer takes frame 0 and stalls sending it
+            channel.push(threat(1), 1.0)
+            channel.push(threat(2), 2.0)
+            channel.push(b'{"action": "subscribed", "filter": null}', 3.0, data=False)
+            channel.push(threat(3), 4.0)
+            channel.push(threat(4), 5.0)  # queue full: fold
+            queued = self.queued(channel)
+            channel.close()
+            return channel, queued
+
+        channel, queued = run(main())
+        # Threat runs on either side of the ack fold separately; the ack stays a frame of its own
+        self.assertEqual([data for _, data in queued], [True, False, True, True])
+        self.assertEqual([item["ip"] for item in queued[0][0]], ["10.0.0.1", "10.0.0.2"])
+        self.assertEqual(queued[1][0], {"action": "subscribed", "filter": None})
+        self.assertEqual(queued[2][0]["ip"], "10.0.0.3")
+        self.assertEqual(queued[3][0]["ip"], "10.0.0.4")
+        self.assertEqual(channel.coalesced, 1)
+        self.assertEqual(channel.dropped, 0)
+
+    def test_drop_oldest_keeps_acks(self):
+        async def main():
+            channel = ClientChannel(StalledSocket(), max_queue=2, policy="drop-oldest")
+            channel.push(b'{"action": "unsubscribed"}', 0.0, data=False)
+            channel.push(threat(1), 1.0)
+            channel.push(threat(2), 2.0)
+            queued = self.queued(channel)
+            channel.close()
+            return channel, queued
+
+        channel, queued = run(main())
+        self.assertEqual(queued, [({"action": "unsubscribed"}, False), (json.loads(threat(2)), True)])
+        self.assertEqual(channel.dropped, 1)
+
+
+class TestSubscription(unittest.TestCase):
+    def test_string_criteria_are_single_values(self):
+        subscription = Subscription.from_message({"action": "subscribe", "types": "SQL Injection",
+                                                  "ip_prefixes": "10.0."})
+        self.assertEqual(subscription.types, frozenset({"SQL Injection"}))
+        self.assertEqual(subscription.ip_prefixes, ("10.0.",))
+        self.assertTrue(subscription.matches({"type": "SQL Injection", "ip": "10.0.3.4"}))
+        self.assertFalse(subscription.matches({"type": "S", "ip": "10.0.3.4"}))
+
+    def test_unknown_severity(self):
+        with self.assertRaises(ValueError):
+            Subscription(severity="severe")
+
+
+class TestBroadcaster(unittest.TestCase):
+    def test_subscribers_get_only_matching_threats(self):
+        async def main():
+            broadcaster = Broadcaster(max_queue=10, policy="coalesce")
+            everyone, critical = StalledSocket(), StalledSocket()
+            broadcaster.add(everyone)
+            broadcaster.add(critical)
+            ack = broadcaster.handle_control(critical, {"action": "subscribe", "severity": "critical"})
+            broadcaster.publish(b"[" + threat(1, "low") + b"," + threat(2, "critical") + b"]")
+            frames = {name: [json.loads(frame) for _, frame, _ in broadcaster.channels[ws].frames]
+                      for name, ws in (("everyone", everyone), ("critical", critical))}
+            for ws in (everyone, critical):
+                broadcaster.remove(ws)
+            return ack, frames
+
+        ack, frames = run(main())
+        self.assertEqual(ack["action"], "subscribed")
+        self.assertEqual(len(frames["everyone"][0]), 2)
+        self.assertEqual(frames["critical"], [json.loads(threat(2, "critical"))])
+
+
+if __name__ == "__main__":
+    unittest.main()
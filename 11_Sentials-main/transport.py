@@ -0,0 +1,132 @@
+# transport.py
+import json
+import logging
+import queue
+import random
+import threading
+import time
+
+import requests
+import websocket
+from requests.adapters import HTTPAdapter
+
+
+class ThreatBroadcaster:
+    """Long-lived WebSocket client that ships threat payloads off the hot path.
+
+    ``publish`` only enqueues. A background thread keeps one connection open,
+    reconnecting with exponential backoff, and when several payloads are
+    waiting it sends them together as a single JSON array frame.
+    """
+
+    def __init__(self, url, max_batch=100, max_queue=10000, connect_timeout=2.0,
+                 backoff_initial=0.5, backoff_max=30.0):
+        self.url = url
+        self.max_batch = max_batch
+        self.connect_timeout = connect_timeout
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._ws = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="threat-broadcaster", daemon=True)
+
+        self.sent_frames = 0
+        self.sent_payloads = 0
+        self.dropped = 0
+        self.reconnects = 0
+        self._thread.start()
+
+    def publish(self, payload):
+        try:
+            self._queue.put_nowait(payload)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout=5.0):
+        """Wait until everything published so far has been sent (or ``timeout`` expires)."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.005)
+        return not self._queue.unfinished_tasks
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=self.connect_timeout + 1)
+        if self._ws is not None:
+            self._ws.close()
+
+    def _connect(self):
+        delay = self.backoff_initial
+        while not self._stop.is_set():
+            try:
+                ws = websocket.create_connection(self.url, timeout=self.connect_timeout)
+                logging.info("Broadcaster connected to %s", self.url)
+                return ws
+            except Exception as e:
+                logging.error("Agent failed to connect to WebSocket server: %s (retrying in %.1fs)", e, delay)
+                self._stop.wait(delay * random.uniform(0.8, 1.2))
+                delay = min(delay * 2, self.backoff_max)
+        return None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            batch = [first]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            frame = json.dumps(batch[0] if len(batch) == 1 else batch)
+
+            while not self._stop.is_set():
+                if self._ws is None:
+                    self._ws = self._connect()
+                    if self._ws is None:
+                        break
+                try:
+                    self._ws.send(frame)
+                    self.sent_frames += 1
+                    self.sent_payloads += len(batch)
+                    break
+                except Exception as e:
+                    logging.error("Agent failed to transmit packet to WebSocket server: %s", e)
+                    try:
+                        self._ws.close()
+                    except Exception:
+                        pass
+                    self._ws = None
+                    self.reconnects += 1
+            for _ in batch:
+                self._queue.task_done()
+
+
+class FirewallClient:
+    """Keep-alive HTTP client for the Flask firewall endpoint."""
+
+    def __init__(self, url, pool_size=4, timeout=2.0, blocked_url=None):
+        self.url = url
+        self.blocked_url = blocked_url
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def block(self, ips):
+        """Block one IP or a list of IPs in a single request. Returns the response."""
+        body = {"ip": ips} if isinstance(ips, str) else {"ips": list(ips)}
+        return self.session.post(self.url, json=body, timeout=self.timeout)
+
+    def changes(self, since=0):
+        """One page of blocklist changes after cursor ``since`` (see /blocked_ips)."""
+        response = self.session.get(self.blocked_url, params={"since": since}, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def close(self):
+        self.session.close()
@@ -1,36 +1,407 @@
 # websocket_server.py
 import asyncio
+import collections
+import os
+import time
 import websockets
 import logging
 import json
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-clients = set()
+# Per-client outbound queue bound and what to do when a client falls that far behind:
+#   drop-oldest  discard the oldest queued frame (dashboards care about recent threats)
+#   drop-newest  discard the incoming frame
+#   coalesce     fold queued threat frames into JSON-array frames, up to
+#                WS_COALESCE_MAX_BYTES; past that the oldest threat frame is dropped
+# Control frames (subscription acks) are never folded or dropped in favour of threat frames
+CLIENT_QUEUE_SIZE = int(os.environ.get("WS_CLIENT_QUEUE_SIZE", "256"))
+COALESCE_MAX_BYTES = int(os.environ.get("WS_COALESCE_MAX_BYTES", str(1 << 20)))
+SLOW_CLIENT_POLICY = os.environ.get("WS_SLOW_CLIENT_POLICY", "coalesce")
+STATS_INTERVAL = float(os.environ.get("WS_STATS_INTERVAL", "30"))
+POLICIES = ("drop-oldest", "drop-newest", "coalesce")
+SEVERITY_RANK = {"low": 0, "medium": 1, "high": 2, "critical": 3}
+
+
+def _array_items(frame):
+    # Body of a JSON frame as array items: b"[a,b]" -> b"a,b", b"{...}" -> b"{...}"
+    stripped = frame.strip()
+    return stripped[1:-1] if stripped.startswith(b"[") else stripped
+
+
+def _control_message(frame):
+    # Subscription requests are small JSON objects with an "action" key; threat
+    # frames never carry one, so most frames skip the parse entirely
+    if not frame.lstrip().startswith(b"{") or b'"action"' not in frame:
+        return None
+    try:
+        message = json.loads(frame)
+    except ValueError:
+        return None
+    return message if isinstance(message, dict) and "action" in message else None
+
+
+class ClientChannel:
+    """One connected dashboard: a bounded frame queue drained by its own writer task."""
+
+    def __init__(self, websocket, max_queue, policy, max_coalesce_bytes=COALESCE_MAX_BYTES):
+        self.websocket = websocket
+        self.max_queue = max_queue
+        self.policy = policy
+        self.max_coalesce_bytes = max_coalesce_bytes
+        self.frames = collections.deque()  # (enqueued_at, utf-8 frame, is threat data)
+        self.sending_since = None
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.subscription = None
+        self._ready = asyncio.Event()
+        self._task = asyncio.create_task(self._writer())
+
+    def push(self, frame, now, data=True):
+        """Queue ``frame``; ``data=False`` marks a control frame (e.g. an ack) that is never folded."""
+        if len(self.frames) >= self.max_queue:
+            if self.policy == "drop-newest":
+                self.dropped += 1
+                return
+            if self.policy != "coalesce" or not self._coalesce():
+                self._drop_oldest()
+        self.frames.append((now, frame, data))
+        self._ready.set()
+
+    def _coalesce(self):
+        """Fold each run of consecutive threat frames into one array frame; True if a slot freed up."""
+        merged = collections.deque()
+        run = []
+        for queued in self.frames:
+            if queued[2]:
+                run.append(queued)
+                continue
+            self._fold(run, merged)
+            merged.append(queued)
+        self._fold(run, merged)
+        self.frames = merged
+        return len(merged) < self.max_queue
+
+    def _fold(self, run, out):
+        if len(run) > 1:
+            items = b",".join(_array_items(frame) for _, frame, _ in run)
+            if len(items) <= self.max_coalesce_bytes:
+                # Keep the oldest timestamp so lag still reflects how far behind the client is
+                self.coalesced += len(run) - 1
+                out.append((run[0][0], b"[" + items + b"]", True))
+                run.clear()
+                return
+        out.extend(run)
+        run.clear()
+
+    def _drop_oldest(self):
+        # Shed the oldest threat frame; control frames only go if nothing else is queued
+        for i, (_, _, data) in enumerate(self.frames):
+            if data:
+                del self.frames[i]
+                break
+        else:
+            self.frames.popleft()
+        self.dropped += 1
+
+    def lag(self, now=None):
+        """Seconds the oldest undelivered frame has been waiting (0 when caught up)."""
+        oldest = self.sending_since if self.sending_since is not None else (
+            self.frames[0][0] if self.frames else None)
+        if oldest is None:
+            return 0.0
+        return (now or time.monotonic()) - oldest
+
+    async def _writer(self):
+        try:
+            while True:
+                await self._ready.wait()
+                self._ready.clear()
+                while self.frames:
+                    # Off the queue before sending, so coalescing never folds in a frame already in flight
+                    self.sending_since, frame, _ = self.frames.popleft()
+                    await self.websocket.send(frame, text=True)
+                    self.sending_since = None
+                    self.sent += 1
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
+    def close(self):
+        self._task.cancel()
+
+    def stats(self, now):
+        return {
+            "queued": len(self.frames),
+            "lag_ms": round(self.lag(now) * 1000, 1),
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "filter": self.subscription.as_dict() if self.subscription else None,
+        }
+
+
+class Subscription:
+    """What a client asked to receive. Unset criteria match anything; set ones must all match.
+
+    Clients opt in with a control frame such as
+    ``{"action": "subscribe", "severity": "high", "types": ["SQL Injection"], "ip_prefixes": ["10.0."]}``
+    and go back to receiving everything with ``{"action": "unsubscribe"}``.
+    """
+
+    __slots__ = ("min_severity", "types", "ip_prefixes")
+
+    def __init__(self, severity=None, types=None, ip_prefixes=None):
+        if severity is not None and str(severity).lower() not in SEVERITY_RANK:
+            raise ValueError(f"Unknown severity {severity!r}; expected one of {list(SEVERITY_RANK)}")
+        self.min_severity = SEVERITY_RANK[str(severity).lower()] if severity is not None else None
+        # A bare string is one value, not a collection of characters
+        if isinstance(types, str):
+            types = [types]
+        if isinstance(ip_prefixes, str):
+            ip_prefixes = [ip_prefixes]
+        self.types = frozenset(types) if types else None
+        self.ip_prefixes = tuple(ip_prefixes) if ip_prefixes else None
+
+    @classmethod
+    def from_message(cls, message):
+        return cls(message.get("severity"), message.get("types"), message.get("ip_prefixes"))
+
+    @property
+    def empty(self):
+        return self.min_severity is None and self.types is None and self.ip_prefixes is None
+
+    def matches(self, item):
+        if self.types is not None and item.get("type") not in self.types:
+            return False
+        if self.ip_prefixes is not None and not str(item.get("ip", "")).startswith(self.ip_prefixes):
+            return False
+        if self.min_severity is not None:
+            rank = SEVERITY_RANK.get(str(item.get("severity", "")).lower())
+            if rank is None or rank < self.min_severity:
+                return False
+        return True
+
+    def as_dict(self):
+        severity = next((name for name, rank in SEVERITY_RANK.items() if rank == self.min_severity), None)
+        return {"severity": severity,
+                "types": sorted(self.types) if self.types else None,
+                "ip_prefixes": list(self.ip_prefixes) if self.ip_prefixes else None}
+
+
+class SubscriptionIndex:
+    """Finds the filtered channels a threat could match without visiting every client.
+
+    Each subscription is filed under its most selective criterion: attack
+    type, else IP prefix, else minimum severity. A lookup only gathers the
+    buckets for the item's own type, the prefixes of its IP and the severity
+    levels at or below it, then checks the remaining criteria on those few
+    candidates.
+    """
+
+    def __init__(self):
+        self.by_type = {}
+        self.by_prefix = {}
+        self.by_severity = [set() for _ in SEVERITY_RANK]
+        self._keys = {}  # channel -> list of (bucket dict or list, key)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, channel, subscription):
+        self.discard(channel)
+        if subscription.types is not None:
+            keys = [(self.by_type, attack_type) for attack_type in subscription.types]
+        elif subscription.ip_prefixes is not None:
+            keys = [(self.by_prefix, prefix) for prefix in subscription.ip_prefixes]
+        else:
+            keys = [(self.by_severity, subscription.min_severity)]
+        for buckets, key in keys:
+            if isinstance(buckets, dict):
+                buckets.setdefault(key, set()).add(channel)
+            else:
+                buckets[key].add(channel)
+        self._keys[channel] = keys
+
+    def discard(self, channel):
+        for buckets, key in self._keys.pop(channel, ()):
+            bucket = buckets[key]
+            bucket.discard(channel)
+            if not bucket and isinstance(buckets, dict):
+                del buckets[key]
+
+    def match(self, item):
+        candidates = set()
+        bucket = self.by_type.get(item.get("type"))
+        if bucket:
+            candidates.update(bucket)
+        if self.by_prefix:
+            ip = str(item.get("ip", ""))
+            for end in range(1, len(ip) + 1):
+                bucket = self.by_prefix.get(ip[:end])
+                if bucket:
+                    candidates.update(bucket)
+        rank = SEVERITY_RANK.get(str(item.get("severity", "")).lower())
+        if rank is not None:
+            for level in range(rank + 1):
+                candidates.update(self.by_severity[level])
+        return [channel for channel in candidates if channel.subscription.matches(item)]
+
+
+class Broadcaster:
+    """Fans each incoming frame out to every other client without waiting on any of them.
+
+    A frame is UTF-8 encoded once and the same bytes are queued for every
+    client and sent as a text frame, so nothing is re-encoded per client. A
+    client that stops reading only grows its own queue, which is bounded by
+    ``max_queue`` and shed according to ``policy``.
+
+    Clients without a subscription get every frame untouched. Frames are
+    only parsed once some client has subscribed, and then only the matching
+    subscribers are visited; each threat is encoded once for all of them.
+    """
+
+    def __init__(self, max_queue=CLIENT_QUEUE_SIZE, policy=SLOW_CLIENT_POLICY):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown slow-client policy {policy!r}; expected one of {POLICIES}")
+        self.max_queue = max_queue
+        self.policy = policy
+        self.channels = {}
+        self.index = SubscriptionIndex()
+        self.published = 0
+
+    def add(self, websocket):
+        channel = self.channels[websocket] = ClientChannel(websocket, self.max_queue, self.policy)
+        return channel
+
+    def remove(self, websocket):
+        channel = self.channels.pop(websocket, None)
+        if channel:
+            self.index.discard(channel)
+            channel.close()
+
+    def subscribe(self, websocket, subscription):
+        """Route only matching threats to ``websocket``; None restores the firehose."""
+        channel = self.channels[websocket]
+        if subscription is not None and subscription.empty:
+            subscription = None
+        channel.subscription = subscription
+        if subscription is None:
+            self.index.discard(channel)
+        else:
+            self.index.add(channel, subscription)
+
+    def publish(self, frame, exclude=None):
+        if isinstance(frame, str):
+            frame = frame.encode("utf-8")
+        now = time.monotonic()
+        self.published += 1
+        if not self.index:
+            for websocket, channel in self.channels.items():
+                if websocket is not exclude:
+                    channel.push(frame, now)
+            return
+
+        for websocket, channel in self.channels.items():
+            if websocket is not exclude and channel.subscription is None:
+                channel.push(frame, now)
+        try:
+            data = json.loads(frame)
+        except ValueError:
+            return
+        items = data if isinstance(data, list) else [data]
+        routed = {}  # channel -> indexes of the items it matched
+        for i, item in enumerate(items):
+            if isinstance(item, dict):
+                for channel in self.index.match(item):
+                    if channel.websocket is not exclude:
+                        routed.setdefault(channel, []).append(i)
+        if not routed:
+            return
+        encoded = {}
+        for channel, matched in routed.items():
+            if len(matched) == len(items):
+                channel.push(frame, now)
+                continue
+            for i in matched:
+                if i not in encoded:
+                    encoded[i] = json.dumps(items[i]).encode("utf-8")
+            parts = [encoded[i] for i in matched]
+            channel.push(parts[0] if len(parts) == 1 else b"[" + b",".join(parts) + b"]", now)
+
+    def handle_control(self, websocket, message):
+        """Apply a subscribe/unsubscribe frame; returns the acknowledgement to send back."""
+        action = message.get("action")
+        if action == "subscribe":
+            try:
+                subscription = Subscription.from_message(message)
+            except ValueError as e:
+                return {"action": "error", "error": str(e)}
+            self.subscribe(websocket, subscription)
+            return {"action": "subscribed", "filter": subscription.as_dict() if not subscription.empty else None}
+        if action == "unsubscribe":
+            self.subscribe(websocket, None)
+            return {"action": "unsubscribed"}
+        return {"action": "error", "error": f"Unknown action {action!r}"}
+
+    def stats(self):
+        now = time.monotonic()
+        clients = {f"{ws.remote_address[0]}:{ws.remote_address[1]}" if ws.remote_address else str(id(ws)):
+                   channel.stats(now) for ws, channel in self.channels.items()}
+        lags = [client["lag_ms"] for client in clients.values()]
+        return {
+            "clients": len(clients),
+            "published": self.published,
+            "max_lag_ms": max(lags, default=0.0),
+            "dropped": sum(client["dropped"] for client in clients.values()),
+            "coalesced": sum(client["coalesced"] for client in clients.values()),
+            "subscribed": len(self.index),
+            "per_client": clients,
+        }
+
+
+broadcaster = None
+
 
 async def handle_connection(websocket, path=None):
-    clients.add(websocket)
-    logging.info("New socket client connected. Registry count: %d", len(clients))
+    broadcaster.add(websocket)
+    logging.info("New socket client connected. Registry count: %d", len(broadcaster.channels))
     try:
-        async for message in websocket:
+        while True:
+            # Raw UTF-8 payload; it is fanned out as-is without a decode/encode round trip
+            message = await websocket.recv(decode=False)
+            control = _control_message(message)
+            if control is not None:
+                ack = broadcaster.handle_control(websocket, control)
+                broadcaster.channels[websocket].push(json.dumps(ack).encode("utf-8"), time.monotonic(), data=False)
+                continue
             # Broadcast the incoming threat message to all OTHER connected clients (frontend displays)
-            targets = [client for client in clients if client != websocket]
-            if targets:
-                # Send concurrently
-                await asyncio.gather(*[client.send(message) for client in targets])
+            broadcaster.publish(message, exclude=websocket)
     except websockets.exceptions.ConnectionClosed:
         logging.info("Socket client connection closed.")
     finally:
-        clients.remove(websocket)
-        logging.info("Client removed from registry. Count remaining: %d", len(clients))
+        broadcaster.remove(websocket)
+        logging.info("Client removed from registry. Count remaining: %d", len(broadcaster.channels))
+
+
+async def report_stats(interval=STATS_INTERVAL):
+    while True:
+        await asyncio.sleep(interval)
+        stats = broadcaster.stats()
+        stats.pop("per_client")
+        logging.info("Broadcaster stats: %s", json.dumps(stats))
+
 
-async def start_server():
-    async with websockets.serve(handle_connection, "localhost", 8765):
-        logging.info("Broadcaster active on ws://localhost:8765")
-        await asyncio.Future()  # run forever
+async def start_server(host="localhost", port=8765):
+    global broadcaster
+    broadcaster = Broadcaster()
+    async with websockets.serve(handle_connection, host, port):
+        logging.info("Broadcaster active on ws://%s:%d (policy=%s, queue=%d)",
+                     host, port, broadcaster.policy, broadcaster.max_queue)
+        await report_stats()  # run forever
 
 if __name__ == "__main__":
     try:
         asyncio.run(start_server())
     except KeyboardInterrupt:
-        logging.info("Broadcaster stopped.")
\ No newline at end of file
+        logging.info("Broadcaster stopped.")
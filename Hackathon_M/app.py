@@ -1,20 +1,95 @@
-from flask import Flask, render_template, jsonify, request
-import psutil
+from flask import Flask, Response, render_template, jsonify, request
 import socket
 import time
 import os
+import queue
 import random
 import sqlite3
+import threading
+
+from db import (
+    get_pool, get_writer, migrate, COUNT_INCIDENTS_SQL,
+    INSERT_INCIDENT_SQL, DEFEND_IP_SQL, DEFEND_NETWORK_SQL, PING_SQL,
+    INCIDENT_COLUMNS, INCIDENTS_SINCE_SQL, LAST_INCIDENT_ID_SQL
+)
+from sampler import get_sampler
+from metrics_store import MetricsStore, MetricsRecorder
+from blocklist import LOOPBACK_NETWORKS, Blocklist
+from ratelimit import RateLimiter
+from state import SharedState
+from stream import StreamHub, Subscriber
 
 app = Flask(__name__)
 
-servers = []
-blocked_ips = set()
-auto_defend = True
-connected_db = None
+blocklist = None  # Blocklist of IPs / CIDR ranges, shared with other workers through BLOCKLIST_DB
+_blocklist_lock = threading.Lock()
+state = None  # auto_defend, connected_db and servers, shared with other workers through STATE_DB
+_state_lock = threading.Lock()
+# This worker's ConnectionPool and group-commit writer for the connected SQLite file, if any
+_incident_store = (None, None, None)  # (database, pool, writer)
+stream_hub = None  # Computes /stream updates once per tick for every subscriber in this worker
+_stream_lock = threading.Lock()
+_incident_cursor = (None, 0)  # (database path, last incident id sent on /stream)
+
+# Settings every worker must agree on live in STATE_DB; these are their initial values
+STATE_DB = os.environ.get('STATE_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'state.db'))
+STATE_DEFAULTS = {'auto_defend': True, 'connected_db': None, 'servers': []}
+
+# Incident write batching (group commit) tuning
+INCIDENT_BATCH_SIZE = int(os.environ.get('INCIDENT_BATCH_SIZE', 500))
+INCIDENT_FLUSH_MS = float(os.environ.get('INCIDENT_FLUSH_MS', 50))
+INCIDENT_QUEUE_SIZE = int(os.environ.get('INCIDENT_QUEUE_SIZE', 10000))
+
+# Seconds between background psutil samples served by /system_info
+SYSTEM_SAMPLE_INTERVAL = float(os.environ.get('SYSTEM_SAMPLE_INTERVAL', 1.0))
+
+# Time-series history of the sampler's numbers, served by /metrics_history
+METRICS_DB = os.environ.get('METRICS_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'metrics.db'))
+METRICS_FLUSH_S = float(os.environ.get('METRICS_FLUSH_S', 5.0))
+SYSTEM_SERIES = ('cpu_percent', 'memory_percent', 'disk_percent', 'bytes_sent', 'bytes_recv', 'process_count')
+# Agents post their own series to /record_metrics; system.* is reserved for the sampler
+AGENT_SERIES_PREFIX = 'agent.'
+RECORD_METRICS_MAX_SAMPLES = int(os.environ.get('RECORD_METRICS_MAX_SAMPLES', 10000))
+metrics_store = None
+metrics_recorder = None
+
+# Blocklist persistence and /blocked_ips page size
+BLOCKLIST_DB = os.environ.get('BLOCKLIST_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'blocklist.db'))
+BLOCKLIST_PAGE_SIZE = int(os.environ.get('BLOCKLIST_PAGE_SIZE', 1000))
+# Shortest CIDR prefix /block_ip accepts, and extra comma-separated ranges it never blocks
+# (loopback is always protected)
+BLOCKLIST_MIN_PREFIX = {
+    4: int(os.environ.get('BLOCKLIST_MIN_PREFIX_V4', 8)),
+    6: int(os.environ.get('BLOCKLIST_MIN_PREFIX_V6', 32)),
+}
+BLOCKLIST_PROTECTED = LOOPBACK_NETWORKS + tuple(
+    network.strip() for network in os.environ.get('BLOCKLIST_PROTECTED', '').split(',') if network.strip())
+
+# /stream: seconds between updates, idle keepalive, incidents per update, per-client backlog
+STREAM_INTERVAL_S = float(os.environ.get('STREAM_INTERVAL_S', 2.0))
+STREAM_HEARTBEAT_S = float(os.environ.get('STREAM_HEARTBEAT_S', 15.0))
+STREAM_INCIDENT_LIMIT = int(os.environ.get('STREAM_INCIDENT_LIMIT', 100))
+STREAM_MAX_PENDING = int(os.environ.get('STREAM_MAX_PENDING', 32))
+
+# Sources the block filter and rate limiter never apply to: loopback, where the dashboard,
+# agents and simulator connect from, plus comma-separated FILTER_ALLOWLIST addresses/ranges
+FILTER_ALLOWLIST = LOOPBACK_NETWORKS + tuple(
+    network.strip() for network in os.environ.get('FILTER_ALLOWLIST', '').split(',') if network.strip())
+filter_allowlist = Blocklist()
+filter_allowlist.update(FILTER_ALLOWLIST)
 
-# Attacker details
-ATTACKER_IPS = ["192.168.1.101", "10.0.0.5", "203.0.113.45"]
+# Per-source-IP token bucket applied to every other request; RATE_LIMIT_RPS=0 turns it off
+RATE_LIMIT_RPS = float(os.environ.get('RATE_LIMIT_RPS', 100))
+RATE_LIMIT_BURST = float(os.environ.get('RATE_LIMIT_BURST', 200))
+RATE_LIMIT_MAX_CLIENTS = int(os.environ.get('RATE_LIMIT_MAX_CLIENTS', 100000))
+rate_limiter = RateLimiter(RATE_LIMIT_RPS, RATE_LIMIT_BURST, RATE_LIMIT_MAX_CLIENTS) if RATE_LIMIT_RPS > 0 else None
+
+# /connect_db reachability probe
+CONNECT_TIMEOUT_S = float(os.environ.get('CONNECT_TIMEOUT_S', 3.0))
+DEFAULT_PORTS = {'mysql': 3306, 'postgresql': 5432, 'mongodb': 27017}
+
+# Attacker details: documentation ranges (RFC 5737) only, so auto-defend never blocks a real LAN host
+ATTACKER_IPS = ["192.0.2.101", "198.51.100.5", "203.0.113.45"]
 MALICIOUS_LOGS = [
     "Brute force attack detected from IP: {}",
     "Failed login attempt from IP: {}",
@@ -23,6 +98,68 @@ MALICIOUS_LOGS = [
     "Port scan detected from IP: {}"
 ]
 
+def get_blocklist():
+    global blocklist
+    if blocklist is None:
+        with _blocklist_lock:
+            if blocklist is None:
+                blocklist = Blocklist(BLOCKLIST_DB, min_prefix=BLOCKLIST_MIN_PREFIX, protected=BLOCKLIST_PROTECTED)
+    return blocklist
+
+def get_state():
+    global state
+    if state is None:
+        with _state_lock:
+            if state is None:
+                state = SharedState(STATE_DB, STATE_DEFAULTS)
+    return state
+
+def get_incident_store(db):
+    """Return (pool, writer) for the connected SQLite database ``db``, opened once per worker."""
+    global _incident_store
+    if not db or not (db['type'] == 'sqlite' or db['database'].endswith('.db')):
+        return None, None
+    database, pool, writer = _incident_store
+    if database != db['database']:
+        # First use in this worker, or another worker switched databases: follow it
+        try:
+            pool = get_pool(db['database'])
+            migrate(pool)
+            writer = get_writer(
+                pool.path,
+                max_batch=INCIDENT_BATCH_SIZE,
+                max_latency=INCIDENT_FLUSH_MS / 1000.0,
+                max_queue=INCIDENT_QUEUE_SIZE
+            )
+        except Exception as e:
+            print(f"Error initializing SQLite incidents table: {e}")
+            return None, None
+        _incident_store = (db['database'], pool, writer)
+    return pool, writer
+
+def screen_client(ip):
+    """Return (status, retry_after) for a source that must be turned away, else None."""
+    if ip is None or filter_allowlist.lookup(ip) is not None:
+        return None
+    if get_blocklist().lookup(ip) is not None:
+        return 403, None
+    if rate_limiter is not None:
+        retry_after = rate_limiter.hit(ip)
+        if retry_after:
+            return 429, retry_after
+    return None
+
+@app.before_request
+def filter_request():
+    # Runs before any handler, so blocked or flooding sources never reach JSON parsing or the DB
+    rejected = screen_client(request.remote_addr)
+    if rejected is None:
+        return None
+    status, retry_after = rejected
+    if status == 403:
+        return jsonify({'error': 'Source IP is blocked'}), 403
+    return jsonify({'error': 'Rate limit exceeded'}), 429, {'Retry-After': str(max(1, round(retry_after)))}
+
 # Manual CORS handler to avoid requiring flask-cors pip dependency
 @app.after_request
 def after_request(response):
@@ -37,144 +174,160 @@ def index():
 
 @app.route('/system_info')
 def system_info():
-    cpu_percent = psutil.cpu_percent(interval=1)
-    memory_info = psutil.virtual_memory()
-    disk_usage = psutil.disk_usage('/')
-    network_info = psutil.net_io_counters()
-
-    # Heavy processes list
-    processes = []
-    for proc in psutil.process_iter(attrs=['pid', 'name', 'cpu_percent']):
+    # Served from the background sampler's latest snapshot; never blocks on psutil
+    return jsonify(get_sampler(SYSTEM_SAMPLE_INTERVAL).snapshot())
+
+def metrics_page(args):
+    """/metrics_history for the query ``args``; returns (payload, status)."""
+    # ?series=system.cpu_percent&start=<epoch s>&end=<epoch s>&resolution=auto|raw|1m|1h&max_points=1000
+    store = get_metrics_store()
+    name = args.get('series')
+    if not name:
+        return {'series': store.series()}, 200
+    try:
+        end = float(args.get('end', time.time()))
+        start = float(args.get('start', end - 3600))
+        max_points = int(args.get('max_points', 1000))
+        resolution, step, points = store.query(name, start, end, args.get('resolution', 'auto'), max_points)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    return {
+        'series': name,
+        'resolution': resolution,
+        'step_s': step,
+        'columns': ['ts', 'avg', 'min', 'max'],
+        'points': points
+    }, 200
+
+@app.route('/metrics_history')
+def metrics_history():
+    payload, status = metrics_page(request.args)
+    return jsonify(payload), status
+
+def record_metrics(data):
+    """Store a /record_metrics body {"samples": [[name, ts, value], ...]}; returns (payload, status)."""
+    samples = data.get('samples')
+    if not isinstance(samples, list) or len(samples) > RECORD_METRICS_MAX_SAMPLES:
+        return {'error': f'samples must be a list of at most {RECORD_METRICS_MAX_SAMPLES} entries'}, 400
+    rows = []
+    for sample in samples:
         try:
-            proc_info = proc.info
-            if proc_info['cpu_percent'] > 10:
-                processes.append(f"{proc_info['name']} (PID: {proc_info['pid']})")
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-            pass
-
-    system_data = {
-        'cpu_percent': cpu_percent,
-        'memory_percent': memory_info.percent,
-        'disk_percent': disk_usage.percent,
-        'bytes_sent': network_info.bytes_sent,
-        'bytes_recv': network_info.bytes_recv,
-        'heavy_processes': processes
-    }
+            name, ts, value = sample
+            ts, value = float(ts), float(value)
+        except (TypeError, ValueError):
+            return {'error': 'each sample must be [name, ts, value]'}, 400
+        if not isinstance(name, str) or not name.startswith(AGENT_SERIES_PREFIX):
+            return {'error': f'series names must start with {AGENT_SERIES_PREFIX!r}'}, 400
+        rows.append((name, ts, value))
+    try:
+        recorded = get_metrics_store().write(rows)
+    except sqlite3.Error as e:
+        return {'error': f'Failed to store metrics: {e}'}, 503
+    return {'recorded': recorded}, 200
 
-    return jsonify(system_data)
+@app.route('/record_metrics', methods=['POST', 'OPTIONS'])
+def record_metrics_endpoint():
+    if request.method == 'OPTIONS':
+        return jsonify({'message': 'ok'})
+    payload, status = record_metrics(request.json or {})
+    return jsonify(payload), status
 
-@app.route('/db_status', methods=['GET'])
-def get_db_status():
-    global connected_db
-    if connected_db:
-        # Re-query metrics in real-time
-        db_type = connected_db['type']
-        database = connected_db['database']
-        tables_count = 0
-        db_size = 0.0
-        active_conns = 1
-        latency = connected_db.get('latency_ms', 5.0)
-
-        if db_type == 'sqlite' or database.endswith('.db'):
-            db_path = database if os.path.exists(database) else os.path.join(os.getcwd(), database)
-            if os.path.exists(db_path):
-                try:
-                    conn = sqlite3.connect(db_path)
-                    cursor = conn.cursor()
-                    cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-                    tables = cursor.fetchall()
-                    tables_count = len(tables)
-                    
-                    # Also count rows in security_incidents if it exists
-                    try:
-                        cursor.execute("SELECT COUNT(*) FROM security_incidents;")
-                        incidents_count = cursor.fetchone()[0]
-                        # Mock connections based on threat count slightly
-                        active_conns = min(15, 1 + (incidents_count // 3))
-                    except:
-                        pass
-                        
-                    conn.close()
-                    db_size = round(os.path.getsize(db_path) / (1024 * 1024), 3)  # size in MB
-                except:
-                    tables_count = 0
-                    db_size = 0.0
-        else:
-            # Fallback deterministic stats for other simulated DB types
-            seed = sum(ord(c) for c in database) if database else 42
-            active_conns = (seed % 15) + 3
-            tables_count = (seed % 28) + 6
-            db_size = round(((seed % 800) / 10.0) + 0.8, 1)
+def get_metrics_store():
+    global metrics_store
+    if metrics_store is None:
+        metrics_store = MetricsStore(METRICS_DB)
+    return metrics_store
 
-        connected_db['tables_count'] = tables_count
-        connected_db['db_size_mb'] = db_size
-        connected_db['active_connections'] = active_conns
+def start_metrics_recording():
+    """Persist every sampler snapshot into the metrics store."""
+    global metrics_recorder
+    if metrics_recorder is not None:
+        return metrics_recorder
+    metrics_recorder = MetricsRecorder(get_metrics_store(), flush_interval=METRICS_FLUSH_S).start()
+    get_sampler(SYSTEM_SAMPLE_INTERVAL).add_listener(
+        lambda snapshot: metrics_recorder.record_many(
+            {f'system.{key}': snapshot[key] for key in SYSTEM_SERIES}, snapshot['sampled_at']
+        )
+    )
+    return metrics_recorder
 
-        return jsonify({
-            'connected': True,
-            'db': connected_db
-        })
+def db_status():
+    """The connected database with freshly queried stats, or None if nothing is connected."""
+    connected_db = get_state().get('connected_db')
+    if not connected_db:
+        return None
+    connected_db = dict(connected_db)  # the shared cached copy stays untouched
+    # Re-query metrics in real-time
+    db_type = connected_db['type']
+    database = connected_db['database']
+    tables_count = 0
+    db_size = 0.0
+    active_conns = 1
+
+    if db_type == 'sqlite' or database.endswith('.db'):
+        incident_db, _ = get_incident_store(connected_db)
+        if incident_db is not None and os.path.exists(incident_db.path):
+            try:
+                tables_count = incident_db.table_count()
+
+                # Also count rows in security_incidents (O(1) via the incident_summary table)
+                try:
+                    incidents_count = incident_db.query(COUNT_INCIDENTS_SQL)[0][0]
+                    # Mock connections based on threat count slightly
+                    active_conns = min(15, 1 + (incidents_count // 3))
+                except sqlite3.Error:
+                    pass
+
+                db_size = round(os.path.getsize(incident_db.path) / (1024 * 1024), 3)  # size in MB
+            except:
+                tables_count = 0
+                db_size = 0.0
     else:
-        return jsonify({
-            'connected': False
-        })
+        # Fallback deterministic stats for other simulated DB types
+        seed = sum(ord(c) for c in database) if database else 42
+        active_conns = (seed % 15) + 3
+        tables_count = (seed % 28) + 6
+        db_size = round(((seed % 800) / 10.0) + 0.8, 1)
 
-@app.route('/connect_db', methods=['POST', 'OPTIONS'])
-def connect_db():
-    global connected_db
-    if request.method == 'OPTIONS':
-        return jsonify({'message': 'ok'})
-        
-    data = request.json or {}
+    connected_db['tables_count'] = tables_count
+    connected_db['db_size_mb'] = db_size
+    connected_db['active_connections'] = active_conns
+    return connected_db
+
+def connect_target(data):
+    """(db_type, host, port, database) from a /connect_db body; ValueError for a bad port."""
     db_type = data.get('type', 'mysql')
     host = data.get('host', '127.0.0.1')
     port = data.get('port')
     database = data.get('database', '')
-    username = data.get('username', '')
-    
-    # Bypass port scans and TCP pings for SQLite
     if db_type == 'sqlite':
-        if not database:
-            database = 'sqlite_default.db'
-        
-        db_path = database if os.path.exists(database) else os.path.join(os.getcwd(), database)
-        start_time = time.time()
-        try:
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-            cursor.execute("SELECT 1;")
-            cursor.close()
-            conn.close()
-            latency = (time.time() - start_time) * 1000  # in ms
-        except Exception as e:
-            return jsonify({
-                'error': f'Failed to connect/initialize SQLite database file. Reason: {str(e)}'
-            }), 400
+        database = database or 'sqlite_default.db'
     else:
-        if not port:
-            if db_type == 'mysql': port = 3306
-            elif db_type == 'postgresql': port = 5432
-            elif db_type == 'mongodb': port = 27017
-            else: port = 80
-            
-        try:
-            port = int(port)
-        except ValueError:
-            return jsonify({'error': 'Invalid port number'}), 400
+        port = int(port or DEFAULT_PORTS.get(db_type, 80))
+    return db_type, host, port, database
 
-        # Try TCP socket connection to test host/port reachability
-        start_time = time.time()
-        try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(3.0)
-            sock.connect((host, port))
-            sock.close()
-            latency = (time.time() - start_time) * 1000  # in ms
-        except Exception as e:
-            return jsonify({
-                'error': f'Failed to connect to {host} on port {port}. Reason: {str(e)}'
-            }), 400
+def probe_sqlite(database):
+    """Open (creating if needed) the SQLite file and return the round trip in ms."""
+    start_time = time.time()
+    get_pool(database).query(PING_SQL)
+    return (time.time() - start_time) * 1000
 
+def probe_tcp(host, port):
+    """TCP connect to host:port and return the handshake time in ms."""
+    start_time = time.time()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.settimeout(CONNECT_TIMEOUT_S)
+    sock.connect((host, port))
+    sock.close()
+    return (time.time() - start_time) * 1000
+
+def probe_error(db_type, host, port, e):
+    if db_type == 'sqlite':
+        return f'Failed to connect/initialize SQLite database file. Reason: {str(e)}'
+    return f'Failed to connect to {host} on port {port}. Reason: {str(e)}'
+
+def register_connection(db_type, host, port, database, latency):
+    """Make a probed database the connected one for every worker; returns the /connect_db payload."""
     # Initialize connected DB metadata
     connected_db = {
         'type': db_type,
@@ -184,26 +337,10 @@ def connect_db():
         'latency_ms': round(latency, 2)
     }
 
-    # Ensure table exists in target SQLite
+    # Ensure tables, indexes and summary counters exist in target SQLite
+    incident_db = None
     if db_type == 'sqlite' or (database and database.endswith('.db')):
-        db_path = database if os.path.exists(database) else os.path.join(os.getcwd(), database)
-        try:
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS security_incidents (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TEXT,
-                    type TEXT,
-                    ip TEXT,
-                    details TEXT,
-                    status TEXT
-                );
-            """)
-            conn.commit()
-            conn.close()
-        except Exception as e:
-            print(f"Error initializing SQLite incidents table: {e}")
+        incident_db, _ = get_incident_store(connected_db)
 
     # Calculate initial stats to return
     tables_count = 0
@@ -211,16 +348,10 @@ def connect_db():
     active_conns = 1
 
     if db_type == 'sqlite' or (database and database.endswith('.db')):
-        db_path = database if os.path.exists(database) else os.path.join(os.getcwd(), database)
-        if os.path.exists(db_path):
+        if incident_db is not None and os.path.exists(incident_db.path):
             try:
-                conn = sqlite3.connect(db_path)
-                cursor = conn.cursor()
-                cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-                tables = cursor.fetchall()
-                tables_count = len(tables)
-                conn.close()
-                db_size = round(os.path.getsize(db_path) / (1024 * 1024), 3)  # size in MB
+                tables_count = incident_db.table_count()
+                db_size = round(os.path.getsize(incident_db.path) / (1024 * 1024), 3)  # size in MB
             except:
                 tables_count = 1
                 db_size = 0.01
@@ -233,8 +364,9 @@ def connect_db():
     connected_db['tables_count'] = tables_count
     connected_db['db_size_mb'] = db_size
     connected_db['active_connections'] = active_conns
+    get_state().set('connected_db', connected_db)
 
-    return jsonify({
+    return {
         'status': 'connected',
         'type': db_type,
         'host': host,
@@ -244,15 +376,92 @@ def connect_db():
         'active_connections': active_conns,
         'db_size_mb': db_size,
         'tables_count': tables_count
-    })
+    }
 
-# SIMULATOR ENDPOINTS
-@app.route('/launch_attack', methods=['POST', 'OPTIONS'])
-def launch_attack():
-    global connected_db, auto_defend
+def db_status_payload():
+    connected_db = db_status()
+    if connected_db:
+        return {
+            'connected': True,
+            'db': connected_db
+        }
+    else:
+        return {
+            'connected': False
+        }
+
+@app.route('/db_status', methods=['GET'])
+def get_db_status():
+    return jsonify(db_status_payload())
+
+def new_incidents():
+    """Incidents committed since the previous call, for /stream; None if there are none."""
+    global _incident_cursor
+    incident_db, _ = get_incident_store(get_state().get('connected_db'))
+    if incident_db is None:
+        return None
+    database, last_id = _incident_cursor
+    if database != incident_db.path:
+        # Newly connected: the stream carries new incidents, not the history
+        _incident_cursor = (incident_db.path, incident_db.query(LAST_INCIDENT_ID_SQL)[0][0])
+        return None
+    rows = incident_db.query(INCIDENTS_SINCE_SQL, (last_id, STREAM_INCIDENT_LIMIT))
+    if not rows:
+        return None
+    _incident_cursor = (database, rows[-1][0])
+    return {'incidents': [dict(zip(INCIDENT_COLUMNS, row)) for row in rows]}
+
+def get_stream_hub():
+    global stream_hub
+    if stream_hub is None:
+        with _stream_lock:
+            if stream_hub is None:
+                stream_hub = StreamHub(
+                    STREAM_INTERVAL_S,
+                    state_sources={
+                        'system': lambda: get_sampler(SYSTEM_SAMPLE_INTERVAL).snapshot(),
+                        'db': db_status_payload,
+                    },
+                    event_sources={'incidents': new_incidents}
+                )
+    return stream_hub
+
+@app.route('/stream')
+def stream():
+    # Server-sent events: "system" (as /system_info), "db" (as /db_status) and "incidents".
+    # Each open stream holds one request thread; see serve.py --asgi for many dashboards.
+    hub = get_stream_hub()
+    subscriber = hub.subscribe(Subscriber(STREAM_MAX_PENDING))
+
+    def events():
+        try:
+            yield from subscriber.chunks(STREAM_HEARTBEAT_S)
+        finally:
+            hub.unsubscribe(subscriber)
+
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/connect_db', methods=['POST', 'OPTIONS'])
+def connect_db():
     if request.method == 'OPTIONS':
         return jsonify({'message': 'ok'})
-    
+
+    try:
+        db_type, host, port, database = connect_target(request.json or {})
+    except ValueError:
+        return jsonify({'error': 'Invalid port number'}), 400
+
+    # Bypass port scans and TCP pings for SQLite
+    try:
+        latency = probe_sqlite(database) if db_type == 'sqlite' else probe_tcp(host, port)
+    except Exception as e:
+        return jsonify({'error': probe_error(db_type, host, port, e)}), 400
+    return jsonify(register_connection(db_type, host, port, database, latency))
+
+# SIMULATOR ENDPOINTS
+def simulate_attack():
+    """Log one random attack (and queue its incident row); returns (payload, status, headers)."""
     # Write to absolute path relative to this source file to avoid os.getcwd() differences
     log_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "11_Sentials-main", "attacker_logs.log"))
     
@@ -260,7 +469,7 @@ def launch_attack():
     os.makedirs(os.path.dirname(log_path), exist_ok=True)
     
     # Generate a random dynamic IP to simulate continuous new attackers
-    base_ip = random.choice(["192.168.1", "10.0.0", "203.0.113"])
+    base_ip = random.choice(["192.0.2", "198.51.100", "203.0.113"])
     ip = f"{base_ip}.{random.randint(10, 250)}"
     
     # Choose random attack type
@@ -290,86 +499,165 @@ def launch_attack():
     timestamp_str = time.strftime('%Y-%m-%d %H:%M:%S')
 
     # If SQLite database is connected, insert the threat event into the real database table
-    db_type = connected_db.get('type')
-    database = connected_db.get('database')
-    
-    if db_type == 'sqlite' and database:
-        db_path = database if os.path.exists(database) else os.path.join(os.getcwd(), database)
-        if os.path.exists(db_path):
-            try:
-                conn = sqlite3.connect(db_path)
-                cursor = conn.cursor()
-                # Determine defense status (if auto_defend is enabled, it gets defended)
-                status_val = "DEFENDED" if (auto_defend or ip in blocked_ips) else "ACTIVE"
-                cursor.execute("""
-                    INSERT INTO security_incidents (timestamp, type, ip, details, status)
-                    VALUES (?, ?, ?, ?, ?);
-                """, (timestamp_str, attack_type, ip, f"Live alert logged via simulation. Severity: {severity}", status_val))
-                conn.commit()
-                conn.close()
-            except Exception as db_err:
-                print(f"Error persisting attack simulation event to SQLite: {db_err}")
+    # The row is queued for the background writer, so the response doesn't wait on disk
+    connected_db = get_state().get('connected_db')
+    _, incident_writer = get_incident_store(connected_db)
+    if connected_db and connected_db.get('type') == 'sqlite' and incident_writer is not None:
+        # Determine defense status (if auto_defend is enabled, it gets defended)
+        status_val = "DEFENDED" if (get_state().get('auto_defend') or ip in get_blocklist()) else "ACTIVE"
+        try:
+            incident_writer.submit(
+                INSERT_INCIDENT_SQL,
+                (timestamp_str, attack_type, ip, f"Live alert logged via simulation. Severity: {severity}", status_val)
+            )
+        except queue.Full:
+            return {'error': 'Incident writer is saturated, retry shortly'}, 503, {'Retry-After': '1'}
 
     try:
         with open(log_path, "a") as log_file:
             log_file.write(f"{timestamp_str} - {log_entry}\n")
-        return jsonify({'status': 'launched', 'ip': ip, 'log': log_entry})
+        return {'status': 'launched', 'ip': ip, 'log': log_entry}, 200, {}
     except Exception as e:
-        return jsonify({'error': f'Failed to write log: {str(e)}'}), 500
+        return {'error': f'Failed to write log: {str(e)}'}, 500, {}
+
+@app.route('/launch_attack', methods=['POST', 'OPTIONS'])
+def launch_attack():
+    if request.method == 'OPTIONS':
+        return jsonify({'message': 'ok'})
+    payload, status, headers = simulate_attack()
+    return jsonify(payload), status, headers
 
 @app.route('/toggle_defense', methods=['POST', 'OPTIONS'])
 def toggle_defense():
-    global auto_defend
     if request.method == 'OPTIONS':
         return jsonify({'message': 'ok'})
     
     data = request.json or {}
     auto_defend = data.get('enabled', True)
+    get_state().set('auto_defend', auto_defend)
     return jsonify({'status': 'updated', 'auto_defend': auto_defend})
 
+def requested_ips(data):
+    """The addresses in a block/unblock body: its "ips" list, or its single "ip"."""
+    ips = data.get('ips')
+    if ips is None:
+        return [data['ip']] if data.get('ip') else []
+    if not isinstance(ips, list):
+        raise ValueError('ips must be a list')
+    return ips
+
+def block_ips(data):
+    """Apply a /block_ip body; returns (payload, status)."""
+    # Accepts a single {"ip": ...} or a batch {"ips": [...]} from the agent; CIDR ranges
+    # ("10.0.0.0/8") are fine, and an optional "ttl" (seconds) makes the block expire
+    try:
+        ips = requested_ips(data)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    if ips:
+        label = f"IP {ips[0]}" if len(ips) == 1 else f"{len(ips)} IPs"
+        if get_state().get('auto_defend'):
+            ttl = data.get('ttl')
+            if ttl is not None and (not isinstance(ttl, (int, float)) or ttl <= 0):
+                return {'error': 'ttl must be a positive number of seconds'}, 400
+            # Bad or refused entries (loopback, /0, a typo) are reported, not fatal to the batch
+            accepted, rejected = get_blocklist().screen(ips)
+            if not accepted:
+                return {'error': 'Refusing to block ' + '; '.join(
+                    f"{ip}: {problem}" for ip, problem in rejected.items()), 'rejected': rejected}, 400
+            entries = get_blocklist().update(accepted, ttl=ttl, reason=data.get('reason'))
+
+            # If SQLite is connected, execute database update query for real persistence
+            # Queued behind any pending inserts for this IP so the update sees them
+            connected_db = get_state().get('connected_db')
+            _, incident_writer = get_incident_store(connected_db)
+            if connected_db and connected_db.get('type') == 'sqlite' and incident_writer is not None:
+                for entry in entries:
+                    # Single addresses are keyed by the bare address; ranges need a membership test
+                    single = entry.prefixlen == (32 if entry.version == 4 else 128)
+                    try:
+                        incident_writer.submit(DEFEND_IP_SQL if single else DEFEND_NETWORK_SQL, (entry.network,))
+                    except queue.Full:
+                        print(f"Incident writer saturated, DEFENDED update for {entry.network} dropped")
+
+            if rejected:
+                label = f"{len(accepted)} of {len(ips)} IPs"
+            return {'message': f'Blocked {label}', 'blocked_ips': [entry.network for entry in entries],
+                    'rejected': rejected, 'seq': entries[-1].seq, 'blocked': True}, 200
+        else:
+            return {'message': f'{label} not blocked (defense shield disabled)', 'blocked_ips': [],
+                    'blocked': False}, 200
+    return {'error': 'No IP provided'}, 400
+
 @app.route('/block_ip', methods=['POST', 'OPTIONS'])
 def block_ip_endpoint():
-    global connected_db
     if request.method == 'OPTIONS':
         return jsonify({'message': 'ok'})
-    
-    data = request.json or {}
-    ip = data.get('ip')
-    if ip:
-        if auto_defend:
-            blocked_ips.add(ip)
-            
-            # If SQLite is connected, execute database update query for real persistence
-            if connected_db:
-                db_type = connected_db.get('type')
-                database = connected_db.get('database')
-                if db_type == 'sqlite' and database:
-                    db_path = database if os.path.exists(database) else os.path.join(os.getcwd(), database)
-                    if os.path.exists(db_path):
-                        try:
-                            conn = sqlite3.connect(db_path)
-                            cursor = conn.cursor()
-                            cursor.execute("UPDATE security_incidents SET status = 'DEFENDED' WHERE ip = ?;", (ip,))
-                            conn.commit()
-                            conn.close()
-                        except Exception as db_err:
-                            print(f"Error updating incident status to DEFENDED in SQLite: {db_err}")
-
-            return jsonify({'message': f'Blocked IP {ip}', 'blocked_ips': list(blocked_ips), 'blocked': True})
-        else:
-            return jsonify({'message': f'IP {ip} not blocked (defense shield disabled)', 'blocked_ips': list(blocked_ips), 'blocked': False})
-    return jsonify({'error': 'No IP provided'}), 400
+    payload, status = block_ips(request.json or {})
+    return jsonify(payload), status
+
+def unblock_ips(data):
+    """Apply an /unblock_ip body ({"ip": ...} or {"ips": [...]}); returns (payload, status)."""
+    try:
+        ips = requested_ips(data)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    if not ips:
+        return {'error': 'No IP provided'}, 400
+    blocks = get_blocklist()
+    unblocked, not_listed = [], []
+    for ip in ips:
+        try:
+            removed = blocks.remove(ip)
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        (unblocked if removed else not_listed).append(ip)
+    label = f"IP {ips[0]}" if len(ips) == 1 else f"{len(unblocked)} IPs"
+    return {'message': f'Unblocked {label}' if unblocked else f'{label} was not blocked',
+            'unblocked': unblocked, 'not_listed': not_listed, 'seq': blocks.seq}, 200
+
+@app.route('/unblock_ip', methods=['POST', 'OPTIONS'])
+def unblock_ip_endpoint():
+    if request.method == 'OPTIONS':
+        return jsonify({'message': 'ok'})
+    payload, status = unblock_ips(request.json or {})
+    return jsonify(payload), status
+
+def blocked_page(args):
+    """One /blocked_ips page for the query ``args``; returns (payload, status)."""
+    # Cursor paging: pass the returned "seq" back as ?since= for the next page or, once
+    # "more" is false, for just the changes since. "reset" means start over from scratch.
+    try:
+        since = int(args.get('since', 0))
+        limit = min(int(args.get('limit', BLOCKLIST_PAGE_SIZE)), BLOCKLIST_PAGE_SIZE)
+    except ValueError:
+        return {'error': 'since and limit must be integers'}, 400
+    blocks = get_blocklist()
+    page = blocks.changes(since, max(limit, 1))
+    return {
+        'blocked_ips': [entry.network for entry in page['blocked']],
+        'expires_at': {entry.network: entry.expires_at for entry in page['blocked'] if entry.expires_at},
+        'removed': page['removed'],
+        'seq': page['seq'],
+        'more': page['more'],
+        'reset': page['reset'],
+        'total': len(blocks),
+        'auto_defend': get_state().get('auto_defend')
+    }, 200
 
 @app.route('/blocked_ips', methods=['GET'])
 def get_blocked_ips():
-    return jsonify({
-        'blocked_ips': list(blocked_ips),
-        'auto_defend': auto_defend
-    })
+    payload, status = blocked_page(request.args)
+    return jsonify(payload), status
 
 @app.route('/server_info')
 def server_info():
-    return jsonify({'servers': servers})
+    return jsonify({'servers': get_state().get('servers')})
 
 if __name__ == '__main__':
+    # Development only: one process with the reloader. For production use serve.py,
+    # which runs this app under several gunicorn workers.
+    # The debug reloader's parent process only watches files; record from the serving child
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_metrics_recording()
     app.run(debug=True)
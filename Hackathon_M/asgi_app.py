@@ -0,0 +1,189 @@
+"""Async (ASGI) variant of the command-center API in app.py.
+
+Same routes and JSON, on Quart. Reachability probes use asyncio sockets, so
+an unreachable host ties up a coroutine for CONNECT_TIMEOUT_S instead of a
+worker thread. SQLite and log-file work goes through app.py's helpers on a
+small thread pool (ASYNC_DB_THREADS), never on the event loop. /system_info
+copies the background sampler's latest snapshot. Settings and shared state
+(STATE_DB, BLOCKLIST_DB, ...) are the ones app.py reads.
+
+Run with python serve.py --asgi [--workers N], or any ASGI server:
+uvicorn asgi_app:app
+"""
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from quart import Quart, Response, jsonify, render_template, request
+
+import app as wsgi
+from sampler import get_sampler
+from stream import AsyncSubscriber
+
+app = Quart(__name__)
+
+# Threads for blocking SQLite and file calls; probes don't use them
+ASYNC_DB_THREADS = int(os.environ.get('ASYNC_DB_THREADS', 8))
+_executor = ThreadPoolExecutor(ASYNC_DB_THREADS, thread_name_prefix='asgi-db')
+
+
+async def run_sync(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(_executor, partial(fn, *args))
+
+
+async def probe_tcp(host, port):
+    """Async app.probe_tcp: the handshake is awaited on the event loop."""
+    start_time = time.time()
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), wsgi.CONNECT_TIMEOUT_S)
+    except asyncio.TimeoutError:
+        raise TimeoutError('timed out') from None
+    writer.close()
+    await writer.wait_closed()
+    return (time.time() - start_time) * 1000
+
+
+@app.before_serving
+async def startup():
+    # Everything with a slow first call (sampler priming, blocklist cold load) happens before traffic
+    await run_sync(get_sampler, wsgi.SYSTEM_SAMPLE_INTERVAL)
+    await run_sync(wsgi.get_state)
+    await run_sync(wsgi.get_blocklist)
+    from serve import claim_metrics_recording
+    await run_sync(claim_metrics_recording, wsgi)
+
+
+@app.before_request
+async def filter_request():
+    # In-memory lookup; the blocklist's own SQLite sync is rate-limited to one short read per interval
+    rejected = wsgi.screen_client(request.remote_addr)
+    if rejected is None:
+        return None
+    status, retry_after = rejected
+    if status == 403:
+        return jsonify({'error': 'Source IP is blocked'}), 403
+    return jsonify({'error': 'Rate limit exceeded'}), 429, {'Retry-After': str(max(1, round(retry_after)))}
+
+
+@app.after_request
+async def after_request(response):
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
+    response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
+    return response
+
+
+@app.route('/')
+async def index():
+    return await render_template('index.html')
+
+
+@app.route('/system_info')
+async def system_info():
+    return jsonify(get_sampler(wsgi.SYSTEM_SAMPLE_INTERVAL).snapshot())
+
+
+@app.route('/metrics_history')
+async def metrics_history():
+    payload, status = await run_sync(wsgi.metrics_page, request.args)
+    return jsonify(payload), status
+
+
+@app.route('/record_metrics', methods=['POST', 'OPTIONS'])
+async def record_metrics_endpoint():
+    if request.method == 'OPTIONS':
+        return jsonify({'message': 'ok'})
+    payload, status = await run_sync(wsgi.record_metrics, await request.get_json(silent=True) or {})
+    return jsonify(payload), status
+
+
+@app.route('/db_status', methods=['GET'])
+async def get_db_status():
+    return jsonify(await run_sync(wsgi.db_status_payload))
+
+
+@app.route('/stream')
+async def stream():
+    # Same events as app.py's /stream; an open stream costs a coroutine, not a thread
+    hub = wsgi.get_stream_hub()
+    subscriber = hub.subscribe(AsyncSubscriber(asyncio.get_running_loop(), wsgi.STREAM_MAX_PENDING))
+
+    async def events():
+        try:
+            async for chunk in subscriber.chunks(wsgi.STREAM_HEARTBEAT_S):
+                yield chunk
+        finally:
+            hub.unsubscribe(subscriber)
+
+    response = Response(events(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    response.timeout = None  # Quart otherwise ends streaming responses after 60 s
+    return response
+
+
+@app.route('/connect_db', methods=['POST', 'OPTIONS'])
+async def connect_db():
+    if request.method == 'OPTIONS':
+        return jsonify({'message': 'ok'})
+
+    try:
+        db_type, host, port, database = wsgi.connect_target(await request.get_json(silent=True) or {})
+    except ValueError:
+        return jsonify({'error': 'Invalid port number'}), 400
+
+    try:
+        if db_type == 'sqlite':
+            latency = await run_sync(wsgi.probe_sqlite, database)
+        else:
+            latency = await probe_tcp(host, port)
+    except Exception as e:
+        return jsonify({'error': wsgi.probe_error(db_type, host, port, e)}), 400
+    return jsonify(await run_sync(wsgi.register_connection, db_type, host, port, database, latency))
+
+
+@app.route('/launch_attack', methods=['POST', 'OPTIONS'])
+async def launch_attack():
+    if request.method == 'OPTIONS':
+        return jsonify({'message': 'ok'})
+    payload, status, headers = await run_sync(wsgi.simulate_attack)
+    return jsonify(payload), status, headers
+
+
+@app.route('/toggle_defense', methods=['POST', 'OPTIONS'])
+async def toggle_defense():
+    if request.method == 'OPTIONS':
+        return jsonify({'message': 'ok'})
+
+    data = await request.get_json(silent=True) or {}
+    auto_defend = data.get('enabled', True)
+    await run_sync(wsgi.get_state().set, 'auto_defend', auto_defend)
+    return jsonify({'status': 'updated', 'auto_defend': auto_defend})
+
+
+@app.route('/block_ip', methods=['POST', 'OPTIONS'])
+async def block_ip_endpoint():
+    if request.method == 'OPTIONS':
+        return jsonify({'message': 'ok'})
+    payload, status = await run_sync(wsgi.block_ips, await request.get_json(silent=True) or {})
+    return jsonify(payload), status
+
+
+@app.route('/unblock_ip', methods=['POST', 'OPTIONS'])
+async def unblock_ip_endpoint():
+    if request.method == 'OPTIONS':
+        return jsonify({'message': 'ok'})
+    payload, status = await run_sync(wsgi.unblock_ips, await request.get_json(silent=True) or {})
+    return jsonify(payload), status
+
+
+@app.route('/blocked_ips', methods=['GET'])
+async def get_blocked_ips():
+    payload, status = await run_sync(wsgi.blocked_page, request.args)
+    return jsonify(payload), status
+
+
+@app.route('/server_info')
+async def server_info():
+    return jsonify({'servers': await run_sync(wsgi.get_state().get, 'servers')})
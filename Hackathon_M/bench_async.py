@@ -0,0 +1,107 @@
+"""API responsiveness while /connect_db probes hang: threaded WSGI vs the ASGI variant.
+
+Points --probes concurrent /connect_db requests at a port whose accept
+backlog is full, so every probe waits out CONNECT_TIMEOUT_S, and meanwhile
+times GET /server_info from --clients keep-alive connections. serve.py runs
+app.py (1 worker x --threads threads) and then asgi_app.py (1 worker); both
+get throwaway databases and no rate limit.
+
+Usage: python bench_async.py [--probes 16] [--threads 4] [--clients 4] [--timeout 2]
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from bench_serve import free_port, wait_for
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def blackhole():
+    """A listening port that never accepts: once its backlog is full, SYNs are dropped."""
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(0)
+    port = listener.getsockname()[1]
+    filler = socket.create_connection(('127.0.0.1', port))
+    return port, (listener, filler)
+
+
+def probe(port, target, results):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    start = time.perf_counter()
+    conn.request('POST', '/connect_db', body=json.dumps({'type': 'mysql', 'host': '127.0.0.1', 'port': target}),
+                 headers={'Content-Type': 'application/json'})
+    conn.getresponse().read()
+    results.append(time.perf_counter() - start)
+    conn.close()
+
+
+def poll(port, until, latencies):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    while time.monotonic() < until:
+        start = time.perf_counter()
+        conn.request('GET', '/server_info')
+        conn.getresponse().read()
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+
+
+def run(label, extra, args, env, target):
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, 'serve.py'), '--bind', f'127.0.0.1:{port}', '--workers', '1'] + extra,
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_for(port)
+        probes, latencies = [], []
+        threads = [threading.Thread(target=probe, args=(port, target, probes)) for _ in range(args.probes)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.2)  # probes are in flight
+        until = time.monotonic() + args.timeout
+        pollers = [threading.Thread(target=poll, args=(port, until, latencies)) for _ in range(args.clients)]
+        for thread in pollers:
+            thread.start()
+        for thread in pollers + threads:
+            thread.join()
+        latencies.sort()
+        print(f"  {label:<28} {len(latencies) / args.timeout:8,.0f} req/s  "
+              f"p50 {statistics.median(latencies) * 1000:7.1f} ms  max {latencies[-1] * 1000:7.1f} ms  "
+              f"probes done in {max(probes):.1f} s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--probes', type=int, default=16)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--clients', type=int, default=4)
+    parser.add_argument('--timeout', type=float, default=2.0, help='CONNECT_TIMEOUT_S for the servers')
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    env = dict(os.environ, RATE_LIMIT_RPS='0', CONNECT_TIMEOUT_S=str(args.timeout),
+               STATE_DB=os.path.join(tmp, 'state.db'),
+               BLOCKLIST_DB=os.path.join(tmp, 'blocklist.db'),
+               METRICS_DB=os.path.join(tmp, 'metrics.db'))
+    target, keep = blackhole()
+
+    print(f"GET /server_info from {args.clients} clients while {args.probes} probes hang for {args.timeout:g} s")
+    run(f"WSGI, {args.threads} threads", ['--threads', str(args.threads)], args, env, target)
+    run("ASGI, one event loop", ['--asgi'], args, env, target)
+
+
+if __name__ == '__main__':
+    main()
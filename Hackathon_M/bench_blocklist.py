@@ -0,0 +1,111 @@
+"""Blocklist lookups and listing with a million entries.
+
+Builds --entries blocks (mostly IPv4 hosts, plus /24 ranges and IPv6 /64s),
+then compares membership checks against the old exact-match set and a
+linear scan over ipaddress networks, /blocked_ips payloads (full list vs one
+page vs a delta), and cold load from SQLite.
+
+Usage: python bench_blocklist.py [--entries 1000000] [--lookups 200000]
+"""
+import argparse
+import ipaddress
+import json
+import os
+import random
+import tempfile
+import time
+
+import psutil
+
+from blocklist import Blocklist, SAVE_SEQ_SQL, UPSERT_BLOCK_SQL
+from db import get_pool
+
+
+def random_ipv4():
+    return f"{random.randint(1, 223)}.{random.randint(0, 255)}.{random.randint(0, 255)}.{random.randint(1, 254)}"
+
+
+def per_op(fn, items):
+    start = time.perf_counter()
+    for item in items:
+        fn(item)
+    return (time.perf_counter() - start) / len(items) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=1000000)
+    parser.add_argument("--lookups", type=int, default=200000)
+    args = parser.parse_args()
+
+    ranges = args.entries // 100
+    hosts = list({random_ipv4() for _ in range(args.entries - 2 * ranges)})
+    networks = hosts + [f"{random.randint(1, 223)}.{random.randint(0, 255)}.{i % 256}.0/24" for i in range(ranges)]
+    networks += [f"2001:db8:{i >> 16:x}:{i & 0xffff:x}::/64" for i in range(ranges)]
+
+    rss = psutil.Process().memory_info().rss
+    start = time.perf_counter()
+    blocks = Blocklist()
+    for i in range(0, len(networks), 10000):
+        blocks.update(networks[i:i + 10000])
+    build = time.perf_counter() - start
+    rss = psutil.Process().memory_info().rss - rss
+    print(f"{len(blocks):,} entries built in {build:.1f} s, ~{rss / len(blocks):.0f} bytes/entry")
+
+    legacy = set(hosts)
+    hits = random.sample(hosts, min(args.lookups, len(hosts)))
+    misses = [random_ipv4() for _ in range(args.lookups)]
+    in_range = [f"{n.split('/')[0].rsplit('.', 1)[0]}.{random.randint(1, 254)}"
+                for n in random.sample(networks[len(hosts):len(hosts) + ranges], min(args.lookups, ranges))]
+    rows = [
+        ("set, exact hit (legacy)", per_op(legacy.__contains__, hits)),
+        ("set, miss (legacy)", per_op(legacy.__contains__, misses)),
+        ("Blocklist, host hit", per_op(blocks.__contains__, hits)),
+        ("Blocklist, /24 range hit", per_op(blocks.__contains__, in_range)),
+        ("Blocklist, miss", per_op(blocks.__contains__, misses)),
+    ]
+    # What CIDR support costs without an index: test every range in turn
+    parsed = [ipaddress.ip_network(n) for n in networks[len(hosts):len(hosts) + ranges]]
+    linear = [ipaddress.ip_address(ip) for ip in misses[:200]]
+    rows.append((f"linear scan of {ranges:,} ranges", per_op(lambda ip: any(ip in n for n in parsed), linear)))
+    assert all(ip in blocks for ip in hits + in_range)
+
+    print(f"  {'membership check':<34} {'us/op':>9}")
+    for label, us in rows:
+        print(f"  {label:<34} {us:9.2f}")
+
+    full = json.dumps({"blocked_ips": list(legacy)})
+    page = blocks.changes(0, 1000)
+    page_body = json.dumps({"blocked_ips": [e.network for e in page["blocked"]], "seq": page["seq"]})
+    start = time.perf_counter()
+    cursor, pages, more = 0, 0, True
+    while more:
+        result = blocks.changes(cursor, 1000)
+        cursor, more, pages = result["seq"], result["more"], pages + 1
+    walk = time.perf_counter() - start
+    # A dashboard that is caught up only fetches what changed since its cursor
+    blocks.update(random.sample(hosts, 10))
+    delta = blocks.changes(cursor, 1000)
+    delta_body = json.dumps({"blocked_ips": [e.network for e in delta["blocked"]], "seq": delta["seq"]})
+    print(f"/blocked_ips: full list {len(full) / 1e6:.1f} MB per poll (legacy), one page {len(page_body) / 1e3:.1f} kB, "
+          f"delta after 10 blocks {len(delta_body)} B; all {pages} pages in {walk * 1000:.0f} ms")
+
+    path = os.path.join(tempfile.mkdtemp(), "bench_blocklist.db")
+    store = Blocklist(path)
+    with get_pool(path).connection() as conn:
+        with conn:
+            conn.executemany(UPSERT_BLOCK_SQL, ((n, None, None, i + 1) for i, n in enumerate(networks)))
+            conn.execute(SAVE_SEQ_SQL, (len(networks),))
+    start = time.perf_counter()
+    loaded = Blocklist(path)
+    print(f"Cold load of {len(loaded):,} entries from SQLite: {time.perf_counter() - start:.1f} s")
+    # A second process sees one block another one commits on its next sync
+    store.add("203.0.113.0/24")
+    start = time.perf_counter()
+    loaded.sync()
+    print(f"Cross-process sync of one change: {(time.perf_counter() - start) * 1000:.2f} ms, "
+          f"visible: {'203.0.113.9' in loaded}")
+
+
+if __name__ == "__main__":
+    main()
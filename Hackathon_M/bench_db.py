@@ -0,0 +1,114 @@
+"""Benchmark the incident storage paths: connect-per-request vs the shared pool.
+
+Usage: python bench_db.py [--requests 2000] [--rows 200000]
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+from db import (
+    ConnectionPool, IncidentWriter, migrate, LIST_TABLES_SQL, COUNT_INCIDENTS_SQL,
+    INSERT_INCIDENT_SQL, DEFEND_IP_SQL
+)
+
+FULL_COUNT_SQL = "SELECT COUNT(*) FROM security_incidents;"
+
+
+def seed(path, rows):
+    pool = ConnectionPool(path)
+    migrate(pool)
+    with pool.connection() as conn:
+        with conn:
+            conn.executemany(INSERT_INCIDENT_SQL, [
+                ("2025-01-01 00:00:00", "Port Scan", f"10.0.{i % 250}.{i % 200}", "seed", "ACTIVE")
+                for i in range(rows)
+            ])
+    pool.close()
+
+
+def naive_status(path):
+    # Mirrors the original handlers: resolve, connect, query, close.
+    db_path = path if os.path.exists(path) else os.path.join(os.getcwd(), path)
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute(LIST_TABLES_SQL)
+    cursor.fetchall()
+    cursor.execute(FULL_COUNT_SQL)
+    cursor.fetchone()
+    conn.close()
+
+
+def naive_write(path, ip):
+    db_path = path if os.path.exists(path) else os.path.join(os.getcwd(), path)
+    conn = sqlite3.connect(db_path)
+    conn.execute(INSERT_INCIDENT_SQL, ("2025-01-01 00:00:00", "Port Scan", ip, "bench", "ACTIVE"))
+    conn.execute(DEFEND_IP_SQL, (ip,))
+    conn.commit()
+    conn.close()
+
+
+def pooled_status(pool):
+    pool.table_count()
+    pool.query(COUNT_INCIDENTS_SQL)
+
+
+def pooled_write(pool, ip):
+    with pool.connection() as conn:
+        with conn:
+            conn.execute(INSERT_INCIDENT_SQL, ("2025-01-01 00:00:00", "Port Scan", ip, "bench", "ACTIVE"))
+            conn.execute(DEFEND_IP_SQL, (ip,))
+
+
+def writer_burst(pool, n):
+    """Submit ``n`` inserts through the group-commit writer and wait for them to land."""
+    writer = IncidentWriter(pool)
+    start = time.perf_counter()
+    for i in range(n):
+        writer.submit(INSERT_INCIDENT_SQL, ("2025-01-01 00:00:00", "Port Scan", f"172.16.0.{i % 250}", "bench", "ACTIVE"))
+    enqueued = time.perf_counter() - start
+    writer.flush()
+    total = time.perf_counter() - start
+    writer.close()
+    return n / enqueued, n / total, writer.stats()['batches']
+
+
+def rate(fn, n):
+    start = time.perf_counter()
+    for i in range(n):
+        fn(i)
+    return n / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--rows", type=int, default=200000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        naive_path = os.path.join(tmp, "naive.db")
+        pooled_path = os.path.join(tmp, "pooled.db")
+        seed(naive_path, args.rows)
+        seed(pooled_path, args.rows)
+        pool = ConnectionPool(pooled_path)
+
+        results = [
+            ("status  connect-per-request", rate(lambda i: naive_status(naive_path), args.requests)),
+            ("status  pooled", rate(lambda i: pooled_status(pool), args.requests)),
+            ("write   connect-per-request", rate(lambda i: naive_write(naive_path, f"192.168.1.{i % 250}"), args.requests)),
+            ("write   pooled (WAL)", rate(lambda i: pooled_write(pool, f"192.168.1.{i % 250}"), args.requests)),
+        ]
+        submit_rps, commit_rps, batches = writer_burst(pool, args.requests)
+        results.append(("insert  group-commit (submit)", submit_rps))
+        results.append(("insert  group-commit (durable)", commit_rps))
+        pool.close()
+
+    for name, rps in results:
+        print(f"{name:<30} {rps:>10.0f} req/s")
+    print(f"group-commit used {batches} transactions for {args.requests} inserts")
+
+
+if __name__ == "__main__":
+    main()
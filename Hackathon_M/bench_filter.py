@@ -0,0 +1,87 @@
+"""Per-request cost of the pre-request filter (blocklist + rate limit).
+
+Times app.screen_client() for --requests requests spread over --clients
+source addresses, with an empty blocklist and with --entries blocks loaded
+(mostly hosts, some /24s), then a full Flask round trip through the test
+client for a blocked source vs a served one.
+
+Usage: python bench_filter.py [--requests 200000] [--clients 10000] [--entries 1000000]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+os.environ.setdefault('BLOCKLIST_DB', os.path.join(tempfile.mkdtemp(), 'bench_filter.db'))
+os.environ.setdefault('METRICS_DB', os.path.join(os.path.dirname(os.environ['BLOCKLIST_DB']), 'metrics.db'))
+
+import app
+from blocklist import Blocklist
+from ratelimit import RateLimiter
+
+
+def random_ipv4():
+    return f"{random.randint(1, 223)}.{random.randint(0, 255)}.{random.randint(0, 255)}.{random.randint(1, 254)}"
+
+
+def per_request(ips):
+    screen = app.screen_client
+    start = time.perf_counter()
+    for ip in ips:
+        screen(ip)
+    return (time.perf_counter() - start) / len(ips) * 1e6
+
+
+def round_trip(client, ip, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        client.get('/server_info', environ_base={'REMOTE_ADDR': ip})
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200000)
+    parser.add_argument('--clients', type=int, default=10000)
+    parser.add_argument('--entries', type=int, default=1000000)
+    args = parser.parse_args()
+
+    clients = [random_ipv4() for _ in range(args.clients)]
+    ips = [random.choice(clients) for _ in range(args.requests)]
+    # Generous limits: this measures the bookkeeping, not rejections
+    app.rate_limiter = RateLimiter(1e9, 1e9)
+    app.blocklist = Blocklist()
+
+    rows = [('empty blocklist, no rate limit', None, False),
+            ('empty blocklist + rate limit', app.rate_limiter, False),
+            (f'{args.entries:,} blocks + rate limit', app.rate_limiter, True)]
+    print(f"{args.requests:,} requests from {args.clients:,} sources")
+    for label, limiter, loaded in rows:
+        if loaded:
+            networks = [random_ipv4() for _ in range(args.entries - args.entries // 100)]
+            networks += [f"{random_ipv4().rsplit('.', 1)[0]}.0/24" for _ in range(args.entries // 100)]
+            for i in range(0, len(networks), 10000):
+                app.blocklist.update(networks[i:i + 10000])
+        app.rate_limiter = limiter
+        us = per_request(ips)
+        print(f"  {label:<34} {us:6.2f} us/request  (~{1e6 / us:,.0f} rps on one core)")
+
+    client = app.app.test_client()
+    n = 2000
+    blocked = random.choice(networks)
+    blocked = blocked.replace('.0/24', '.7')
+    app.rate_limiter = None
+    served = round_trip(client, clients[0], n)
+    rejected = round_trip(client, blocked, n)
+    assert client.get('/server_info', environ_base={'REMOTE_ADDR': blocked}).status_code == 403
+    print(f"Flask round trip (test client): served {served:.0f} us, blocked source rejected in {rejected:.0f} us")
+
+    app.rate_limiter = RateLimiter(rate=100, burst=200)
+    statuses = [client.get('/server_info', environ_base={'REMOTE_ADDR': clients[1]}).status_code for _ in range(300)]
+    print(f"Rate limit 100/s burst 200, 300 back-to-back requests: {statuses.count(200)} served, "
+          f"{statuses.count(429)} rejected with 429")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Range-query cost over a week of 1 s samples: raw table vs rollups.
+
+Ingests --days of one-second samples for one series (in --batch sized
+transactions, as the recorder would), then times queries over the last hour,
+day and week at each resolution and at 'auto'.
+
+Usage: python bench_metrics.py [--days 7] [--batch 5000] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import metrics_store
+from metrics_store import MetricsStore
+
+SPANS = (("1 hour", 3600), ("1 day", 86400), ("7 days", 7 * 86400))
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=float, default=7)
+    parser.add_argument("--batch", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    # Keep every raw sample so the raw column below really scans a week
+    metrics_store.RESOLUTIONS = tuple((name, table, column, step, None)
+                                      for name, table, column, step, _ in metrics_store.RESOLUTIONS)
+    path = os.path.join(tempfile.mkdtemp(), "bench_metrics.db")
+    store = MetricsStore(path)
+    end = float(int(time.time()))
+    samples = int(args.days * 86400)
+    value = 50.0
+    start = time.perf_counter()
+    batch = []
+    for i in range(samples):
+        value = min(100.0, max(0.0, value + random.uniform(-2, 2)))
+        batch.append(("system.cpu_percent", end - samples + i, value))
+        if len(batch) >= args.batch:
+            store.write(batch)
+            batch = []
+    store.write(batch)
+    ingest = time.perf_counter() - start
+    print(f"Ingested {samples:,} samples in {ingest:.1f} s ({samples / ingest:,.0f}/s, batches of {args.batch}), "
+          f"{sum(os.path.getsize(p) for p in (path, path + '-wal') if os.path.exists(p)) / 1e6:.1f} MB")
+
+    print(f"  {'span':<8} {'resolution':<10} {'points':>7} {'ms':>9}")
+    for label, span in SPANS:
+        for resolution in ("raw", "1m", "1h", "auto"):
+            ms, (picked, _, points) = timed(
+                lambda: store.query("system.cpu_percent", end - span, end, resolution), args.repeat)
+            name = resolution if resolution != "auto" else f"auto({picked})"
+            print(f"  {label:<8} {name:<10} {len(points):>7} {ms:9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Requests/second through serve.py with 1, 2, 4... workers.
+
+Starts serve.py against throwaway databases (rate limiting off, since every
+client shares 127.0.0.1), drives it from --clients processes that each keep
+one HTTP/1.1 connection open for --seconds, and reports throughput per worker
+count. Also checks that a defense toggle and a block made through one worker
+are what every other worker serves afterwards. Throughput can only scale up
+to the number of cores: on a single-core machine expect a flat line.
+
+Usage: python bench_serve.py [--workers 1,2,4] [--clients 8] [--seconds 5] [--path /server_info]
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(port, timeout=15):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"serve.py did not start listening on port {port}")
+
+
+def request(port, method, path, body=None):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    try:
+        conn.request(method, path, body=json.dumps(body) if body is not None else None,
+                     headers={'Content-Type': 'application/json'})
+        return json.loads(conn.getresponse().read())
+    finally:
+        conn.close()
+
+
+def client(port, path, seconds, results):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    done = errors = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        conn.request('GET', path)
+        response = conn.getresponse()
+        response.read()
+        if response.status == 200:
+            done += 1
+        else:
+            errors += 1
+    conn.close()
+    results.put((done, errors))
+
+
+def run(workers, args, env):
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, 'serve.py'), '--bind', f'127.0.0.1:{port}',
+         '--workers', str(workers), '--threads', str(args.threads)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_for(port)
+        # Let every worker boot before timing
+        for _ in range(workers * 4):
+            request(port, 'GET', args.path)
+
+        results = multiprocessing.Queue()
+        clients = [multiprocessing.Process(target=client, args=(port, args.path, args.seconds, results))
+                   for _ in range(args.clients)]
+        for proc in clients:
+            proc.start()
+        counts = [results.get() for _ in clients]
+        for proc in clients:
+            proc.join()
+        done = sum(c[0] for c in counts)
+        errors = sum(c[1] for c in counts)
+
+        # Changes made through whichever worker took the request reach all the others
+        request(port, 'POST', '/toggle_defense', {'enabled': True})
+        request(port, 'POST', '/block_ip', {'ip': f'198.51.{workers}.0/24'})
+        request(port, 'POST', '/toggle_defense', {'enabled': False})
+        time.sleep(0.6)  # one blocklist sync interval
+        views = [request(port, 'GET', '/blocked_ips') for _ in range(workers * 8)]
+        consistent = all(not v['auto_defend'] and f'198.51.{workers}.0/24' in v['blocked_ips'] for v in views)
+        return done / args.seconds, errors, consistent
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', default='1,2,4')
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--path', default='/server_info')
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    env = dict(os.environ, RATE_LIMIT_RPS='0',
+               STATE_DB=os.path.join(tmp, 'state.db'),
+               BLOCKLIST_DB=os.path.join(tmp, 'blocklist.db'),
+               METRICS_DB=os.path.join(tmp, 'metrics.db'))
+
+    print(f"GET {args.path}, {args.clients} keep-alive clients for {args.seconds:g} s, {os.cpu_count()} cores")
+    baseline = None
+    for workers in [int(w) for w in args.workers.split(',')]:
+        rps, errors, consistent = run(workers, args, env)
+        baseline = baseline or rps
+        print(f"  {workers} worker(s) x {args.threads} threads: {rps:8,.0f} req/s  ({rps / baseline:.2f}x)"
+              f"  errors {errors}  shared state consistent: {consistent}")
+
+
+if __name__ == '__main__':
+    main()
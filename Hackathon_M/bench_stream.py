@@ -0,0 +1,80 @@
+"""Server cost of N open dashboards: polling /system_info + /db_status vs one /stream.
+
+Connects a throwaway SQLite incidents database, then for each N measures the
+server time for one refresh round: N dashboards each polling both endpoints
+(Flask test client), against one StreamHub tick fanned out to N
+subscribers. Also counts how often the DB status was computed.
+
+Usage: python bench_stream.py [--dashboards 1,10,100,1000] [--incidents 10000]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+tmp = tempfile.mkdtemp()
+os.environ.setdefault('STATE_DB', os.path.join(tmp, 'state.db'))
+os.environ.setdefault('BLOCKLIST_DB', os.path.join(tmp, 'blocklist.db'))
+os.environ.setdefault('METRICS_DB', os.path.join(tmp, 'metrics.db'))
+
+import app
+from db import INSERT_INCIDENT_SQL
+from stream import Subscriber
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dashboards', default='1,10,100,1000')
+    parser.add_argument('--incidents', type=int, default=10000)
+    args = parser.parse_args()
+
+    app.rate_limiter = None
+    client = app.app.test_client()
+    client.post('/connect_db', json={'type': 'sqlite', 'database': os.path.join(tmp, 'incidents.db')})
+    pool, writer = app.get_incident_store(app.get_state().get('connected_db'))
+    with pool.connection() as conn:
+        with conn:
+            conn.executemany(INSERT_INCIDENT_SQL, (('2026-01-01 00:00:00', 'Port Scan', f'10.0.{i % 256}.{i % 250}',
+                                                    'bench', 'ACTIVE') for i in range(args.incidents)))
+
+    client.get('/system_info')  # start the sampler outside the timings
+    app.new_incidents()  # and position the incident cursor
+
+    calls = {'db': 0}
+    db_status = app.db_status
+
+    def counted():
+        calls['db'] += 1
+        return db_status()
+
+    app.db_status = counted
+    hub = app.get_stream_hub()
+    print(f"One refresh round, {args.incidents:,} incidents in the connected database")
+    print(f"  {'dashboards':>10}  {'polling':>10}  {'stream':>10}  {'db_status calls (poll/stream)':>30}")
+    for n in [int(d) for d in args.dashboards.split(',')]:
+        calls['db'] = 0
+        start = time.perf_counter()
+        for _ in range(n):
+            client.get('/system_info')
+            client.get('/db_status')
+        polling = time.perf_counter() - start
+        polled = calls['db']
+
+        subscribers = [Subscriber(max_pending=4) for _ in range(n)]
+        with hub._lock:
+            hub._subscribers.update(subscribers)  # without starting the hub thread
+        writer.submit(INSERT_INCIDENT_SQL, ('2026-01-01 00:00:01', 'Brute Force', '10.9.9.9', 'bench', 'ACTIVE'))
+        writer.flush()
+        calls['db'] = 0
+        start = time.perf_counter()
+        hub.tick()
+        streamed = time.perf_counter() - start
+        computed = calls['db']
+        assert all(s.pending for s in subscribers)
+        with hub._lock:
+            hub._subscribers.difference_update(subscribers)
+        print(f"  {n:>10,}  {polling * 1000:8.1f} ms  {streamed * 1000:8.2f} ms  {f'{polled} / {computed}':>30}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,491 @@
+"""CIDR-aware IP blocklist with expiry, shared SQLite persistence and delta listing.
+
+Lookups are longest-prefix matches: one hash table per prefix length in use,
+probed from the most specific length down, so a membership check costs one
+dict lookup per distinct prefix length (a handful in practice) regardless of
+how many entries there are.
+
+Every add and removal gets the next sequence number and is appended to a
+change log, so listing is cursor based: ``changes(since)`` pages through
+everything after ``since`` in order, and ``since=0`` is the full list.
+"""
+import bisect
+import heapq
+import ipaddress
+import socket
+import threading
+import time
+
+from db import get_pool, migrate
+
+BLOCKLIST_MIGRATIONS = [
+    """
+    CREATE TABLE IF NOT EXISTS blocklist (
+        network TEXT PRIMARY KEY,
+        expires_at REAL,
+        reason TEXT,
+        seq INTEGER NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS blocklist_seq (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        seq INTEGER NOT NULL
+    );
+    """,
+    # Shared by several worker processes: removals stay behind as tombstone rows so
+    # other workers (and delta cursors) see them, and pruned tombstones raise the floor
+    """
+    ALTER TABLE blocklist ADD COLUMN removed INTEGER NOT NULL DEFAULT 0;
+    ALTER TABLE blocklist_seq ADD COLUMN floor INTEGER NOT NULL DEFAULT 0;
+    CREATE INDEX IF NOT EXISTS idx_blocklist_seq ON blocklist (seq);
+    CREATE INDEX IF NOT EXISTS idx_blocklist_tombstones ON blocklist (seq) WHERE removed = 1;
+    CREATE INDEX IF NOT EXISTS idx_blocklist_expiry ON blocklist (expires_at) WHERE removed = 0 AND expires_at IS NOT NULL;
+    INSERT OR IGNORE INTO blocklist_seq (id, seq) SELECT 1, COALESCE(MAX(seq), 0) FROM blocklist;
+    """,
+]
+
+UPSERT_BLOCK_SQL = """
+    INSERT INTO blocklist (network, expires_at, reason, seq, removed) VALUES (?, ?, ?, ?, 0)
+    ON CONFLICT (network) DO UPDATE SET
+        expires_at = excluded.expires_at, reason = excluded.reason, seq = excluded.seq, removed = 0;
+"""
+REMOVE_BLOCK_SQL = "UPDATE blocklist SET removed = 1, expires_at = NULL, seq = ? WHERE network = ? AND removed = 0;"
+SELECT_EXPIRED_SQL = "SELECT network FROM blocklist WHERE removed = 0 AND expires_at IS NOT NULL AND expires_at <= ?;"
+SYNC_BLOCKS_SQL = "SELECT network, expires_at, reason, seq, removed FROM blocklist WHERE seq > ? ORDER BY seq;"
+# Last seq handed out (removals included) and the floor below which tombstones were pruned
+LOAD_SEQ_SQL = "SELECT seq, floor FROM blocklist_seq WHERE id = 1;"
+SAVE_SEQ_SQL = """
+    INSERT INTO blocklist_seq (id, seq) VALUES (1, ?)
+    ON CONFLICT (id) DO UPDATE SET seq = excluded.seq;
+"""
+COUNT_TOMBSTONES_SQL = "SELECT COUNT(*) FROM blocklist WHERE removed = 1;"
+TOMBSTONE_CUTOFF_SQL = "SELECT seq FROM blocklist WHERE removed = 1 ORDER BY seq LIMIT 1 OFFSET ?;"
+PRUNE_TOMBSTONES_SQL = "DELETE FROM blocklist WHERE removed = 1 AND seq <= ?;"
+SAVE_FLOOR_SQL = "UPDATE blocklist_seq SET floor = MAX(floor, ?) WHERE id = 1;"
+
+_BITS = {4: 32, 6: 128}
+# Blocking any of these would cut off the dashboard, the agents and the simulator
+LOOPBACK_NETWORKS = ('127.0.0.0/8', '::1', '::ffff:127.0.0.0/104')
+
+
+def parse_address(ip):
+    """Return ``(version, int)`` for an IPv4/IPv6 address string; ValueError if invalid."""
+    try:
+        return 4, int.from_bytes(socket.inet_pton(socket.AF_INET, ip), 'big')
+    except (OSError, TypeError):
+        pass
+    try:
+        return 6, int.from_bytes(socket.inet_pton(socket.AF_INET6, ip), 'big')
+    except (OSError, TypeError):
+        raise ValueError(f"Invalid IP address: {ip!r}")
+
+
+def parse_network(value):
+    """Normalize ``10.0.0.5``, ``10.0.0.0/8`` or ``2001:db8::/32`` to ``(key, version, prefixlen, int)``.
+
+    Host bits are masked off, and single-address networks are keyed by the
+    bare address, so ``10.0.0.5`` and ``10.0.0.5/32`` are the same entry.
+    """
+    text = str(value).strip()
+    address, _, bits = text.partition('/')
+    try:
+        # Fast path for IPv4, which is nearly every entry (and every row on load)
+        number = int.from_bytes(socket.inet_pton(socket.AF_INET, address), 'big')
+    except OSError:
+        number = None
+    if number is not None and (not bits or (bits.isdigit() and int(bits) <= 32)):
+        prefixlen = int(bits) if bits else 32
+        prefix = number >> (32 - prefixlen)
+        number = prefix << (32 - prefixlen)
+        key = f"{number >> 24}.{number >> 16 & 255}.{number >> 8 & 255}.{number & 255}"
+        return (key if prefixlen == 32 else f"{key}/{prefixlen}"), 4, prefixlen, prefix
+    try:
+        network = ipaddress.ip_network(text, strict=False)
+    except ValueError as e:
+        raise ValueError(f"Invalid IP or CIDR: {value!r} ({e})")
+    if network.prefixlen == network.max_prefixlen:
+        key = str(network.network_address)
+    else:
+        key = str(network)
+    return key, network.version, network.prefixlen, int(network.network_address) >> (network.max_prefixlen - network.prefixlen)
+
+
+def overlaps(a, b):
+    """True if two ``parse_network`` results share at least one address."""
+    _, version_a, len_a, prefix_a = a
+    _, version_b, len_b, prefix_b = b
+    if version_a != version_b:
+        return False
+    if len_a <= len_b:
+        return prefix_b >> (len_b - len_a) == prefix_a
+    return prefix_a >> (len_a - len_b) == prefix_b
+
+
+class Entry:
+    __slots__ = ('network', 'version', 'prefixlen', 'prefix', 'expires_at', 'reason', 'seq', 'removed')
+
+    def __init__(self, network, version, prefixlen, prefix, expires_at, reason, seq):
+        self.network = network
+        self.version = version
+        self.prefixlen = prefixlen
+        self.prefix = prefix
+        self.expires_at = expires_at
+        self.reason = reason
+        self.seq = seq
+        self.removed = False
+
+    def as_dict(self):
+        return {'network': self.network, 'expires_at': self.expires_at, 'reason': self.reason}
+
+
+class Blocklist:
+    """Blocked IPs and CIDR ranges, in memory or shared through a SQLite file.
+
+    Without a ``path`` the list lives in memory only (e.g. an agent's mirror
+    of the server's list). With one, the file is the source of truth for
+    every worker process: each change commits in an IMMEDIATE transaction
+    that also hands out its sequence numbers, and each process replays rows
+    newer than its own ``seq`` into its in-memory index, right after its own
+    writes and at most ``sync_interval`` seconds apart on lookups.
+    ``lookup`` takes no lock; changes are serialized by one.
+
+    ``min_prefix`` ({version: bits}) and ``protected`` (networks) limit what
+    ``update`` accepts, so a typo like ``0.0.0.0/0`` can't lock everyone out.
+    Entries already in the file that break those rules are removed on open.
+    """
+
+    def __init__(self, path=None, max_tombstones=100000, sync_interval=0.5, min_prefix=None, protected=()):
+        self.max_tombstones = max_tombstones
+        self.sync_interval = sync_interval
+        self.min_prefix = dict(min_prefix or {})
+        self._protected = [parse_network(network) for network in protected]
+        self._tables = {}  # (version, prefixlen) -> {prefix: Entry}
+        self._lengths = {4: [], 6: []}  # version -> [(shift, table)], longest prefix first
+        self._expiry = []  # heap of (expires_at, seq, Entry)
+        self._log_seqs = []  # change log: seq of each change, ascending...
+        self._log = []  # ...and the Entry it touched (stale once the entry's seq moves on)
+        self._tombstones = 0
+        self._unpruned = 0  # tombstones seen since the file was last checked for pruning
+        self._floor = 0  # deltas from before this seq are gone; older cursors get a full reset
+        self._size = 0
+        self._lock = threading.RLock()
+        self._synced_at = 0.0
+        self.seq = 0
+        self.pool = None
+        if path is not None:
+            self.pool = get_pool(path)
+            migrate(self.pool, BLOCKLIST_MIGRATIONS, name='blocklist', legacy_user_version=True)
+            self.sync()
+            # Blocks that lapsed while nothing was running go out as ordinary removals
+            self.expire()
+            for network, problem in self._unsafe_entries():
+                print(f"Unblocking {network} from {path}: {problem}")
+                self.remove(network)
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, ip):
+        return self.lookup(ip) is not None
+
+    def lookup(self, ip, now=None):
+        """Most specific live entry covering ``ip``, or None. Invalid addresses are never blocked."""
+        if self.pool is not None and time.monotonic() - self._synced_at >= self.sync_interval:
+            # Whoever gets the lock catches up; concurrent lookups don't queue behind it
+            if self._lock.acquire(blocking=False):
+                try:
+                    self.sync()
+                finally:
+                    self._lock.release()
+        if not self._size:
+            return None  # the common case on the request path: skip parsing altogether
+        try:
+            version, address = parse_address(ip)
+        except ValueError:
+            return None
+        for shift, table in self._lengths[version]:
+            entry = table.get(address >> shift)
+            if entry is not None:
+                if entry.expires_at is None:
+                    return entry
+                if entry.expires_at > (time.time() if now is None else now):
+                    return entry
+        return None
+
+    def check(self, parsed):
+        """Why a ``parse_network`` result may not be blocked here, or None if it may."""
+        key, version, prefixlen, _ = parsed
+        min_prefix = self.min_prefix.get(version)
+        if min_prefix is not None and prefixlen < min_prefix:
+            return f"IPv{version} ranges must be /{min_prefix} or narrower"
+        for protected in self._protected:
+            if overlaps(parsed, protected):
+                return f"overlaps protected network {protected[0]}"
+        return None
+
+    def screen(self, networks):
+        """Split ``networks`` into ``(accepted, rejected)``: those ``update`` would take, and {network: why not}."""
+        accepted, rejected = [], {}
+        for network in networks:
+            try:
+                problem = self.check(parse_network(network))
+            except ValueError as e:
+                problem = str(e)
+            if problem:
+                rejected[str(network)] = problem
+            else:
+                accepted.append(network)
+        return accepted, rejected
+
+    def _unsafe_entries(self):
+        unsafe = []
+        with self._lock:
+            for table in self._tables.values():
+                for entry in table.values():
+                    problem = self.check((entry.network, entry.version, entry.prefixlen, entry.prefix))
+                    if problem:
+                        unsafe.append((entry.network, problem))
+        return unsafe
+
+    def add(self, network, ttl=None, reason=None):
+        """Block an address or CIDR range, for ``ttl`` seconds or until removed. Returns the Entry."""
+        return self.update([network], ttl, reason)[0]
+
+    def update(self, networks, ttl=None, reason=None):
+        """Block several addresses or ranges at once; ValueError (nothing applied) if any is invalid."""
+        parsed = [parse_network(network) for network in networks]
+        for network in parsed:
+            problem = self.check(network)
+            if problem:
+                raise ValueError(f"Refusing to block {network[0]}: {problem}")
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self.expire()
+            # Re-blocking refreshes the TTL and moves the entry to the head of the change log
+            if self.pool is None:
+                entries = []
+                for key, version, prefixlen, prefix in parsed:
+                    self.seq += 1
+                    entries.append(self._upsert(key, version, prefixlen, prefix, expires_at, reason, self.seq))
+                self._compact()
+                return entries
+            # What we wrote, not what the index holds after the catch-up sync: another
+            # worker's unblock may already have removed some of it again
+            written = []
+
+            def write(conn, seq):
+                for key, version, prefixlen, prefix in parsed:
+                    seq += 1
+                    written.append(Entry(key, version, prefixlen, prefix, expires_at, reason, seq))
+                conn.executemany(UPSERT_BLOCK_SQL, [(entry.network, expires_at, reason, entry.seq) for entry in written])
+                return seq
+            self._write(write)
+            return written
+
+    def remove(self, network):
+        """Unblock an exact address or range; returns False if it wasn't listed."""
+        key, version, prefixlen, prefix = parse_network(network)
+        with self._lock:
+            if self.pool is None:
+                if prefix not in self._tables.get((version, prefixlen), {}):
+                    return False
+                self.seq += 1
+                self._tombstone(key, version, prefixlen, prefix, self.seq)
+                self._compact()
+                return True
+            removed = []
+
+            def write(conn, seq):
+                removed.append(conn.execute(REMOVE_BLOCK_SQL, (seq + 1, key)).rowcount)
+                return seq + removed[0]
+            self._write(write)
+            return bool(removed[0])
+
+    def expire(self, now=None):
+        """Remove entries whose TTL has passed; returns how many."""
+        now = time.time() if now is None else now
+        with self._lock:
+            if not self._expiry or self._expiry[0][0] > now:
+                return 0
+            size = self._size
+            if self.pool is None:
+                while self._expiry and self._expiry[0][0] <= now:
+                    _, seq, entry = heapq.heappop(self._expiry)
+                    if entry.seq == seq and not entry.removed:
+                        self.seq += 1
+                        self._tombstone(entry.network, entry.version, entry.prefixlen, entry.prefix, self.seq)
+                self._compact()
+            else:
+                def write(conn, seq):
+                    rows = []
+                    for (network,) in conn.execute(SELECT_EXPIRED_SQL, (now,)).fetchall():
+                        seq += 1
+                        rows.append((seq, network))
+                    conn.executemany(REMOVE_BLOCK_SQL, rows)
+                    return seq
+                self._write(write)
+                # Whatever expired is gone now, whichever worker removed it
+                while self._expiry and self._expiry[0][0] <= now:
+                    heapq.heappop(self._expiry)
+            return size - self._size
+
+    def _write(self, write):
+        """Run ``write(conn, seq) -> last seq used`` in one IMMEDIATE transaction, then catch up."""
+        with self.pool.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE;")
+            try:
+                row = conn.execute(LOAD_SEQ_SQL).fetchone()
+                conn.execute(SAVE_SEQ_SQL, (write(conn, row[0] if row else 0),))
+                if self._unpruned > self.max_tombstones // 2:
+                    self._prune_tombstones(conn)
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            self._sync(conn)
+
+    def _prune_tombstones(self, conn):
+        self._unpruned = 0
+        count = conn.execute(COUNT_TOMBSTONES_SQL).fetchone()[0]
+        if count > self.max_tombstones:
+            cutoff = conn.execute(TOMBSTONE_CUTOFF_SQL, (count - self.max_tombstones // 2 - 1,)).fetchone()[0]
+            conn.execute(PRUNE_TOMBSTONES_SQL, (cutoff,))
+            conn.execute(SAVE_FLOOR_SQL, (cutoff,))
+
+    def sync(self):
+        """Replay changes other processes committed since our ``seq`` (no-op without a file)."""
+        if self.pool is None:
+            return
+        with self._lock, self.pool.connection() as conn:
+            self._sync(conn)
+
+    def _sync(self, conn):
+        row = conn.execute(LOAD_SEQ_SQL).fetchone()
+        db_seq, floor = row if row else (0, 0)
+        if db_seq != self.seq:
+            if self.seq < floor:
+                # Tombstones we never saw have been pruned: rebuild from the file
+                self.clear()
+                self.seq = 0
+            for network, expires_at, reason, seq, removed in conn.execute(SYNC_BLOCKS_SQL, (self.seq,)).fetchall():
+                key, version, prefixlen, prefix = parse_network(network)
+                if removed:
+                    self._tombstone(key, version, prefixlen, prefix, seq)
+                else:
+                    self._upsert(key, version, prefixlen, prefix, expires_at, reason, seq)
+            self.seq = max(self.seq, db_seq)
+            self._floor = max(self._floor, floor)
+            self._compact()
+        self._synced_at = time.monotonic()
+
+    def _upsert(self, key, version, prefixlen, prefix, expires_at, reason, seq):
+        table = self._tables.get((version, prefixlen))
+        if table is None:
+            table = self._tables[(version, prefixlen)] = {}
+            # Rebuilt rather than mutated, so lock-free lookups always see a whole list
+            self._lengths[version] = sorted(self._lengths[version] + [(_BITS[version] - prefixlen, table)],
+                                            key=lambda item: item[0])
+        entry = table.get(prefix)
+        if entry is None:
+            entry = table[prefix] = Entry(key, version, prefixlen, prefix, expires_at, reason, seq)
+            self._size += 1
+        else:
+            entry.expires_at = expires_at
+            entry.reason = reason
+            entry.seq = seq
+        self._log_change(entry)
+        if expires_at is not None:
+            heapq.heappush(self._expiry, (expires_at, seq, entry))
+        return entry
+
+    def _tombstone(self, key, version, prefixlen, prefix, seq):
+        table = self._tables.get((version, prefixlen))
+        entry = table.pop(prefix, None) if table is not None else None
+        if entry is None:
+            # Removed before we ever saw it (replaying the file): still a delta for cursors
+            entry = Entry(key, version, prefixlen, prefix, None, None, seq)
+        else:
+            self._size -= 1
+            if not table:
+                del self._tables[(version, prefixlen)]
+                self._lengths[version] = [item for item in self._lengths[version] if item[1] is not table]
+        entry.removed = True
+        entry.seq = seq
+        self._tombstones += 1
+        self._unpruned += 1
+        self._log_change(entry)
+
+    def _log_change(self, entry):
+        self._log_seqs.append(entry.seq)
+        self._log.append(entry)
+
+    def _compact(self):
+        # Superseded log slots pile up as entries are re-blocked; rebuild once they dominate
+        live = self._size + self._tombstones
+        if len(self._log) <= 2 * live + 1024 and self._tombstones <= self.max_tombstones:
+            return
+        if self._tombstones > self.max_tombstones:
+            # Forget the oldest tombstones; cursors from before them get a full reset
+            removed = [seq for seq, entry in zip(self._log_seqs, self._log) if entry.seq == seq and entry.removed]
+            self._floor = max(self._floor, removed[len(removed) - self.max_tombstones // 2 - 1])
+        keep = [entry for seq, entry in zip(self._log_seqs, self._log)
+                if entry.seq == seq and not (entry.removed and seq <= self._floor)]
+        self._tombstones = sum(entry.removed for entry in keep)
+        self._log = keep
+        self._log_seqs = [entry.seq for entry in keep]
+
+    def changes(self, since=0, limit=1000):
+        """One page of changes after cursor ``since``.
+
+        Returns ``{'blocked': [Entry...], 'removed': [network...], 'seq': cursor,
+        'more': bool, 'reset': bool}``. Pass ``seq`` back as the next ``since``.
+        ``reset`` means the cursor was too old (or from another list) and the
+        page starts over from the full list: drop local state first.
+        """
+        with self._lock:
+            self.sync()
+            self.expire()
+            reset = since < self._floor or since > self.seq
+            if reset:
+                since = 0
+            blocked, removed = [], []
+            i = bisect.bisect_right(self._log_seqs, since)
+            cursor = since
+            while i < len(self._log) and len(blocked) + len(removed) < limit:
+                seq, entry = self._log_seqs[i], self._log[i]
+                i += 1
+                if entry.seq != seq:
+                    continue  # superseded by a later change to the same entry
+                cursor = seq
+                if not entry.removed:
+                    blocked.append(entry)
+                elif not reset:
+                    removed.append(entry.network)
+            more = i < len(self._log)
+            return {'blocked': blocked, 'removed': removed, 'seq': cursor if more else self.seq,
+                    'more': more, 'reset': reset}
+
+    def apply(self, page):
+        """Mirror a ``/blocked_ips`` page from another Blocklist into this one (no persistence)."""
+        with self._lock:
+            if page.get('reset'):
+                self.clear()
+            for network in page.get('removed', ()):
+                self.remove(network)
+            expires = page.get('expires_at', {})
+            for network in page.get('blocked_ips', ()):
+                expires_at = expires.get(network)
+                ttl = expires_at - time.time() if expires_at else None
+                if ttl is None or ttl > 0:
+                    self.add(network, ttl)
+
+    def clear(self):
+        """Drop the in-memory index (the file, if any, is untouched)."""
+        with self._lock:
+            self._tables = {}
+            self._lengths = {4: [], 6: []}
+            self._expiry = []
+            self._log_seqs = []
+            self._log = []
+            self._tombstones = 0
+            self._size = 0
+            self._floor = self.seq
@@ -0,0 +1,364 @@
+import atexit
+import functools
+import ipaddress
+import itertools
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# SQL is kept in module constants so sqlite3's per-connection statement cache
+# (keyed by the exact SQL text) reuses the prepared statements across requests.
+CREATE_INCIDENTS_SQL = """
+    CREATE TABLE IF NOT EXISTS security_incidents (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp TEXT,
+        type TEXT,
+        ip TEXT,
+        details TEXT,
+        status TEXT
+    );
+"""
+LIST_TABLES_SQL = "SELECT name FROM sqlite_master WHERE type='table';"
+SCHEMA_VERSION_SQL = "PRAGMA schema_version;"
+# Reads the trigger-maintained summary instead of scanning security_incidents
+COUNT_INCIDENTS_SQL = "SELECT COALESCE(SUM(total), 0) FROM incident_summary;"
+COUNT_BY_STATUS_SQL = "SELECT status, total FROM incident_summary WHERE total > 0;"
+INSERT_INCIDENT_SQL = """
+    INSERT INTO security_incidents (timestamp, type, ip, details, status)
+    VALUES (?, ?, ?, ?, ?);
+"""
+DEFEND_IP_SQL = "UPDATE security_incidents SET status = 'DEFENDED' WHERE ip = ? AND status IS NOT 'DEFENDED';"
+# CIDR ranges: ip is TEXT, so range membership goes through the ip_in_network() SQL function
+DEFEND_NETWORK_SQL = (
+    "UPDATE security_incidents SET status = 'DEFENDED' WHERE status IS NOT 'DEFENDED' AND ip_in_network(ip, ?);"
+)
+PING_SQL = "SELECT 1;"
+# Incidents after a known id, for the /stream feed (rowid range scan)
+INCIDENT_COLUMNS = ('id', 'timestamp', 'type', 'ip', 'details', 'status')
+INCIDENTS_SINCE_SQL = f"SELECT {', '.join(INCIDENT_COLUMNS)} FROM security_incidents WHERE id > ? ORDER BY id LIMIT ?;"
+LAST_INCIDENT_ID_SQL = "SELECT COALESCE(MAX(id), 0) FROM security_incidents;"
+
+# Schema versions of every migrated schema in a file, keyed by schema name
+CREATE_SCHEMA_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS _sentials_schema (
+        name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL
+    );
+"""
+SELECT_SCHEMA_VERSION_SQL = "SELECT version FROM _sentials_schema WHERE name = ?;"
+SAVE_SCHEMA_VERSION_SQL = "INSERT OR IGNORE INTO _sentials_schema (name, version) VALUES (?, ?);"
+
+# Schema migrations, applied in order and tracked in _sentials_schema.
+MIGRATIONS = [
+    CREATE_INCIDENTS_SQL,
+    """
+    CREATE INDEX IF NOT EXISTS idx_incidents_ip ON security_incidents (ip);
+    CREATE INDEX IF NOT EXISTS idx_incidents_status ON security_incidents (status);
+    CREATE INDEX IF NOT EXISTS idx_incidents_timestamp ON security_incidents (timestamp);
+
+    CREATE TABLE IF NOT EXISTS incident_summary (
+        status TEXT PRIMARY KEY,
+        total INTEGER NOT NULL DEFAULT 0
+    );
+
+    CREATE TRIGGER IF NOT EXISTS trg_incidents_insert AFTER INSERT ON security_incidents
+    BEGIN
+        INSERT INTO incident_summary (status, total) VALUES (COALESCE(NEW.status, ''), 1)
+        ON CONFLICT (status) DO UPDATE SET total = total + 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_incidents_status AFTER UPDATE OF status ON security_incidents
+    WHEN OLD.status IS NOT NEW.status
+    BEGIN
+        UPDATE incident_summary SET total = total - 1 WHERE status = COALESCE(OLD.status, '');
+        INSERT INTO incident_summary (status, total) VALUES (COALESCE(NEW.status, ''), 1)
+        ON CONFLICT (status) DO UPDATE SET total = total + 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_incidents_delete AFTER DELETE ON security_incidents
+    BEGIN
+        UPDATE incident_summary SET total = total - 1 WHERE status = COALESCE(OLD.status, '');
+    END;
+
+    DELETE FROM incident_summary;
+    INSERT INTO incident_summary (status, total)
+        SELECT COALESCE(status, ''), COUNT(*) FROM security_incidents GROUP BY COALESCE(status, '');
+    """,
+]
+
+
+def resolve_db_path(database):
+    """Resolve a user supplied database name to an absolute file path once."""
+    return os.path.abspath(database if os.path.exists(database) else os.path.join(os.getcwd(), database))
+
+
+@functools.lru_cache(maxsize=256)
+def _network(network):
+    return ipaddress.ip_network(network, strict=False)
+
+
+def ip_in_network(ip, network):
+    """SQL function ``ip_in_network(ip, network)``: 1 if address ``ip`` is inside CIDR ``network``."""
+    try:
+        return int(ipaddress.ip_address(ip) in _network(network))
+    except (TypeError, ValueError):
+        return 0
+
+
+class ConnectionPool:
+    """Bounded pool of long-lived SQLite connections in WAL mode.
+
+    Connections are checked out per unit of work rather than bound to a
+    thread, because the Flask dev server spawns a fresh thread per request.
+    """
+
+    def __init__(self, path, size=8, timeout=5.0, cached_statements=128):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self._idle = queue.LifoQueue()
+        self._all = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self._tables = (None, 0)  # (schema_version, table count)
+
+    def _open(self):
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.timeout,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        conn.execute("PRAGMA journal_mode=WAL;")
+        conn.execute("PRAGMA synchronous=NORMAL;")
+        conn.create_function("ip_in_network", 2, ip_in_network, deterministic=True)
+        return conn
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Connection pool is closed")
+            if len(self._all) < self.size:
+                conn = self._open()
+                self._all.append(conn)
+                return conn
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(f"Timed out waiting for a connection to {self.path}")
+
+    def _release(self, conn):
+        if self._closed:
+            conn.close()
+        else:
+            self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    def query(self, sql, params=()):
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def execute(self, sql, params=()):
+        """Run a single write statement in its own transaction."""
+        with self.connection() as conn:
+            with conn:
+                return conn.execute(sql, params).rowcount
+
+    def table_count(self):
+        """Number of tables, re-listed only when the schema version changes."""
+        with self.connection() as conn:
+            version = conn.execute(SCHEMA_VERSION_SQL).fetchone()[0]
+            cached_version, count = self._tables
+            if version != cached_version:
+                count = len(conn.execute(LIST_TABLES_SQL).fetchall())
+                self._tables = (version, count)
+            return count
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            conns, self._all = self._all, []
+        for conn in conns:
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                pass
+
+
+def migrate(pool, migrations=MIGRATIONS, name='incidents', legacy_user_version=False):
+    """Bring schema ``name`` up to the latest version in ``migrations`` (incidents by default).
+
+    Versions live in our own _sentials_schema table, one row per schema, because
+    PRAGMA user_version belongs to whoever owns the file and users connect their
+    own databases. ``legacy_user_version`` starts from user_version instead of 0
+    when there is no row yet, for files only this app writes that were created
+    before the table existed.
+    """
+    with pool.connection() as conn:
+        with conn:
+            conn.execute(CREATE_SCHEMA_TABLE_SQL)
+        row = conn.execute(SELECT_SCHEMA_VERSION_SQL, (name,)).fetchone()
+        if row is not None:
+            version = row[0]
+        else:
+            version = 0
+            if legacy_user_version:
+                version = min(conn.execute("PRAGMA user_version;").fetchone()[0], len(migrations))
+            with conn:
+                conn.execute(SAVE_SCHEMA_VERSION_SQL, (name, version))
+        for target in range(version + 1, len(migrations) + 1):
+            conn.executescript(
+                f"BEGIN IMMEDIATE;\n{migrations[target - 1]}\n"
+                f"UPDATE _sentials_schema SET version = {target} WHERE name = '{name}';\nCOMMIT;"
+            )
+        return max(version, len(migrations))
+
+
+class IncidentWriter:
+    """Background writer that group-commits queued statements.
+
+    Handlers call ``submit`` and return immediately; the writer thread drains
+    up to ``max_batch`` items (waiting at most ``max_latency`` seconds for the
+    batch to fill) and commits them in a single transaction, running
+    consecutive items with the same SQL through ``executemany``. Writes keep
+    their submission order, so an UPDATE never overtakes an earlier INSERT.
+    """
+
+    _STOP = object()
+
+    def __init__(self, pool, max_batch=500, max_latency=0.05, max_queue=10000):
+        self.pool = pool
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="incident-writer", daemon=True)
+        self.batches = 0
+        self.rows = 0
+        self.errors = 0
+        self._thread.start()
+
+    def submit(self, sql, params, timeout=1.0):
+        """Queue a write, blocking up to ``timeout`` seconds while the queue is full.
+
+        Raises ``queue.Full`` if the writer cannot keep up.
+        """
+        self._queue.put((sql, params), timeout=timeout)
+
+    def flush(self):
+        """Block until everything submitted so far has been committed."""
+        self._queue.join()
+
+    def stats(self):
+        return {
+            'queued': self._queue.qsize(),
+            'batches': self.batches,
+            'rows': self.rows,
+            'errors': self.errors,
+        }
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is self._STOP:
+                self._queue.task_done()
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.max_latency
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is self._STOP:
+                    self._queue.task_done()
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                self._write(batch)
+            finally:
+                # flush() and close() wait on these whatever happened to the batch
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, batch):
+        try:
+            with self.pool.connection() as conn:
+                with conn:
+                    for sql, group in itertools.groupby(batch, key=lambda item: item[0]):
+                        conn.executemany(sql, [params for _, params in group])
+            self.batches += 1
+            self.rows += len(batch)
+        except Exception as e:
+            if len(batch) > 1:
+                # One bad statement rolls back the whole batch: retry one by one so only it is lost
+                for item in batch:
+                    self._write([item])
+                return
+            self.errors += 1
+            print(f"Error committing queued incident write to SQLite: {type(e).__name__}: {e}")
+
+
+_pools = {}
+_writers = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(database, **kwargs):
+    """Return the shared pool for ``database``, creating it on first use."""
+    path = resolve_db_path(database)
+    with _pools_lock:
+        pool = _pools.get(path)
+        if pool is None:
+            pool = ConnectionPool(path, **kwargs)
+            _pools[path] = pool
+        return pool
+
+
+def get_writer(database, **kwargs):
+    """Return the shared background writer for ``database``."""
+    pool = get_pool(database)
+    with _pools_lock:
+        writer = _writers.get(pool.path)
+        if writer is None:
+            writer = IncidentWriter(pool, **kwargs)
+            _writers[pool.path] = writer
+        return writer
+
+
+def close_all():
+    with _pools_lock:
+        writers = list(_writers.values())
+        pools = list(_pools.values())
+        _writers.clear()
+        _pools.clear()
+    # Writers flush their queues before the pools they write through go away
+    for writer in writers:
+        writer.close()
+    for pool in pools:
+        pool.close()
+
+
+atexit.register(close_all)
@@ -0,0 +1,329 @@
+"""Append-only time-series store for system and agent metrics, backed by SQLite.
+
+Samples land in ``metrics_raw`` and are rolled up into per-minute and
+per-hour tables as they are written, so a range query reads at most a few
+thousand pre-aggregated rows whatever the span. Each resolution keeps its own
+retention: raw samples for days, minutes for weeks, hours indefinitely.
+
+Usage: python metrics_store.py import <csv> [--db metrics.db]
+       python metrics_store.py query <series> [--hours 24] [--db metrics.db]
+"""
+import argparse
+import csv
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from db import get_pool, migrate
+
+METRICS_MIGRATIONS = [
+    """
+    CREATE TABLE IF NOT EXISTS series (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE
+    );
+    CREATE TABLE IF NOT EXISTS metrics_raw (
+        series_id INTEGER NOT NULL,
+        ts REAL NOT NULL,
+        value REAL NOT NULL,
+        PRIMARY KEY (series_id, ts)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS metrics_1m (
+        series_id INTEGER NOT NULL,
+        bucket INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        total REAL NOT NULL,
+        min REAL NOT NULL,
+        max REAL NOT NULL,
+        PRIMARY KEY (series_id, bucket)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS metrics_1h (
+        series_id INTEGER NOT NULL,
+        bucket INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        total REAL NOT NULL,
+        min REAL NOT NULL,
+        max REAL NOT NULL,
+        PRIMARY KEY (series_id, bucket)
+    ) WITHOUT ROWID;
+    """,
+]
+
+INSERT_SERIES_SQL = "INSERT OR IGNORE INTO series (name) VALUES (?);"
+SELECT_SERIES_SQL = "SELECT id FROM series WHERE name = ?;"
+LIST_SERIES_SQL = "SELECT name FROM series ORDER BY name;"
+# A sample re-sent for the same instant (e.g. a re-imported CSV) is ignored, not double counted
+INSERT_RAW_SQL = "INSERT OR IGNORE INTO metrics_raw (series_id, ts, value) VALUES (?, ?, ?);"
+# Rollups are rebuilt from the finer table for just the buckets a batch touched,
+# which keeps them exact (and idempotent) however samples arrive.
+ROLLUP_1M_SQL = """
+    INSERT OR REPLACE INTO metrics_1m (series_id, bucket, count, total, min, max)
+    SELECT series_id, CAST(ts / 60 AS INTEGER) * 60, COUNT(*), SUM(value), MIN(value), MAX(value)
+    FROM metrics_raw WHERE series_id = ? AND ts >= ? AND ts < ?
+    GROUP BY 2;
+"""
+ROLLUP_1H_SQL = """
+    INSERT OR REPLACE INTO metrics_1h (series_id, bucket, count, total, min, max)
+    SELECT series_id, bucket / 3600 * 3600, SUM(count), SUM(total), MIN(min), MAX(max)
+    FROM metrics_1m WHERE series_id = ? AND bucket >= ? AND bucket < ?
+    GROUP BY 2;
+"""
+# Query SQL per table; ``?`` step regroups native rows into wider buckets when needed
+QUERY_RAW_SQL = """
+    SELECT CAST(ts / ? AS INTEGER) * ? AS b, AVG(value), MIN(value), MAX(value)
+    FROM metrics_raw WHERE series_id = ? AND ts >= ? AND ts < ?
+    GROUP BY b ORDER BY b;
+"""
+QUERY_ROLLUP_SQL = """
+    SELECT bucket / ? * ? AS b, SUM(total) / SUM(count), MIN(min), MAX(max)
+    FROM {table} WHERE series_id = ? AND bucket >= ? AND bucket < ?
+    GROUP BY b ORDER BY b;
+"""
+PRUNE_SQL = "DELETE FROM {table} WHERE series_id = ? AND {column} < ?;"
+
+DAY = 86400
+RAW_RETENTION_S = float(os.environ.get('METRICS_RAW_RETENTION_S', 2 * DAY))
+MINUTE_RETENTION_S = float(os.environ.get('METRICS_1M_RETENTION_S', 30 * DAY))
+
+# (name, table, time column, native step in seconds, retention in seconds or None)
+RESOLUTIONS = (
+    ('raw', 'metrics_raw', 'ts', 1, RAW_RETENTION_S),
+    ('1m', 'metrics_1m', 'bucket', 60, MINUTE_RETENTION_S),
+    ('1h', 'metrics_1h', 'bucket', 3600, None),
+)
+# Auto resolution scans at most this many native rows per returned point
+SCAN_FACTOR = 10
+
+# CSV columns from Optimizer/data/system_metrics.csv and the series they feed
+CSV_SERIES = {
+    'cpu': 'system.cpu_percent',
+    'memory': 'system.memory_percent',
+    'disk': 'system.disk_percent',
+    'bytes_sent': 'system.bytes_sent',
+    'bytes_recv': 'system.bytes_recv',
+}
+
+
+class MetricsStore:
+    """Series registry, batched writes, rollups, retention and range queries."""
+
+    def __init__(self, path):
+        self.pool = get_pool(path)
+        migrate(self.pool, METRICS_MIGRATIONS, name='metrics', legacy_user_version=True)
+        self._series = {}  # name -> id, filled on first use
+        self._lock = threading.Lock()
+
+    def series_id(self, conn, name):
+        series_id = self._series.get(name)
+        if series_id is None:
+            conn.execute(INSERT_SERIES_SQL, (name,))
+            series_id = conn.execute(SELECT_SERIES_SQL, (name,)).fetchone()[0]
+            self._series[name] = series_id
+        return series_id
+
+    def series(self):
+        return [name for (name,) in self.pool.query(LIST_SERIES_SQL)]
+
+    def write(self, samples):
+        """Append ``(name, ts, value)`` samples and refresh the rollups, in one transaction."""
+        if not samples:
+            return 0
+        spans = {}  # series id -> [first ts, last ts] touched by this batch
+        rows = []
+        with self._lock, self.pool.connection() as conn:
+            with conn:
+                for name, ts, value in samples:
+                    series_id = self.series_id(conn, name)
+                    rows.append((series_id, ts, value))
+                    span = spans.get(series_id)
+                    if span is None:
+                        spans[series_id] = [ts, ts]
+                    elif ts < span[0]:
+                        span[0] = ts
+                    elif ts > span[1]:
+                        span[1] = ts
+                conn.executemany(INSERT_RAW_SQL, rows)
+                for series_id, (first, last) in spans.items():
+                    minute_start = int(first // 60) * 60
+                    minute_end = int(last // 60) * 60 + 60
+                    conn.execute(ROLLUP_1M_SQL, (series_id, minute_start, minute_end))
+                    hour_start = int(first // 3600) * 3600
+                    conn.execute(ROLLUP_1H_SQL, (series_id, hour_start, int(last // 3600) * 3600 + 3600))
+        return len(rows)
+
+    def prune(self, now=None):
+        """Drop raw samples and minute rollups past their retention; returns rows deleted."""
+        now = time.time() if now is None else now
+        deleted = 0
+        with self._lock, self.pool.connection() as conn:
+            with conn:
+                series_ids = [series_id for (series_id,) in conn.execute("SELECT id FROM series;")]
+                for _, table, column, _, retention in RESOLUTIONS:
+                    if retention is None:
+                        continue
+                    sql = PRUNE_SQL.format(table=table, column=column)
+                    for series_id in series_ids:
+                        # One primary-key range delete per series
+                        deleted += conn.execute(sql, (series_id, now - retention)).rowcount
+        return deleted
+
+    def pick_resolution(self, start, end, max_points, now=None):
+        """Finest resolution that still holds ``start`` and fits the scan budget."""
+        now = time.time() if now is None else now
+        for resolution in RESOLUTIONS:
+            _, _, _, step, retention = resolution
+            if retention is not None and start < now - retention:
+                continue
+            if (end - start) / step <= max_points * SCAN_FACTOR:
+                return resolution
+        return RESOLUTIONS[-1]
+
+    def query(self, name, start, end, resolution='auto', max_points=1000):
+        """Return ``(resolution name, step, [[ts, avg, min, max], ...])`` for ``start <= ts < end``.
+
+        Rows are regrouped into wider buckets when the span would otherwise
+        return more than ``max_points`` points.
+        """
+        if resolution == 'auto':
+            resolution = self.pick_resolution(start, end, max_points)
+        else:
+            matches = [r for r in RESOLUTIONS if r[0] == resolution]
+            if not matches:
+                raise ValueError(f"Unknown resolution {resolution!r}; expected auto or one of "
+                                 f"{[r[0] for r in RESOLUTIONS]}")
+            resolution = matches[0]
+        label, table, _, native, _ = resolution
+        step = max(native, math.ceil((end - start) / max(max_points, 1) / native) * native)
+
+        series_id = self._series.get(name)
+        if series_id is None:
+            rows = self.pool.query(SELECT_SERIES_SQL, (name,))
+            if not rows:
+                return label, step, []
+            series_id = self._series[name] = rows[0][0]
+
+        if table == 'metrics_raw':
+            rows = self.pool.query(QUERY_RAW_SQL, (step, step, series_id, start, end))
+        else:
+            rows = self.pool.query(QUERY_ROLLUP_SQL.format(table=table),
+                                   (step, step, series_id, int(start // native) * native, end))
+        return label, step, [[b, round(avg, 3), lo, hi] for b, avg, lo, hi in rows]
+
+
+class MetricsRecorder:
+    """Buffers samples from the sampler and agents and writes them in batches.
+
+    ``record`` only appends to an in-memory list; a background thread hands
+    the buffer to ``MetricsStore.write`` every ``flush_interval`` seconds and
+    applies retention every ``prune_interval`` seconds.
+    """
+
+    def __init__(self, store, flush_interval=5.0, prune_interval=600.0, max_buffer=100000):
+        self.store = store
+        self.flush_interval = flush_interval
+        self.prune_interval = prune_interval
+        self.max_buffer = max_buffer
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_prune = time.monotonic()
+        self.rows = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def record(self, name, value, ts=None):
+        self.record_many({name: value}, ts)
+
+    def record_many(self, values, ts=None):
+        """Record several series sampled at the same instant; ``None`` values are skipped."""
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            if len(self._buffer) >= self.max_buffer:
+                self.dropped += len(values)
+                return
+            self._buffer.extend((name, ts, float(value)) for name, value in values.items() if value is not None)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="metrics-recorder", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def flush(self):
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        try:
+            self.rows += self.store.write(batch)
+        except sqlite3.Error as e:
+            self.errors += len(batch)
+            print(f"Error writing {len(batch)} metric samples to SQLite: {e}")
+
+    def stats(self):
+        return {'buffered': len(self._buffer), 'rows': self.rows, 'dropped': self.dropped, 'errors': self.errors}
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+            if time.monotonic() - self._last_prune >= self.prune_interval:
+                self._last_prune = time.monotonic()
+                try:
+                    self.store.prune()
+                except sqlite3.Error as e:
+                    print(f"Error pruning old metric samples: {e}")
+
+
+def import_csv(store, path, batch_size=50000):
+    """Load a ``timestamp,cpu,memory,...`` CSV (local time) into the store."""
+    imported = 0
+    batch = []
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            try:
+                ts = time.mktime(time.strptime(row['timestamp'], '%Y-%m-%d %H:%M:%S'))
+            except (KeyError, ValueError):
+                continue
+            for column, name in CSV_SERIES.items():
+                if row.get(column):
+                    batch.append((name, ts, float(row[column])))
+            if len(batch) >= batch_size:
+                imported += store.write(batch)
+                batch = []
+    imported += store.write(batch)
+    store.prune()
+    return imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'metrics.db'))
+    commands = parser.add_subparsers(dest='command', required=True)
+    importer = commands.add_parser('import', help='load a system_metrics.csv export')
+    importer.add_argument('csv')
+    query = commands.add_parser('query', help='print a series at automatic resolution')
+    query.add_argument('series')
+    query.add_argument('--hours', type=float, default=24)
+    query.add_argument('--resolution', default='auto')
+    args = parser.parse_args()
+
+    store = MetricsStore(args.db)
+    if args.command == 'import':
+        print(f"Imported {import_csv(store, args.csv)} samples into {store.pool.path}")
+    else:
+        end = time.time()
+        label, step, points = store.query(args.series, end - args.hours * 3600, end, args.resolution)
+        print(f"{args.series}: {len(points)} points at {label} (step {step}s)")
+        for ts, avg, lo, hi in points:
+            print(f"  {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ts))}  avg={avg} min={lo} max={hi}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+import itertools
+import threading
+import time
+
+
+class TokenBucket:
+    __slots__ = ('tokens', 'updated')
+
+    def __init__(self, tokens, updated):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class RateLimiter:
+    """Per-key token buckets: ``rate`` requests/second sustained, bursts of ``burst``.
+
+    A bucket is created full on a key's first request and refilled lazily on
+    its next one, so idle keys cost nothing per tick. At ``max_keys`` the
+    table first drops buckets that have refilled completely (they hold no
+    state worth keeping), then the oldest half if that wasn't enough, so a
+    flood of one-off source addresses can't grow it without bound.
+    """
+
+    def __init__(self, rate, burst, max_keys=100000):
+        if rate <= 0 or burst < 1:
+            raise ValueError(f"RateLimiter needs rate > 0 and burst >= 1, got rate={rate} burst={burst}")
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.limited = 0
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def hit(self, key, now=None):
+        """Spend a token for ``key``: 0.0 if allowed, else seconds until the next token."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_keys:
+                    self._evict(now)
+                bucket = self._buckets[key] = TokenBucket(self.burst, now)
+            else:
+                bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+                bucket.updated = now
+            if bucket.tokens >= 1:
+                bucket.tokens -= 1
+                self.allowed += 1
+                return 0.0
+            self.limited += 1
+            return (1 - bucket.tokens) / self.rate
+
+    def _evict(self, now):
+        refill = self.burst / self.rate
+        idle = [key for key, bucket in self._buckets.items() if now - bucket.updated >= refill]
+        if len(idle) < self.max_keys // 10:
+            # Mostly active keys: drop the oldest half (dicts keep insertion order)
+            idle = list(itertools.islice(self._buckets, len(self._buckets) // 2))
+        for key in idle:
+            del self._buckets[key]
+        self.evicted += len(idle)
+
+    def stats(self):
+        return {
+            'clients': len(self._buckets),
+            'allowed': self.allowed,
+            'limited': self.limited,
+            'evicted': self.evicted,
+        }
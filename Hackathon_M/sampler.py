@@ -0,0 +1,197 @@
+import heapq
+import threading
+import time
+
+import psutil
+
+HEAVY_CPU_PERCENT = 10
+TOP_N = 5
+
+
+class ProcessEntry:
+    __slots__ = ('pid', 'create_time', 'name', 'cpu_total', 'cpu_percent', 'rss')
+
+    def __init__(self, pid, create_time, name):
+        self.pid = pid
+        self.create_time = create_time
+        self.name = name
+        self.cpu_total = None
+        self.cpu_percent = 0.0
+        self.rss = 0
+
+    def as_dict(self):
+        return {
+            'pid': self.pid,
+            'create_time': self.create_time,
+            'name': self.name,
+            'cpu_percent': round(self.cpu_percent, 1),
+            'rss_mb': round(self.rss / (1024 * 1024), 1)
+        }
+
+
+class ProcessTable:
+    """Per-process CPU baselines that persist across samples.
+
+    Entries are keyed by (pid, create_time) and hold the previous tick's
+    numbers, not psutil.Process objects: a cached Process would go on reading
+    whatever process later gets its pid, so each tick opens ``Process(pid)``
+    (which reads the create time) and reads CPU times and RSS in one
+    ``oneshot``. A recycled pid is a different key and never inherits the old
+    baseline. A process seen for the first time is primed and reports 0%
+    until the next tick, and its name is only read then. Processes that
+    disappear are evicted.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._last_tick = None
+
+    def refresh(self):
+        now = time.monotonic()
+        wall = (now - self._last_tick) if self._last_tick is not None else None
+        self._last_tick = now
+
+        previous = self._entries
+        fresh = {}
+        for pid in psutil.pids():
+            try:
+                # Process() reads the create time, which identifies this process behind the pid
+                proc = psutil.Process(pid)
+                key = (pid, proc.create_time())
+                entry = previous.get(key)
+                if entry is None:
+                    entry = ProcessEntry(pid, key[1], proc.name())
+                with proc.oneshot():
+                    times = proc.cpu_times()
+                    rss = proc.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                continue
+
+            cpu_total = times.user + times.system
+            if entry.cpu_total is not None and wall:
+                entry.cpu_percent = (cpu_total - entry.cpu_total) / wall * 100
+            entry.cpu_total = cpu_total
+            entry.rss = rss
+            fresh[key] = entry
+
+        # Swapped in whole so readers on other threads never see a half-built table
+        self._entries = fresh
+
+    def __len__(self):
+        return len(self._entries)
+
+    def heavy(self, cpu_threshold=HEAVY_CPU_PERCENT):
+        return [entry for entry in self._entries.values() if entry.cpu_percent > cpu_threshold]
+
+    def top_cpu(self, n=TOP_N):
+        return heapq.nlargest(n, self._entries.values(), key=lambda entry: entry.cpu_percent)
+
+    def top_rss(self, n=TOP_N):
+        return heapq.nlargest(n, self._entries.values(), key=lambda entry: entry.rss)
+
+
+class SystemSampler:
+    """Refreshes a shared system snapshot from a single background thread.
+
+    Request handlers call ``snapshot()``, which only copies the latest sample,
+    so no request ever waits on ``psutil.cpu_percent(interval=...)``.
+    """
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self._current = None  # (snapshot, monotonic sample time), swapped atomically
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._listeners = []
+        self.processes = ProcessTable()
+
+    def add_listener(self, listener):
+        """Call ``listener(snapshot)`` from the sampler thread after every sample."""
+        self._listeners.append(listener)
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return self
+            # Short blocking first sample so the very first request gets real numbers
+            psutil.cpu_percent(interval=None)
+            self.processes.refresh()
+            time.sleep(0.1)
+            self._sample()
+            self._thread = threading.Thread(target=self._run, name="system-sampler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def snapshot(self):
+        snapshot, sampled_at = self._current
+        data = dict(snapshot)
+        data['sample_age_ms'] = round((time.monotonic() - sampled_at) * 1000, 1)
+        return data
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self._sample()
+            except Exception as e:
+                print(f"System sampler failed to refresh snapshot: {e}")
+
+    def _sample(self):
+        started = time.perf_counter()
+        cpu_started = time.thread_time()
+
+        # Non-blocking: cpu_percent(None) reports usage since the previous tick
+        cpu_percent = psutil.cpu_percent(interval=None)
+        memory_info = psutil.virtual_memory()
+        disk_usage = psutil.disk_usage('/')
+        network_info = psutil.net_io_counters()
+
+        self.processes.refresh()
+        heavy = self.processes.heavy()
+        processes = [f"{entry.name} (PID: {entry.pid})" for entry in heavy]
+
+        elapsed = time.perf_counter() - started
+        cpu_used = time.thread_time() - cpu_started
+        snapshot = {
+            'cpu_percent': cpu_percent,
+            'memory_percent': memory_info.percent,
+            'disk_percent': disk_usage.percent,
+            'bytes_sent': network_info.bytes_sent,
+            'bytes_recv': network_info.bytes_recv,
+            'heavy_processes': processes,
+            # pid + create_time, so another process (the optimizer) can act on them safely
+            'heavy': [entry.as_dict() for entry in heavy],
+            'top_cpu': [entry.as_dict() for entry in self.processes.top_cpu()],
+            'top_memory': [entry.as_dict() for entry in self.processes.top_rss()],
+            'process_count': len(self.processes),
+            'sampled_at': time.time(),
+            'sample_interval_s': self.interval,
+            'sampler_overhead_ms': round(elapsed * 1000, 2),
+            'sampler_cpu_percent': round(cpu_used / self.interval * 100, 2)
+        }
+        self._current = (snapshot, time.monotonic())
+        for listener in self._listeners:
+            try:
+                listener(snapshot)
+            except Exception as e:
+                print(f"System sampler listener failed: {e}")
+
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def get_sampler(interval=1.0):
+    """Return the process-wide sampler, starting it on first use."""
+    global _sampler
+    if _sampler is not None:
+        return _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            _sampler = SystemSampler(interval).start()
+        return _sampler
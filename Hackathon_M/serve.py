@@ -0,0 +1,133 @@
+"""Production entry point: the command center (or the optimizer) under several worker processes.
+
+``app.run(debug=True)`` is one process with the reloader; this runs the same
+Flask app under gunicorn with --workers processes of --threads threads each.
+Workers share auto_defend, the connected database and the blocklist through
+SQLite (STATE_DB, BLOCKLIST_DB), so any worker can serve any request. Where
+gunicorn isn't available (Windows) it falls back to waitress, which is one
+process with --workers x --threads threads.
+
+Each worker keeps its own rate-limit buckets, so a source can get up to
+workers x RATE_LIMIT_RPS through in total (RATE_LIMIT_RPS=0 turns the limiter
+off). Loopback and the comma-separated FILTER_ALLOWLIST ranges bypass both
+the rate limit and the blocklist. Only one worker (whichever takes
+the lock next to METRICS_DB first) records system metrics. An open /stream
+holds one of its worker's threads for as long as the dashboard is open, so
+size --threads for the expected dashboards, or use --asgi.
+
+--asgi serves the async variant of the command center (asgi_app.py) under
+uvicorn instead: one event loop per worker, no request threads.
+
+Usage: python serve.py [--app command-center|optimizer] [--bind 127.0.0.1:5000]
+                       [--workers N] [--threads 4] [--asgi]
+"""
+import argparse
+import importlib
+import os
+import sys
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APPS = {
+    'command-center': (HERE, 'app', '127.0.0.1:5000'),
+    'optimizer': (os.path.join(HERE, '..', 'Optimizer'), 'optimizer', '127.0.0.1:8080'),
+}
+
+# Defaults, overridable per deployment
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1))
+WEB_THREADS = int(os.environ.get('WEB_THREADS', 4))
+
+_recorder_lock = None  # Open lock file held for life by the worker that records metrics
+
+
+def load_module(name):
+    directory, module, _ = APPS[name]
+    directory = os.path.abspath(directory)
+    if directory not in sys.path:
+        sys.path.insert(0, directory)
+    return importlib.import_module(module)
+
+
+def claim_metrics_recording(module):
+    """Start metrics recording in this process unless another worker already holds the lock."""
+    global _recorder_lock
+    if not hasattr(module, 'start_metrics_recording') or _recorder_lock is not None:
+        return False
+    if fcntl is not None:
+        lock = open(module.METRICS_DB + '.recorder.lock', 'w')
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock.close()
+            return False
+        _recorder_lock = lock  # released by the OS when this worker exits
+    else:
+        _recorder_lock = True  # waitress: a single process
+    module.start_metrics_recording()
+    return True
+
+
+def serve_gunicorn(name, bind, workers, threads):
+    from gunicorn.app.base import BaseApplication
+
+    class Application(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', bind)
+            self.cfg.set('workers', workers)
+            self.cfg.set('threads', threads)
+            self.cfg.set('worker_class', 'gthread')
+            self.cfg.set('post_worker_init', lambda worker: claim_metrics_recording(load_module(name)))
+
+        def load(self):
+            # Imported in each worker after the fork, so no threads or SQLite handles are inherited
+            return load_module(name).app
+
+    Application().run()
+
+
+def serve_waitress(name, bind, workers, threads):
+    import waitress
+
+    module = load_module(name)
+    claim_metrics_recording(module)
+    waitress.serve(module.app, listen=bind, threads=workers * threads)
+
+
+def serve_asgi(bind, workers):
+    import uvicorn
+
+    host, port = bind.rsplit(':', 1)
+    uvicorn.run('asgi_app:app', host=host, port=int(port), workers=workers, app_dir=HERE, log_level='warning')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--app', choices=sorted(APPS), default='command-center')
+    parser.add_argument('--bind', help='host:port (default 127.0.0.1:5000, or :8080 for the optimizer)')
+    parser.add_argument('--workers', type=int, default=WEB_CONCURRENCY)
+    parser.add_argument('--threads', type=int, default=WEB_THREADS)
+    parser.add_argument('--asgi', action='store_true', help='serve asgi_app.py with uvicorn (command center only)')
+    args = parser.parse_args()
+    bind = args.bind or APPS[args.app][2]
+
+    if args.asgi:
+        if args.app != 'command-center':
+            parser.error('--asgi is only available for the command center')
+        serve_asgi(bind, args.workers)
+        return
+
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        print("gunicorn not installed, serving with waitress in a single process")
+        serve_waitress(args.app, bind, args.workers, args.threads)
+    else:
+        serve_gunicorn(args.app, bind, args.workers, args.threads)
+
+
+if __name__ == '__main__':
+    main()
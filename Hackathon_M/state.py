@@ -0,0 +1,74 @@
+"""Application state shared by every worker process through a small SQLite file.
+
+Values are JSON documents keyed by name. Each process keeps them cached and
+re-reads the table only after another process has committed a change, which
+SQLite reports through ``PRAGMA data_version`` on our own connection, so a
+read is one cheap pragma in the common case and writers are visible to every
+worker on their next request.
+"""
+import json
+import threading
+
+from db import ConnectionPool, migrate, resolve_db_path
+
+STATE_MIGRATIONS = [
+    """
+    CREATE TABLE IF NOT EXISTS app_state (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    );
+    """,
+]
+
+DATA_VERSION_SQL = "PRAGMA data_version;"
+LOAD_STATE_SQL = "SELECT key, value FROM app_state;"
+SAVE_STATE_SQL = """
+    INSERT INTO app_state (key, value) VALUES (?, ?)
+    ON CONFLICT (key) DO UPDATE SET value = excluded.value;
+"""
+
+
+class SharedState:
+    """Cross-process key/value state with in-process caching.
+
+    ``defaults`` supplies values for keys nobody has written yet. Callers get
+    the cached object itself: treat it as read-only and ``set`` a new value
+    to change it.
+    """
+
+    def __init__(self, path, defaults=None):
+        # One private connection: data_version is tracked per connection
+        self.pool = ConnectionPool(resolve_db_path(path), size=1)
+        migrate(self.pool, STATE_MIGRATIONS, name='state', legacy_user_version=True)
+        self.defaults = dict(defaults or {})
+        self._values = {}
+        self._version = None
+        self._lock = threading.Lock()
+
+    def _refresh(self, conn):
+        version = conn.execute(DATA_VERSION_SQL).fetchone()[0]
+        if version != self._version:
+            self._values = {key: json.loads(value) for key, value in conn.execute(LOAD_STATE_SQL)}
+            self._version = version
+
+    def get(self, key):
+        with self._lock, self.pool.connection() as conn:
+            self._refresh(conn)
+            return self._values.get(key, self.defaults.get(key))
+
+    def set(self, key, value):
+        encoded = json.dumps(value)
+        with self._lock, self.pool.connection() as conn:
+            self._refresh(conn)
+            with conn:
+                conn.execute(SAVE_STATE_SQL, (key, encoded))
+            # Our own commits don't move data_version, so update the cache directly
+            self._values[key] = json.loads(encoded)
+
+    def snapshot(self):
+        with self._lock, self.pool.connection() as conn:
+            self._refresh(conn)
+            return {**self.defaults, **self._values}
+
+    def close(self):
+        self.pool.close()
@@ -0,0 +1,209 @@
+"""Server-sent events for /stream: one producer per process, any number of listeners.
+
+A single hub thread calls each source once per tick, encodes the result as an
+SSE chunk once, and hands the same bytes to every subscriber, so N open
+dashboards cost one sample and one round of SQLite reads per tick rather
+than N. State sources (system snapshot, DB status) are only re-sent when
+they change and are replayed to new subscribers; event sources (incidents)
+are sent once and not replayed. A subscriber that falls ``max_pending``
+chunks behind is closed; EventSource reconnects and gets a fresh replay.
+"""
+import asyncio
+import collections
+import json
+import threading
+
+HEARTBEAT = b": keepalive\n\n"
+
+
+def encode(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload, separators=(',', ':'))}\n\n".encode()
+
+
+class Subscriber:
+    """A thread-served client's pending chunks (WSGI workers)."""
+
+    __slots__ = ('pending', 'max_pending', 'closed', '_ready')
+
+    def __init__(self, max_pending=32):
+        self.pending = collections.deque()
+        self.max_pending = max_pending
+        self.closed = False
+        self._ready = threading.Condition()
+
+    def send(self, chunk):
+        with self._ready:
+            if len(self.pending) >= self.max_pending:
+                self.closed = True
+            elif not self.closed:
+                self.pending.append(chunk)
+            self._ready.notify()
+            return not self.closed
+
+    def close(self):
+        with self._ready:
+            self.closed = True
+            self._ready.notify()
+
+    def chunks(self, heartbeat):
+        """Yield batches of chunks as they arrive, or a heartbeat after ``heartbeat`` idle seconds."""
+        while True:
+            with self._ready:
+                if not self.pending and not self.closed:
+                    self._ready.wait(heartbeat)
+                if self.closed:
+                    return
+                batch = b''.join(self.pending)
+                self.pending.clear()
+            yield batch or HEARTBEAT
+
+
+class AsyncSubscriber:
+    """An event-loop-served client's pending chunks (asgi_app.py); ``send`` is called from the hub thread."""
+
+    __slots__ = ('loop', 'pending', 'max_pending', 'closed', '_ready')
+
+    def __init__(self, loop, max_pending=32):
+        self.loop = loop
+        self.pending = collections.deque()
+        self.max_pending = max_pending
+        self.closed = False
+        self._ready = asyncio.Event()
+
+    def send(self, chunk):
+        if self.closed:
+            return False
+        try:
+            self.loop.call_soon_threadsafe(self._put, chunk)
+        except RuntimeError:  # loop already closed
+            self.closed = True
+        return not self.closed
+
+    def _put(self, chunk):
+        if len(self.pending) >= self.max_pending:
+            self.closed = True
+        else:
+            self.pending.append(chunk)
+        self._ready.set()
+
+    def close(self):
+        self.closed = True
+        try:
+            self.loop.call_soon_threadsafe(self._ready.set)
+        except RuntimeError:
+            pass
+
+    async def chunks(self, heartbeat):
+        while True:
+            try:
+                await asyncio.wait_for(self._ready.wait(), heartbeat)
+            except asyncio.TimeoutError:
+                yield HEARTBEAT
+                continue
+            self._ready.clear()
+            if self.closed:
+                return
+            batch = b''.join(self.pending)
+            self.pending.clear()
+            if batch:
+                yield batch
+
+
+class StreamHub:
+    """Ticks every ``interval`` seconds while anyone is subscribed.
+
+    ``state_sources`` and ``event_sources`` map event names to callables that
+    return a JSON-able payload, or None for nothing to send this tick.
+    """
+
+    def __init__(self, interval, state_sources, event_sources=None, retry_ms=3000):
+        self.interval = interval
+        self.state_sources = dict(state_sources)
+        self.event_sources = dict(event_sources or {})
+        self.retry = f"retry: {retry_ms}\n\n".encode()
+        self._latest = {}  # state event name -> last chunk sent
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.ticks = 0
+        self.chunks_sent = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    def subscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.add(subscriber)
+            replay = [self.retry] + list(self._latest.values())
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="stream-hub", daemon=True)
+                self._thread.start()
+        if len(replay) == 1:
+            self._wake.set()  # nothing sampled yet: tick now rather than after a full interval
+        subscriber.send(b''.join(replay))
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+        subscriber.close()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self._subscribers:
+                self.tick()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def tick(self):
+        """Compute every source once and broadcast what changed."""
+        self.ticks += 1
+        chunks = []
+        for name, source in self.state_sources.items():
+            payload = self._call(name, source)
+            if payload is None:
+                continue
+            chunk = encode(name, payload)
+            if chunk != self._latest.get(name):
+                self._latest[name] = chunk
+                chunks.append(chunk)
+        for name, source in self.event_sources.items():
+            payload = self._call(name, source)
+            if payload is not None:
+                chunks.append(encode(name, payload))
+        if chunks:
+            self.broadcast(b''.join(chunks))
+
+    def broadcast(self, chunk):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            if subscriber.send(chunk):
+                self.chunks_sent += 1
+            else:
+                self.dropped += 1
+                self.unsubscribe(subscriber)
+
+    def _call(self, name, source):
+        try:
+            return source()
+        except Exception as e:
+            print(f"Stream source {name} failed: {e}")
+            return None
+
+    def stats(self):
+        return {
+            'subscribers': len(self._subscribers),
+            'ticks': self.ticks,
+            'chunks_sent': self.chunks_sent,
+            'dropped': self.dropped,
+        }
@@ -0,0 +1,144 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+# Keep the app's SQLite files out of the source tree
+_DATA_DIR = tempfile.mkdtemp()
+for _name in ('BLOCKLIST_DB', 'STATE_DB', 'METRICS_DB'):
+    os.environ.setdefault(_name, os.path.join(_DATA_DIR, _name.lower() + '.db'))
+
+import app
+from blocklist import Blocklist
+from metrics_store import MetricsStore
+from ratelimit import RateLimiter
+from state import SharedState
+
+
+def tearDownModule():
+    shutil.rmtree(_DATA_DIR, ignore_errors=True)
+
+
+class AppTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.saved = (app.blocklist, app.state, app.rate_limiter, app._incident_store, app.metrics_store)
+        app.blocklist = Blocklist(min_prefix=app.BLOCKLIST_MIN_PREFIX, protected=app.BLOCKLIST_PROTECTED)
+        app.state = SharedState(os.path.join(self.dir, 'state.db'), dict(app.STATE_DEFAULTS, auto_defend=True))
+        app.rate_limiter = None
+        self.client = app.app.test_client()
+
+    def tearDown(self):
+        app.blocklist, app.state, app.rate_limiter, app._incident_store, app.metrics_store = self.saved
+        shutil.rmtree(self.dir)
+
+    def post(self, path, body, ip='127.0.0.1'):
+        return self.client.post(path, json=body, environ_base={'REMOTE_ADDR': ip})
+
+
+class TestBlockEndpoints(AppTestCase):
+    def test_block_and_unblock(self):
+        response = self.post('/block_ip', {'ips': ['203.0.113.0/24', '198.51.100.7']})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get('/server_info', environ_base={'REMOTE_ADDR': '203.0.113.9'}).status_code, 403)
+
+        response = self.post('/unblock_ip', {'ips': ['203.0.113.0/24', '192.0.2.1']})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['unblocked'], ['203.0.113.0/24'])
+        self.assertEqual(response.json['not_listed'], ['192.0.2.1'])
+        self.assertEqual(self.client.get('/server_info', environ_base={'REMOTE_ADDR': '203.0.113.9'}).status_code, 200)
+        self.assertEqual(self.client.get('/blocked_ips').json['total'], 1)
+
+    def test_blocking_a_range_defends_its_incidents(self):
+        database = os.path.join(self.dir, 'incidents.db')
+        app.get_state().set('connected_db', {'type': 'sqlite', 'host': '', 'port': None, 'database': database})
+        pool, writer = app.get_incident_store(app.get_state().get('connected_db'))
+        for ip in ('203.0.113.5', '203.0.113.200', '198.51.100.7'):
+            writer.submit(app.INSERT_INCIDENT_SQL, ('2026-01-01 00:00:00', 'Port Scan', ip, '', 'ACTIVE'))
+
+        response = self.post('/block_ip', {'ip': '203.0.113.0/24'})
+        self.assertEqual(response.json['blocked_ips'], ['203.0.113.0/24'])
+        writer.flush()
+        rows = dict(pool.query("SELECT ip, status FROM security_incidents;"))
+        self.assertEqual(rows, {'203.0.113.5': 'DEFENDED', '203.0.113.200': 'DEFENDED', '198.51.100.7': 'ACTIVE'})
+
+    def test_unsafe_ranges_are_rejected(self):
+        for network in ['0.0.0.0/0', '::/0', '127.0.0.1', '::1', '96.0.0.0/4']:
+            response = self.post('/block_ip', {'ip': network})
+            self.assertEqual(response.status_code, 400, network)
+        self.assertEqual(len(app.blocklist), 0)
+        self.assertEqual(self.client.get('/server_info').status_code, 200)
+
+    def test_refused_entries_do_not_sink_their_batch(self):
+        response = self.post('/block_ip', {'ips': ['198.51.100.7', '127.0.0.1', '999.1.1.1']})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['blocked_ips'], ['198.51.100.7'])
+        self.assertEqual(set(response.json['rejected']), {'127.0.0.1', '999.1.1.1'})
+        self.assertIn('198.51.100.7', app.blocklist)
+
+        response = self.post('/block_ip', {'ips': ['127.0.0.1', '999.1.1.1']})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json['rejected']), {'127.0.0.1', '999.1.1.1'})
+        self.assertEqual(len(app.blocklist), 1)
+
+    def test_ips_must_be_a_list(self):
+        for path in ('/block_ip', '/unblock_ip'):
+            response = self.post(path, {'ips': '198.51.100.7'})
+            self.assertEqual(response.status_code, 400, path)
+            self.assertEqual(response.json['error'], 'ips must be a list')
+        self.assertEqual(len(app.blocklist), 0)
+
+    def test_unblock_needs_an_ip(self):
+        self.assertEqual(self.post('/unblock_ip', {}).status_code, 400)
+        self.assertEqual(self.post('/unblock_ip', {'ip': 'nonsense'}).status_code, 400)
+
+
+class TestRequestFilter(AppTestCase):
+    def get(self, ip):
+        return self.client.get('/server_info', environ_base={'REMOTE_ADDR': ip}).status_code
+
+    def test_loopback_is_never_limited(self):
+        app.rate_limiter = RateLimiter(rate=1, burst=5)
+        for ip in ('127.0.0.1', '::1'):
+            self.assertEqual({self.get(ip) for _ in range(50)}, {200}, ip)
+
+    def test_other_sources_are_limited(self):
+        app.rate_limiter = RateLimiter(rate=1, burst=5)
+        statuses = [self.get('198.51.100.7') for _ in range(10)]
+        self.assertEqual(statuses.count(200), 5)
+        self.assertEqual(statuses.count(429), 5)
+
+    def test_allowlisted_sources_bypass_blocks_and_limits(self):
+        allowlist = Blocklist()
+        allowlist.update(app.FILTER_ALLOWLIST + ('192.168.0.0/16',))
+        saved, app.filter_allowlist = app.filter_allowlist, allowlist
+        self.addCleanup(setattr, app, 'filter_allowlist', saved)
+        app.rate_limiter = RateLimiter(rate=1, burst=1)
+        app.blocklist.add('192.168.1.0/24')
+        self.assertEqual({self.get('192.168.1.20') for _ in range(10)}, {200})
+        self.assertEqual(self.get('192.169.1.20'), 200)
+        self.assertEqual(self.get('192.169.1.20'), 429)
+
+
+class TestRecordMetrics(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        app.metrics_store = MetricsStore(os.path.join(self.dir, 'metrics.db'))
+
+    def test_agent_samples_are_stored(self):
+        response = self.post('/record_metrics', {'samples': [['agent.cpu_usage', 1000.0, 12.5],
+                                                             ['agent.cpu_usage', 1001.0, 13.5]]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['recorded'], 2)
+        history = self.client.get('/metrics_history?series=agent.cpu_usage&start=900&end=1100&resolution=raw').json
+        self.assertEqual([point[1] for point in history['points']], [12.5, 13.5])
+
+    def test_bad_samples_are_rejected(self):
+        for samples in (None, [['agent.x', 'soon', 1]], [['agent.x', 1]], [['system.cpu_percent', 1, 1]]):
+            response = self.post('/record_metrics', {'samples': samples})
+            self.assertEqual(response.status_code, 400, samples)
+        self.assertEqual(app.metrics_store.series(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import asyncio
+import os
+import socket
+import unittest
+
+from test_app import AppTestCase  # sets the temp BLOCKLIST_DB/STATE_DB/METRICS_DB first
+
+import app
+import asgi_app
+from metrics_store import MetricsStore
+from ratelimit import RateLimiter
+
+
+class AsgiTestCase(AppTestCase):
+    # app.py's globals are shared with asgi_app; AppTestCase swaps them per test
+    def setUp(self):
+        super().setUp()
+        self.client = asgi_app.app.test_client()
+
+    def request(self, method, path, body=None, ip='127.0.0.1'):
+        async def send():
+            kwargs = {} if body is None else {'json': body}
+            response = await self.client.open(path, method=method, scope_base={'client': (ip, 0)}, **kwargs)
+            return response.status_code, await response.get_json(), response.headers
+
+        return asyncio.run(send())
+
+    def get(self, path, ip='127.0.0.1'):
+        return self.request('GET', path, ip=ip)
+
+    def post(self, path, body, ip='127.0.0.1'):
+        return self.request('POST', path, body, ip)
+
+
+class TestBlockEndpoints(AsgiTestCase):
+    def test_block_and_unblock(self):
+        status, payload, _ = self.post('/block_ip', {'ips': ['203.0.113.0/24', '198.51.100.7']})
+        self.assertEqual(status, 200)
+        self.assertEqual(payload['blocked_ips'], ['203.0.113.0/24', '198.51.100.7'])
+        self.assertEqual(self.get('/server_info', ip='203.0.113.9')[:2], (403, {'error': 'Source IP is blocked'}))
+
+        status, payload, _ = self.post('/unblock_ip', {'ips': ['203.0.113.0/24', '192.0.2.1']})
+        self.assertEqual(status, 200)
+        self.assertEqual(payload['unblocked'], ['203.0.113.0/24'])
+        self.assertEqual(payload['not_listed'], ['192.0.2.1'])
+        self.assertEqual(self.get('/server_info', ip='203.0.113.9')[0], 200)
+        self.assertEqual(self.get('/blocked_ips')[1]['total'], 1)
+
+    def test_refused_entries_do_not_sink_their_batch(self):
+        status, payload, _ = self.post('/block_ip', {'ips': ['198.51.100.7', '127.0.0.1']})
+        self.assertEqual(status, 200)
+        self.assertEqual(payload['blocked_ips'], ['198.51.100.7'])
+        self.assertEqual(list(payload['rejected']), ['127.0.0.1'])
+
+        status, payload, _ = self.post('/block_ip', {'ips': ['127.0.0.1']})
+        self.assertEqual(status, 400)
+        self.assertEqual(list(payload['rejected']), ['127.0.0.1'])
+        self.assertEqual(len(app.blocklist), 1)
+
+    def test_ips_must_be_a_list(self):
+        for path in ('/block_ip', '/unblock_ip'):
+            status, payload, _ = self.post(path, {'ips': '198.51.100.7'})
+            self.assertEqual((status, payload), (400, {'error': 'ips must be a list'}), path)
+        self.assertEqual(len(app.blocklist), 0)
+
+
+class TestRequestFilter(AsgiTestCase):
+    def test_other_sources_are_limited(self):
+        app.rate_limiter = RateLimiter(rate=1, burst=5)
+        responses = [self.get('/server_info', ip='198.51.100.7') for _ in range(10)]
+        self.assertEqual([status for status, _, _ in responses].count(429), 5)
+        self.assertIn('Retry-After', responses[-1][2])
+
+    def test_responses_carry_cors_headers(self):
+        for status, _, headers in (self.get('/server_info'), self.request('OPTIONS', '/block_ip')):
+            self.assertEqual(status, 200)
+            self.assertEqual(headers['Access-Control-Allow-Origin'], '*')
+            self.assertIn('POST', headers['Access-Control-Allow-Methods'])
+
+
+class TestStateEndpoints(AsgiTestCase):
+    def test_toggle_defense_is_shared_with_the_wsgi_app(self):
+        status, payload, _ = self.post('/toggle_defense', {'enabled': False})
+        self.assertEqual((status, payload), (200, {'status': 'updated', 'auto_defend': False}))
+        self.assertFalse(app.get_state().get('auto_defend'))
+
+    def test_server_info_reads_shared_state(self):
+        app.get_state().set('servers', [{'name': 'web-1'}])
+        self.assertEqual(self.get('/server_info')[:2], (200, {'servers': [{'name': 'web-1'}]}))
+
+    def test_connect_sqlite_then_db_status(self):
+        database = os.path.join(self.dir, 'incidents.db')
+        status, payload, _ = self.post('/connect_db', {'type': 'sqlite', 'database': database})
+        self.assertEqual(status, 200)
+        self.assertEqual(payload['database'], database)
+        status, payload, _ = self.get('/db_status')
+        self.assertTrue(payload['connected'])
+        self.assertEqual(payload['db']['database'], database)
+
+    def test_unreachable_database_is_a_400(self):
+        # A port that was just free refuses the async probe straight away
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        status, payload, _ = self.post('/connect_db', {'type': 'mysql', 'host': '127.0.0.1', 'port': port})
+        self.assertEqual(status, 400)
+        self.assertIn(f'port {port}', payload['error'])
+        self.assertEqual(self.post('/connect_db', {'type': 'mysql', 'port': 'x'})[:2],
+                         (400, {'error': 'Invalid port number'}))
+
+
+class TestRecordMetrics(AsgiTestCase):
+    def setUp(self):
+        super().setUp()
+        app.metrics_store = MetricsStore(os.path.join(self.dir, 'metrics.db'))
+
+    def test_agent_samples_are_stored(self):
+        status, payload, _ = self.post('/record_metrics', {'samples': [['agent.cpu_usage', 1000.0, 12.5],
+                                                                       ['agent.cpu_usage', 1001.0, 13.5]]})
+        self.assertEqual((status, payload['recorded']), (200, 2))
+        _, history, _ = self.get('/metrics_history?series=agent.cpu_usage&start=900&end=1100&resolution=raw')
+        self.assertEqual([point[1] for point in history['points']], [12.5, 13.5])
+
+    def test_bad_samples_are_rejected(self):
+        self.assertEqual(self.post('/record_metrics', {'samples': [['agent.x', 1]]})[0], 400)
+        self.assertEqual(app.metrics_store.series(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
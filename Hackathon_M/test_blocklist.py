@@ -0,0 +1,119 @@
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from blocklist import LOOPBACK_NETWORKS, Blocklist, overlaps, parse_network
+
+MIN_PREFIX = {4: 8, 6: 32}
+
+
+class TestBlocklist(unittest.TestCase):
+    def test_longest_prefix_match(self):
+        blocks = Blocklist()
+        blocks.update(['10.0.0.0/8', '10.1.2.3', '2001:db8::/32'], reason='test')
+        self.assertEqual(blocks.lookup('10.1.2.3').network, '10.1.2.3')
+        self.assertEqual(blocks.lookup('10.9.9.9').network, '10.0.0.0/8')
+        self.assertEqual(blocks.lookup('2001:db8::1').network, '2001:db8::/32')
+        self.assertIsNone(blocks.lookup('11.0.0.1'))
+        self.assertIsNone(blocks.lookup('not an ip'))
+
+    def test_remove_and_changes(self):
+        blocks = Blocklist()
+        blocks.add('10.0.0.5')
+        page = blocks.changes(0)
+        self.assertEqual([entry.network for entry in page['blocked']], ['10.0.0.5'])
+        self.assertTrue(blocks.remove('10.0.0.5/32'))
+        self.assertFalse(blocks.remove('10.0.0.5'))
+        self.assertNotIn('10.0.0.5', blocks)
+        self.assertEqual(blocks.changes(page['seq'])['removed'], ['10.0.0.5'])
+
+    def test_ttl_expires(self):
+        blocks = Blocklist()
+        blocks.add('10.0.0.5', ttl=60)
+        entry = blocks.lookup('10.0.0.5')
+        self.assertIsNone(blocks.lookup('10.0.0.5', now=entry.expires_at + 1))
+
+
+class TestBlocklistPolicy(unittest.TestCase):
+    def setUp(self):
+        self.blocks = Blocklist(min_prefix=MIN_PREFIX, protected=LOOPBACK_NETWORKS)
+
+    def test_overlaps(self):
+        self.assertTrue(overlaps(parse_network('0.0.0.0/0'), parse_network('127.0.0.0/8')))
+        self.assertTrue(overlaps(parse_network('127.0.0.1'), parse_network('127.0.0.0/8')))
+        self.assertFalse(overlaps(parse_network('10.0.0.0/8'), parse_network('127.0.0.0/8')))
+        self.assertFalse(overlaps(parse_network('::1'), parse_network('127.0.0.1')))
+
+    def test_short_prefixes_are_refused(self):
+        for network in ['0.0.0.0/0', '64.0.0.0/2', '::/0', '2000::/3']:
+            with self.assertRaises(ValueError, msg=network):
+                self.blocks.add(network)
+        self.blocks.add('10.0.0.0/8')
+        self.blocks.add('2001:db8::/32')
+
+    def test_loopback_is_refused(self):
+        for network in ['127.0.0.1', '127.0.0.0/8', '::1', '::ffff:127.0.0.1']:
+            with self.assertRaises(ValueError, msg=network):
+                self.blocks.add(network)
+
+    def test_a_refused_network_blocks_nothing_in_its_batch(self):
+        with self.assertRaises(ValueError):
+            self.blocks.update(['10.0.0.5', '127.0.0.1'])
+        self.assertEqual(len(self.blocks), 0)
+
+
+    def test_screen_splits_off_refused_networks(self):
+        accepted, rejected = self.blocks.screen(['10.0.0.5', '127.0.0.1', 'nonsense', '0.0.0.0/0'])
+        self.assertEqual(accepted, ['10.0.0.5'])
+        self.assertEqual(set(rejected), {'127.0.0.1', 'nonsense', '0.0.0.0/0'})
+        self.assertEqual(len(self.blocks), 0)
+
+
+class TestSharedBlocklist(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'blocklist.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_workers_see_each_others_changes(self):
+        first, second = Blocklist(self.path), Blocklist(self.path)
+        first.add('10.0.0.0/24')
+        second.sync()
+        self.assertIn('10.0.0.9', second)
+        second.remove('10.0.0.0/24')
+        first.sync()
+        self.assertNotIn('10.0.0.9', first)
+
+    def test_block_survives_an_unblock_landing_in_its_sync(self):
+        first, second = Blocklist(self.path), Blocklist(self.path)
+        sync = first._sync
+
+        def unblock_then_sync(conn):
+            second.remove('10.0.0.5')  # another worker, between our commit and our catch-up
+            sync(conn)
+
+        with patch.object(first, '_sync', unblock_then_sync):
+            entries = first.update(['10.0.0.5', '10.0.0.6'])
+        self.assertEqual([entry.network for entry in entries], ['10.0.0.5', '10.0.0.6'])
+        self.assertEqual([entry.seq for entry in entries], [1, 2])
+        self.assertNotIn('10.0.0.5', first)
+        self.assertIn('10.0.0.6', first)
+
+    def test_unsafe_entries_are_removed_on_open(self):
+        # Written before the policy existed
+        Blocklist(self.path).update(['0.0.0.0/0', '10.0.0.5'])
+        with contextlib.redirect_stdout(io.StringIO()):
+            blocks = Blocklist(self.path, min_prefix=MIN_PREFIX, protected=LOOPBACK_NETWORKS)
+        self.assertNotIn('127.0.0.1', blocks)
+        self.assertIn('10.0.0.5', blocks)
+        self.assertEqual(Blocklist(self.path).changes(0)['blocked'][0].network, '10.0.0.5')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from db import (
+    COUNT_INCIDENTS_SQL, DEFEND_IP_SQL, DEFEND_NETWORK_SQL, INSERT_INCIDENT_SQL, MIGRATIONS,
+    ConnectionPool, IncidentWriter, migrate
+)
+
+
+class DatabaseTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "test.db")
+        self.pool = ConnectionPool(self.path)
+
+    def tearDown(self):
+        self.pool.close()
+        shutil.rmtree(self.dir)
+
+    def tables(self):
+        return {row[0] for row in self.pool.query("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger');")}
+
+
+class TestMigrate(DatabaseTestCase):
+    def test_creates_incident_schema(self):
+        self.assertEqual(migrate(self.pool), len(MIGRATIONS))
+        self.assertTrue({"security_incidents", "incident_summary", "trg_incidents_insert"} <= self.tables())
+        self.pool.execute(INSERT_INCIDENT_SQL, ("2026-01-01", "Port Scan", "10.0.0.1", "", "ACTIVE"))
+        self.assertEqual(self.pool.query(COUNT_INCIDENTS_SQL)[0][0], 1)
+
+    def test_foreign_user_version_is_ignored(self):
+        # Another application's database that happens to use user_version for itself
+        self.pool.execute("CREATE TABLE customers (id INTEGER PRIMARY KEY);")
+        self.pool.execute("PRAGMA user_version = 7;")
+        migrate(self.pool)
+        self.assertIn("security_incidents", self.tables())
+        self.assertEqual(self.pool.query(COUNT_INCIDENTS_SQL)[0][0], 0)
+        self.assertEqual(self.pool.query("PRAGMA user_version;")[0][0], 7)
+
+    def test_rerun_is_a_no_op(self):
+        migrate(self.pool)
+        self.pool.execute(INSERT_INCIDENT_SQL, ("2026-01-01", "Port Scan", "10.0.0.1", "", "ACTIVE"))
+        migrate(self.pool)
+        self.assertEqual(self.pool.query(COUNT_INCIDENTS_SQL)[0][0], 1)
+
+    def test_schemas_in_one_file_are_versioned_separately(self):
+        other = ["CREATE TABLE a (x);", "CREATE TABLE b (x);"]
+        migrate(self.pool)
+        self.assertEqual(migrate(self.pool, other, name="other"), 2)
+        self.assertTrue({"a", "b", "security_incidents"} <= self.tables())
+        versions = dict(self.pool.query("SELECT name, version FROM _sentials_schema;"))
+        self.assertEqual(versions, {"incidents": len(MIGRATIONS), "other": 2})
+
+    def test_legacy_user_version_is_adopted_once(self):
+        # A file this app migrated before _sentials_schema existed: step 1 is already applied
+        self.pool.execute("CREATE TABLE a (x);")
+        self.pool.execute("PRAGMA user_version = 1;")
+        migrations = ["CREATE TABLE a (x);", "ALTER TABLE a ADD COLUMN y;"]
+        self.assertEqual(migrate(self.pool, migrations, name="owned", legacy_user_version=True), 2)
+        columns = [row[1] for row in self.pool.query("PRAGMA table_info(a);")]
+        self.assertEqual(columns, ["x", "y"])
+
+
+class TestIncidentWriter(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        migrate(self.pool)
+        self.writer = IncidentWriter(self.pool, max_latency=0.01)
+
+    def tearDown(self):
+        self.writer.close()
+        super().tearDown()
+
+    def incident(self, ip, status="ACTIVE"):
+        return ("2026-01-01 00:00:00", "Port Scan", ip, "", status)
+
+    def test_flush_commits_in_submission_order(self):
+        self.writer.submit(INSERT_INCIDENT_SQL, self.incident("10.0.0.1"))
+        self.writer.submit(DEFEND_IP_SQL, ("10.0.0.1",))
+        self.writer.submit(INSERT_INCIDENT_SQL, self.incident("10.0.0.1"))
+        self.writer.flush()
+        rows = self.pool.query("SELECT status FROM security_incidents ORDER BY id;")
+        self.assertEqual(rows, [("DEFENDED",), ("ACTIVE",)])
+        self.assertEqual(self.writer.stats()["errors"], 0)
+
+    def test_defend_network_matches_the_whole_range(self):
+        for ip in ("10.1.2.3", "10.200.0.1", "11.0.0.1", "2001:db8::5", "not-an-ip"):
+            self.writer.submit(INSERT_INCIDENT_SQL, self.incident(ip))
+        self.writer.submit(DEFEND_NETWORK_SQL, ("10.0.0.0/8",))
+        self.writer.submit(DEFEND_NETWORK_SQL, ("2001:db8::/32",))
+        self.writer.flush()
+        rows = dict(self.pool.query("SELECT ip, status FROM security_incidents;"))
+        self.assertEqual(rows, {"10.1.2.3": "DEFENDED", "10.200.0.1": "DEFENDED", "11.0.0.1": "ACTIVE",
+                                "2001:db8::5": "DEFENDED", "not-an-ip": "ACTIVE"})
+
+    def test_bad_params_lose_only_their_own_write(self):
+        # OverflowError, not sqlite3.Error: this used to kill the writer thread
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.writer.submit(INSERT_INCIDENT_SQL, self.incident("10.0.0.1"))
+            self.writer.submit(INSERT_INCIDENT_SQL, ("2026-01-01", "Port Scan", 2 ** 70, "", "ACTIVE"))
+            self.writer.submit(INSERT_INCIDENT_SQL, self.incident("10.0.0.2"))
+            flushed = threading.Thread(target=self.writer.flush, daemon=True)
+            flushed.start()
+            flushed.join(5)
+        self.assertFalse(flushed.is_alive(), "flush() hung after a failed write")
+        self.assertEqual(self.writer.stats()["errors"], 1)
+        self.assertEqual(self.pool.query(COUNT_INCIDENTS_SQL)[0][0], 2)
+
+        # The writer is still running
+        self.writer.submit(INSERT_INCIDENT_SQL, self.incident("10.0.0.3"))
+        self.writer.flush()
+        self.assertEqual(self.pool.query(COUNT_INCIDENTS_SQL)[0][0], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
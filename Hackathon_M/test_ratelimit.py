@@ -0,0 +1,44 @@
+import unittest
+
+from ratelimit import RateLimiter
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_burst_then_sustained_rate(self):
+        limiter = RateLimiter(rate=10, burst=3)
+        self.assertEqual([limiter.hit('a', now=0.0) for _ in range(3)], [0.0, 0.0, 0.0])
+        self.assertAlmostEqual(limiter.hit('a', now=0.0), 0.1)
+        # One token back every 1/rate seconds
+        self.assertEqual(limiter.hit('a', now=0.1), 0.0)
+        self.assertGreater(limiter.hit('a', now=0.1), 0.0)
+        self.assertEqual(limiter.stats()['allowed'], 4)
+        self.assertEqual(limiter.stats()['limited'], 2)
+
+    def test_keys_are_independent(self):
+        limiter = RateLimiter(rate=1, burst=1)
+        self.assertEqual(limiter.hit('a', now=0.0), 0.0)
+        self.assertGreater(limiter.hit('a', now=0.0), 0.0)
+        self.assertEqual(limiter.hit('b', now=0.0), 0.0)
+
+    def test_idle_buckets_are_evicted_at_capacity(self):
+        limiter = RateLimiter(rate=1, burst=1, max_keys=10)
+        for i in range(10):
+            limiter.hit(f'old{i}', now=0.0)
+        limiter.hit('new', now=100.0)
+        self.assertEqual(len(limiter), 1)
+        self.assertEqual(limiter.stats()['evicted'], 10)
+
+    def test_busy_table_drops_the_oldest_half(self):
+        limiter = RateLimiter(rate=1, burst=1, max_keys=10)
+        for i in range(10):
+            limiter.hit(f'k{i}', now=0.0)
+        limiter.hit('new', now=0.0)
+        self.assertEqual(len(limiter), 6)
+
+    def test_invalid_settings(self):
+        with self.assertRaises(ValueError):
+            RateLimiter(rate=0, burst=10)
+
+
+if __name__ == '__main__':
+    unittest.main()
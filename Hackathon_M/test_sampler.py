@@ -0,0 +1,82 @@
+import contextlib
+import unittest
+from collections import namedtuple
+from unittest.mock import patch
+
+from sampler import ProcessTable
+
+CpuTimes = namedtuple("CpuTimes", "user system")
+MemoryInfo = namedtuple("MemoryInfo", "rss")
+
+
+class FakeProcess:
+    """Stands in for psutil.Process, reading from the test's fake process table."""
+
+    table = {}  # pid -> (create_time, name, cpu seconds)
+
+    def __init__(self, pid):
+        self.pid = pid
+        self._create_time, self._name, _ = self.table[pid]
+
+    def create_time(self):
+        return self._create_time
+
+    def name(self):
+        return self._name
+
+    def oneshot(self):
+        return contextlib.nullcontext()
+
+    def cpu_times(self):
+        return CpuTimes(self.table[self.pid][2], 0.0)
+
+    def memory_info(self):
+        return MemoryInfo(1024 * 1024)
+
+
+class TestProcessTable(unittest.TestCase):
+    def setUp(self):
+        self.clock = 0.0
+        patches = [
+            patch("sampler.psutil.pids", lambda: list(FakeProcess.table)),
+            patch("sampler.psutil.Process", FakeProcess),
+            patch("sampler.time.monotonic", lambda: self.clock),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        self.table = ProcessTable()
+
+    def tick(self, processes, seconds=1.0):
+        FakeProcess.table = processes
+        self.clock += seconds
+        self.table.refresh()
+        return {entry.pid: entry for entry in self.table.top_cpu(len(processes))}
+
+    def test_cpu_percent_is_diffed_per_process(self):
+        self.tick({100: (1.0, "worker", 10.0)})
+        entries = self.tick({100: (1.0, "worker", 10.5)})
+        self.assertAlmostEqual(entries[100].cpu_percent, 50.0)
+        self.assertEqual([e.pid for e in self.table.heavy(10)], [100])
+
+    def test_new_process_reports_zero_until_primed(self):
+        entries = self.tick({100: (1.0, "worker", 10.0)})
+        self.assertEqual(entries[100].cpu_percent, 0.0)
+
+    def test_recycled_pid_does_not_inherit_the_old_baseline(self):
+        self.tick({100: (1.0, "old", 10.0)})
+        # Same pid, new process that has already used more CPU than the old one had
+        entries = self.tick({100: (5.0, "new", 30.0)})
+        self.assertEqual(entries[100].name, "new")
+        self.assertEqual(entries[100].cpu_percent, 0.0)
+        entries = self.tick({100: (5.0, "new", 30.25)})
+        self.assertAlmostEqual(entries[100].cpu_percent, 25.0)
+
+    def test_exited_processes_are_evicted(self):
+        self.tick({100: (1.0, "a", 1.0), 101: (1.0, "b", 1.0)})
+        self.tick({101: (1.0, "b", 1.0)})
+        self.assertEqual(len(self.table), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
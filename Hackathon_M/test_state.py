@@ -0,0 +1,59 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from state import SharedState
+
+
+class TestSharedState(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'state.db')
+        # Two workers, each with its own connection to the same file
+        self.first = SharedState(self.path, {'auto_defend': True})
+        self.second = SharedState(self.path, {'auto_defend': True})
+
+    def tearDown(self):
+        self.first.close()
+        self.second.close()
+        shutil.rmtree(self.dir)
+
+    def test_defaults_until_written(self):
+        self.assertTrue(self.first.get('auto_defend'))
+        self.assertIsNone(self.first.get('connected_db'))
+        self.assertEqual(self.first.snapshot(), {'auto_defend': True})
+
+    def test_other_workers_see_a_change_on_their_next_read(self):
+        self.assertTrue(self.second.get('auto_defend'))
+        self.first.set('auto_defend', False)
+        self.assertFalse(self.second.get('auto_defend'))
+        self.second.set('connected_db', {'type': 'sqlite', 'database': 'x.db'})
+        self.assertEqual(self.first.snapshot(),
+                         {'auto_defend': False, 'connected_db': {'type': 'sqlite', 'database': 'x.db'}})
+
+    def test_cache_is_only_reloaded_after_another_workers_commit(self):
+        self.first.set('servers', ['a'])
+        self.second.get('servers')
+        cached = self.second._values
+        self.second.get('servers')
+        self.assertIs(self.second._values, cached)  # data_version unchanged: no reload
+
+        # Our own commit updates the cache in place rather than forcing a reload
+        self.second.set('servers', ['a', 'b'])
+        self.assertIs(self.second._values, cached)
+        self.assertEqual(self.second.get('servers'), ['a', 'b'])
+
+        self.first.set('servers', ['c'])
+        self.assertEqual(self.second.get('servers'), ['c'])
+        self.assertIsNot(self.second._values, cached)
+
+    def test_set_stores_a_copy(self):
+        servers = ['a']
+        self.first.set('servers', servers)
+        servers.append('b')
+        self.assertEqual(self.first.get('servers'), ['a'])
+
+
+if __name__ == '__main__':
+    unittest.main()
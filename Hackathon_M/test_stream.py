@@ -0,0 +1,98 @@
+import contextlib
+import io
+import threading
+import unittest
+
+from stream import StreamHub, Subscriber, encode
+
+
+class ManualHub(StreamHub):
+    """A hub whose thread never ticks on its own; the test calls tick()."""
+
+    def _run(self):
+        self._stop.wait()
+
+
+class TestStreamHub(unittest.TestCase):
+    def setUp(self):
+        self.state = {'cpu': 10}
+        self.events = []
+        self.hub = ManualHub(60, {'system': lambda: dict(self.state)},
+                             {'incidents': lambda: self.events.pop() if self.events else None})
+        self.addCleanup(self.hub.stop)
+
+    def drain(self, subscriber):
+        chunk = b''.join(subscriber.pending)
+        subscriber.pending.clear()
+        return chunk
+
+    def test_state_is_sent_only_when_it_changes(self):
+        subscriber = self.hub.subscribe(Subscriber())
+        self.drain(subscriber)
+        self.hub.tick()
+        self.assertEqual(self.drain(subscriber), encode('system', {'cpu': 10}))
+        self.hub.tick()
+        self.assertEqual(self.drain(subscriber), b'')
+        self.state['cpu'] = 20
+        self.hub.tick()
+        self.assertEqual(self.drain(subscriber), encode('system', {'cpu': 20}))
+
+    def test_new_subscribers_get_state_replayed_but_not_events(self):
+        self.events.append([{'ip': '192.0.2.1'}])
+        self.hub.tick()
+        subscriber = self.hub.subscribe(Subscriber())
+        self.assertEqual(self.drain(subscriber), self.hub.retry + encode('system', {'cpu': 10}))
+
+    def test_every_subscriber_gets_the_same_tick(self):
+        first = self.hub.subscribe(Subscriber())
+        second = self.hub.subscribe(Subscriber())
+        self.drain(first)
+        self.drain(second)
+        self.events.append([{'ip': '192.0.2.1'}])
+        self.hub.tick()
+        expected = encode('system', {'cpu': 10}) + encode('incidents', [{'ip': '192.0.2.1'}])
+        self.assertEqual(self.drain(first), expected)
+        self.assertEqual(self.drain(second), expected)
+        self.assertEqual(self.hub.stats()['chunks_sent'], 2)
+
+    def test_subscriber_that_falls_behind_is_dropped(self):
+        slow = self.hub.subscribe(Subscriber(max_pending=2))  # the replay is pending
+        for cpu in (20, 30):
+            self.state['cpu'] = cpu
+            self.hub.tick()
+        self.assertTrue(slow.closed)
+        self.assertEqual(len(self.hub), 0)
+        self.assertEqual(self.hub.stats()['dropped'], 1)
+
+    def test_failing_source_is_skipped(self):
+        self.hub.state_sources['db'] = lambda: 1 / 0
+        subscriber = self.hub.subscribe(Subscriber())
+        self.drain(subscriber)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.hub.tick()
+        self.assertEqual(self.drain(subscriber), encode('system', {'cpu': 10}))
+
+
+class TestStreamHubThread(unittest.TestCase):
+    def test_first_subscriber_is_served_without_waiting_an_interval(self):
+        hub = StreamHub(60, {'system': lambda: {'cpu': 10}})
+        self.addCleanup(hub.stop)
+        subscriber = hub.subscribe(Subscriber())
+        received = []
+
+        def read():
+            for batch in subscriber.chunks(heartbeat=0.05):
+                received.append(batch)
+                if encode('system', {'cpu': 10}) in b''.join(received):
+                    return
+
+        reader = threading.Thread(target=read, daemon=True)
+        reader.start()
+        reader.join(5)
+        hub.unsubscribe(subscriber)
+        self.assertFalse(reader.is_alive(), "no state pushed within 5 s of subscribing")
+        self.assertTrue(b''.join(received).startswith(hub.retry))
+
+
+if __name__ == "__main__":
+    unittest.main()
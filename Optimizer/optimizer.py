@@ -1,46 +1,85 @@
 from flask import Flask, render_template, jsonify, request
+import importlib.util
+import json
 import psutil
 import os
+import threading
+import time
+import urllib.request
 
 app = Flask(__name__)
 
+# The command center (Hackathon_M/app.py) samples the system in the background; the
+# optimizer reads that snapshot over HTTP when it can and samples for itself when it
+# can't. An empty COMMAND_CENTER_URL means always sample locally.
+COMMAND_CENTER_URL = os.environ.get('COMMAND_CENTER_URL', 'http://127.0.0.1:5000')
+COMMAND_CENTER_TIMEOUT_S = float(os.environ.get('COMMAND_CENTER_TIMEOUT_S', 2.0))
+# After a failed request, sample locally for this long before asking the command center again
+COMMAND_CENTER_RETRY_S = float(os.environ.get('COMMAND_CENTER_RETRY_S', 30.0))
+# Seconds between background psutil samples when sampling locally
+SYSTEM_SAMPLE_INTERVAL = float(os.environ.get('SYSTEM_SAMPLE_INTERVAL', 1.0))
+# The command center's sampler module, loaded from its file only if this process samples
+SAMPLER_PATH = os.environ.get('SAMPLER_PATH', os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'Hackathon_M', 'sampler.py'))
+
+_command_center_down_until = 0.0
+_local_sampler = None
+_local_sampler_lock = threading.Lock()
+
+def get_local_sampler():
+    """This process's own SystemSampler, started on first use."""
+    global _local_sampler
+    with _local_sampler_lock:
+        if _local_sampler is None:
+            spec = importlib.util.spec_from_file_location('sampler', SAMPLER_PATH)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            _local_sampler = module.get_sampler(SYSTEM_SAMPLE_INTERVAL)
+        return _local_sampler
+
+def fetch_snapshot():
+    """The latest system snapshot: the command center's if it answers, else a local one."""
+    global _command_center_down_until
+    if COMMAND_CENTER_URL and time.monotonic() >= _command_center_down_until:
+        try:
+            with urllib.request.urlopen(f"{COMMAND_CENTER_URL}/system_info", timeout=COMMAND_CENTER_TIMEOUT_S) as response:
+                return dict(json.load(response), source='command_center')
+        except (OSError, ValueError) as e:
+            print(f"Command center unavailable at {COMMAND_CENTER_URL} ({e}); sampling locally")
+            _command_center_down_until = time.monotonic() + COMMAND_CENTER_RETRY_S
+    return dict(get_local_sampler().snapshot(), source='local')
+
+def unavailable(e):
+    return jsonify({'error': f"No system data: {e}"}), 503
+
 @app.route('/')
 def index():
     return render_template('resource_management.html')
 
 @app.route('/system_info')
 def system_info():
-    cpu_percent = psutil.cpu_percent(interval=1)
-    memory_info = psutil.virtual_memory()
-    disk_usage = psutil.disk_usage('/')
-    network_info = psutil.net_io_counters()
-
-    # Identify heavy processes (CPU usage > 10%)
-    processes = []
-    for proc in psutil.process_iter(attrs=['pid', 'name', 'cpu_percent']):
-        proc_info = proc.info
-        if proc_info['cpu_percent'] > 10:
-            processes.append(f"{proc_info['name']} (PID: {proc_info['pid']})")
-
-    system_data = {
-        'cpu_percent': cpu_percent,
-        'memory_percent': memory_info.percent,
-        'disk_percent': disk_usage.percent,
-        'bytes_sent': network_info.bytes_sent,
-        'bytes_recv': network_info.bytes_recv,
-        'heavy_processes': processes
-    }
-
-    return jsonify(system_data)
+    try:
+        return jsonify(fetch_snapshot())
+    except (OSError, ImportError) as e:
+        return unavailable(e)
 
 @app.route('/kill_processes', methods=['POST'])
 def kill_processes():
-    for proc in psutil.process_iter(attrs=['pid', 'cpu_percent']):
-        if proc.info['cpu_percent'] > 10:
-            try:
-                os.kill(proc.info['pid'], 9)  # Force kill the process
-            except Exception as e:
-                return jsonify({'message': f"Error killing process: {e}"}), 500
+    # CPU figures come from a primed process table (the command center's or ours), not a fresh process_iter
+    try:
+        heavy = fetch_snapshot().get('heavy', [])
+    except (OSError, ImportError) as e:
+        return unavailable(e)
+    for info in heavy:
+        try:
+            proc = psutil.Process(info['pid'])
+            if proc.create_time() != info['create_time']:
+                continue  # the pid was reused after the sample
+            proc.kill()
+        except psutil.NoSuchProcess:
+            pass
+        except Exception as e:
+            return jsonify({'message': f"Error killing process: {e}"}), 500
 
     return jsonify({'message': "Heavy processes killed successfully!"})
 
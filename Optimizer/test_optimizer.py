@@ -0,0 +1,111 @@
+import contextlib
+import io
+import json
+import socket
+import subprocess
+import sys
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest.mock import patch
+
+import psutil
+
+import optimizer
+
+
+class SystemInfoHandler(BaseHTTPRequestHandler):
+    """Stands in for the command center's /system_info."""
+
+    def do_GET(self):
+        self.server.requests += 1
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(json.dumps({"cpu_percent": 42.0, "heavy": []}).encode())
+
+    def log_message(self, *args):
+        pass
+
+
+def closed_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class TestSnapshotSource(unittest.TestCase):
+    def setUp(self):
+        self.client = optimizer.app.test_client()
+        patcher = patch("optimizer._command_center_down_until", 0.0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def use_command_center(self, url):
+        patcher = patch("optimizer.COMMAND_CENTER_URL", url)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reads_the_command_center_when_it_answers(self):
+        server = HTTPServer(("127.0.0.1", 0), SystemInfoHandler)
+        server.requests = 0
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.use_command_center(f"http://127.0.0.1:{server.server_port}")
+        data = self.client.get("/system_info").json
+        self.assertEqual(data["source"], "command_center")
+        self.assertEqual(data["cpu_percent"], 42.0)
+        self.assertEqual(server.requests, 1)
+
+    def test_samples_locally_when_the_command_center_is_down(self):
+        self.use_command_center(f"http://127.0.0.1:{closed_port()}")
+        with patch("optimizer.urllib.request.urlopen", wraps=optimizer.urllib.request.urlopen) as urlopen:
+            with contextlib.redirect_stdout(io.StringIO()):
+                first = self.client.get("/system_info")
+            second = self.client.get("/system_info")
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.json["source"], "local")
+        self.assertIn("cpu_percent", first.json)
+        self.assertEqual(second.json["source"], "local")
+        self.assertEqual(urlopen.call_count, 1)  # not asked again until COMMAND_CENTER_RETRY_S passes
+
+    def test_samples_locally_without_a_command_center_url(self):
+        self.use_command_center("")
+        with patch("optimizer.urllib.request.urlopen") as urlopen:
+            data = self.client.get("/system_info").json
+        self.assertEqual(data["source"], "local")
+        self.assertIn("heavy", data)
+        urlopen.assert_not_called()
+
+
+class TestOptimizer(unittest.TestCase):
+    def setUp(self):
+        self.client = optimizer.app.test_client()
+        self.child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+        self.addCleanup(self.child.wait)
+        self.addCleanup(self.child.kill)
+        self.create_time = psutil.Process(self.child.pid).create_time()
+
+    def kill_with(self, snapshot):
+        with patch("optimizer.fetch_snapshot", return_value=snapshot):
+            return self.client.post("/kill_processes")
+
+    def test_kills_heavy_processes_from_the_command_center_snapshot(self):
+        response = self.kill_with({"heavy": [{"pid": self.child.pid, "create_time": self.create_time}]})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(self.child.wait(timeout=5))
+
+    def test_reused_pid_is_left_alone(self):
+        self.kill_with({"heavy": [{"pid": self.child.pid, "create_time": self.create_time - 100}]})
+        self.assertIsNone(self.child.poll())
+
+    def test_no_system_data(self):
+        with patch("optimizer.fetch_snapshot", side_effect=FileNotFoundError("sampler.py")):
+            self.assertEqual(self.client.get("/system_info").status_code, 503)
+            self.assertEqual(self.client.post("/kill_processes").status_code, 503)
+        self.assertIsNone(self.child.poll())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,11 +1,22 @@
 import asyncio
 import json
+import time
 from datetime import datetime
 import random
 
+from event_buffer import EventBuffer, Record
+
+
+class Activity(Record):
+    __slots__ = ("type", "timestamp", "status", "details")
+
+
 class ActivityAgent:
-    def __init__(self):
-        self.activities = []
+    interval = 3  # seconds between polls
+
+    def __init__(self, history=100):
+        # Keep the last `history` activities
+        self.activities = EventBuffer(history)
         self.activity_types = [
             "User login",
             "Database query",
@@ -16,21 +27,22 @@ class ActivityAgent:
 
     async def monitor_activity(self):
         while True:
-            if random.random() < 0.4:  # 40% chance of new activity
-                self.log_activity()
-            await asyncio.sleep(3)
+            self.tick()
+            await asyncio.sleep(self.interval)
+
+    def tick(self):
+        if random.random() < 0.4:  # 40% chance of new activity
+            self.log_activity()
 
     def log_activity(self):
-        activity = {
-            "type": random.choice(self.activity_types),
-            "timestamp": datetime.now().strftime("%H:%M:%S"),
-            "status": "success" if random.random() > 0.1 else "failed",
-            "details": self.generate_details()
-        }
-        
+        activity = Activity(
+            type=random.choice(self.activity_types),
+            timestamp=datetime.now().strftime("%H:%M:%S"),
+            status="success" if random.random() > 0.1 else "failed",
+            details=self.generate_details()
+        )
+
         self.activities.append(activity)
-        if len(self.activities) > 100:  # Keep last 100 activities
-            self.activities.pop(0)
 
     def generate_details(self):
         details = {
@@ -53,4 +65,7 @@ class ActivityAgent:
             return details[activity_type].format(random.randint(1, 100))
 
     def get_activities(self):
-        return self.activities
\ No newline at end of file
+        return [activity.as_dict() for activity in self.activities]
+
+    def recent_activities(self, seconds):
+        return [activity.as_dict() for activity in self.activities.since(time.monotonic() - seconds)]
\ No newline at end of file
@@ -1,10 +1,27 @@
 import asyncio
+import heapq
+import itertools
 import random
+import time
 from datetime import datetime
 
+from event_buffer import EventBuffer, Record
+
+
+class Attack(Record):
+    __slots__ = ("type", "pattern", "start_time", "duration", "success_rate", "target")
+
+
 class AttackSimulator:
-    def __init__(self):
-        self.active_attacks = []
+    interval = 3  # seconds between simulation steps
+
+    def __init__(self, history=1000):
+        # Every launched attack (bounded history)
+        self.attacks = EventBuffer(history)
+        # Still-running attacks in launch order, plus a heap of (ends_at, id) to expire them
+        self._active = {}
+        self._expiry = []
+        self._ids = itertools.count()
         self.attack_patterns = [
             {
                 "type": "DDoS",
@@ -25,44 +42,57 @@ class AttackSimulator:
 
     async def simulate_attacks(self):
         while True:
-            if random.random() < 0.15:  # 15% chance of new attack
-                await self.launch_attack()
-            await self.update_active_attacks()
-            await asyncio.sleep(3)
+            await self.tick()
+            await asyncio.sleep(self.interval)
+
+    async def tick(self):
+        if random.random() < 0.15:  # 15% chance of new attack
+            await self.launch_attack()
+        await self.update_active_attacks()
 
     async def launch_attack(self):
         attack_type = random.choice(self.attack_patterns)
-        attack = {
-            "type": attack_type["type"],
-            "pattern": random.choice(attack_type["patterns"]),
-            "start_time": datetime.now().strftime("%H:%M:%S"),
-            "duration": random.choice(attack_type["duration"]),
-            "success_rate": random.random(),
-            "target": f"service_{random.randint(1, 5)}"
-        }
-        
-        self.active_attacks.append(attack)
+        attack = Attack(
+            type=attack_type["type"],
+            pattern=random.choice(attack_type["patterns"]),
+            start_time=datetime.now().strftime("%H:%M:%S"),
+            duration=random.choice(attack_type["duration"]),
+            success_rate=random.random(),
+            target=f"service_{random.randint(1, 5)}"
+        )
+
+        self.add_attack(attack)
         await self.generate_attack_metrics(attack)
 
+    def add_attack(self, attack):
+        self.attacks.append(attack)
+        attack_id = next(self._ids)
+        self._active[attack_id] = attack
+        heapq.heappush(self._expiry, (attack.ts + attack.duration, attack_id))
+
+    @property
+    def active_attacks(self):
+        return list(self._active.values())
+
     async def generate_attack_metrics(self, attack):
         metrics = {
             "requests_per_second": random.randint(100, 10000),
             "bandwidth_usage": random.randint(10, 1000),  # MB/s
             "connection_count": random.randint(50, 5000),
-            "success_rate": attack["success_rate"]
+            "success_rate": attack.success_rate
         }
         return metrics
 
     async def update_active_attacks(self):
-        current_time = datetime.now()
-        self.active_attacks = [
-            attack for attack in self.active_attacks
-            if (current_time - datetime.strptime(attack["start_time"], "%H:%M:%S")).seconds < attack["duration"]
-        ]
+        # Pop only the attacks whose end time has passed
+        now = time.monotonic()
+        while self._expiry and self._expiry[0][0] <= now:
+            _, attack_id = heapq.heappop(self._expiry)
+            del self._active[attack_id]
 
     def get_status(self):
         return {
-            "active_attacks": len(self.active_attacks),
-            "attack_details": self.active_attacks,
-            "total_bandwidth": sum(random.randint(10, 1000) for _ in self.active_attacks) if self.active_attacks else 0
+            "active_attacks": len(self._active),
+            "attack_details": [attack.as_dict() for attack in self._active.values()],
+            "total_bandwidth": sum(random.randint(10, 1000) for _ in self._active) if self._active else 0
         }
\ No newline at end of file
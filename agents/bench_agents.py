@@ -0,0 +1,100 @@
+"""Per-tick expiry cost with 100k concurrent threats and attacks.
+
+Compares the old list rebuild (strptime on every item, any() severity scans)
+with DefenseAgent's ordered expiry + severity counters and AttackSimulator's
+expiry heap. Usage: python bench_agents.py [--items 100000] [--ticks 10]
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime
+
+from attack_simulator import Attack, AttackSimulator
+from defense_agent import SEVERITIES, Threat, DefenseAgent
+
+
+def legacy_defense_tick(threats):
+    current_time = datetime.now()
+    threats = [
+        threat for threat in threats
+        if (current_time - datetime.strptime(threat["timestamp"], "%H:%M:%S")).seconds < 300
+    ]
+    if len(threats) == 0:
+        status = "active"
+    elif any(threat["severity"] == "critical" for threat in threats):
+        status = "critical"
+    elif any(threat["severity"] == "high" for threat in threats):
+        status = "elevated"
+    else:
+        status = "active"
+    return threats, status
+
+
+def legacy_attack_tick(attacks):
+    current_time = datetime.now()
+    return [
+        attack for attack in attacks
+        if (current_time - datetime.strptime(attack["start_time"], "%H:%M:%S")).seconds < attack["duration"]
+    ]
+
+
+def timed(fn, ticks):
+    start = time.perf_counter()
+    for _ in range(ticks):
+        fn()
+    return (time.perf_counter() - start) / ticks * 1000
+
+
+async def timed_async(fn, ticks):
+    start = time.perf_counter()
+    for _ in range(ticks):
+        await fn()
+    return (time.perf_counter() - start) / ticks * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--ticks", type=int, default=10)
+    args = parser.parse_args()
+
+    stamp = datetime.now().strftime("%H:%M:%S")
+    now = time.monotonic()
+    # Low severities only, so any() has to scan the whole list (the common, worst case)
+    legacy_threats = [{"type": "Port scanning", "severity": random.choice(SEVERITIES[:2]),
+                       "timestamp": stamp, "status": "detected"} for _ in range(args.items)]
+    legacy_attacks = [{"type": "DDoS", "start_time": stamp, "duration": 3600} for _ in range(args.items)]
+
+    defense = DefenseAgent(history=args.items)
+    for i in range(args.items):
+        defense.add_threat(Threat(ts=now - 200 + i * 1e-4, type="Port scanning", severity=random.choice(SEVERITIES[:2]),
+                                  timestamp=stamp, status="detected"))
+    simulator = AttackSimulator(history=args.items)
+    for i in range(args.items):
+        simulator.add_attack(Attack(ts=now, type="DDoS", pattern="UDP flood", start_time=stamp,
+                                    duration=random.randint(600, 3600), success_rate=0.5, target="service_1"))
+
+    state = {"threats": legacy_threats, "attacks": legacy_attacks}
+
+    def legacy_defense():
+        state["threats"], _ = legacy_defense_tick(state["threats"])
+
+    def legacy_attack():
+        state["attacks"] = legacy_attack_tick(state["attacks"])
+
+    rows = [
+        ("DefenseAgent tick (legacy)", timed(legacy_defense, args.ticks)),
+        ("DefenseAgent tick", asyncio.run(timed_async(defense.update_defenses, args.ticks))),
+        ("AttackSimulator tick (legacy)", timed(legacy_attack, args.ticks)),
+        ("AttackSimulator tick", asyncio.run(timed_async(simulator.update_active_attacks, args.ticks))),
+    ]
+    print(f"{args.items:,} concurrent threats / attacks, {args.ticks} ticks")
+    for label, ms in rows:
+        print(f"  {label:<30} {ms:10.3f} ms/tick")
+    assert len(defense.active_threats) == args.items and defense.defense_status == "active"
+    assert len(simulator.active_attacks) == args.items
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Dozens of agent instances on one AgentScheduler vs one sleep loop per agent.
+
+Usage: python bench_scheduler.py [--instances 50] [--seconds 10] [--speedup 20]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from activity_agent import ActivityAgent
+from attack_simulator import AttackSimulator
+from defense_agent import DefenseAgent
+from resource_agent import ResourceAgent
+from scheduler import AgentScheduler
+from security_agent import SecurityAgent
+
+AGENTS = [SecurityAgent, ResourceAgent, DefenseAgent, ActivityAgent, AttackSimulator]
+
+
+def make_agents(instances):
+    return [(f"{cls.__name__}-{i}", cls()) for cls in AGENTS for i in range(instances)]
+
+
+async def run_scheduler(agents, seconds, speedup):
+    scheduler = AgentScheduler()
+    for name, agent in agents:
+        scheduler.add(name, agent.tick, agent.interval / speedup)
+    task = asyncio.create_task(scheduler.run())
+    await asyncio.sleep(seconds)
+    task.cancel()
+    return scheduler
+
+
+async def run_loops(agents, seconds, speedup):
+    # The old shape: an independent while/sleep loop per agent, jitter measured by hand
+    jitters = []
+
+    async def loop(agent):
+        interval = agent.interval / speedup
+        due = time.monotonic()
+        while True:
+            jitters.append(max(0.0, time.monotonic() - due))
+            result = agent.tick()
+            if asyncio.iscoroutine(result):
+                await result
+            due += interval
+            await asyncio.sleep(max(0.0, due - time.monotonic()))
+
+    tasks = [asyncio.create_task(loop(agent)) for _, agent in agents]
+    await asyncio.sleep(seconds)
+    for task in tasks:
+        task.cancel()
+    return jitters
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--instances", type=int, default=50, help="instances of each of the 5 agent types")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--speedup", type=float, default=20, help="divide every agent's interval by this")
+    args = parser.parse_args()
+
+    cpu = time.process_time()
+    jitters = asyncio.run(run_loops(make_agents(args.instances), args.seconds, args.speedup))
+    loops_cpu = time.process_time() - cpu
+
+    cpu = time.process_time()
+    scheduler = asyncio.run(run_scheduler(make_agents(args.instances), args.seconds, args.speedup))
+    scheduler_cpu = time.process_time() - cpu
+
+    stats = scheduler.stats().values()
+    ticks = sum(s["ticks"] for s in stats)
+    print(f"{len(AGENTS) * args.instances} agents for {args.seconds:.0f}s, intervals / {args.speedup:g}")
+    print(f"{'sleep loops':<12} ticks={len(jitters):<7} CPU {loops_cpu:.2f}s  "
+          f"jitter avg {statistics.mean(jitters) * 1000:.2f} ms  max {max(jitters) * 1000:.2f} ms")
+    print(f"{'scheduler':<12} ticks={ticks:<7} CPU {scheduler_cpu:.2f}s  "
+          f"jitter avg {statistics.mean(s['avg_jitter_ms'] for s in stats):.2f} ms  "
+          f"max {max(s['max_jitter_ms'] for s in stats):.2f} ms  wake-ups {scheduler.wakeups}")
+    slowest = sorted(scheduler.stats().items(), key=lambda item: -item[1]["avg_duration_ms"])[:3]
+    for name, s in slowest:
+        print(f"  slowest: {name:<20} avg {s['avg_duration_ms']:.3f} ms  max {s['max_duration_ms']:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
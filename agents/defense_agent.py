@@ -1,18 +1,41 @@
 import asyncio
 import random
+import time
+from collections import deque
 from datetime import datetime
 
+from event_buffer import EventBuffer, Record
+
+THREAT_WINDOW = 300  # seconds a detected threat stays active
+SEVERITIES = ("low", "medium", "high", "critical")
+
+
+class Threat(Record):
+    __slots__ = ("type", "severity", "timestamp", "status")
+
+
 class DefenseAgent:
-    def __init__(self):
-        self.threats = []
+    interval = 2  # seconds between scans
+
+    def __init__(self, history=1000):
+        # Every detected threat, active or expired (bounded history)
+        self.threats = EventBuffer(history)
+        # Threats from the last THREAT_WINDOW seconds, never evicted early. Every threat
+        # has the same lifetime, so arrival order is expiry order: the left end expires next
+        self.active_threats = deque()
+        # Active threats per severity, kept in step with self.active_threats
+        self.severity_counts = dict.fromkeys(SEVERITIES, 0)
         self.active_defenses = set()
         self.defense_status = "active"
 
     async def monitor_threats(self):
         while True:
-            await self.scan_for_threats()
-            await self.update_defenses()
-            await asyncio.sleep(2)
+            await self.tick()
+            await asyncio.sleep(self.interval)
+
+    async def tick(self):
+        await self.scan_for_threats()
+        await self.update_defenses()
 
     async def scan_for_threats(self):
         threat_types = [
@@ -24,15 +47,20 @@ class DefenseAgent:
         ]
 
         if random.random() < 0.2:  # 20% chance of detecting a threat
-            threat = {
-                "type": random.choice(threat_types),
-                "severity": random.choice(["low", "medium", "high", "critical"]),
-                "timestamp": datetime.now().strftime("%H:%M:%S"),
-                "status": "detected"
-            }
-            self.threats.append(threat)
+            threat = Threat(
+                type=random.choice(threat_types),
+                severity=random.choice(SEVERITIES),
+                timestamp=datetime.now().strftime("%H:%M:%S"),
+                status="detected"
+            )
+            self.add_threat(threat)
             await self.deploy_countermeasure(threat)
 
+    def add_threat(self, threat):
+        self.threats.append(threat)
+        self.active_threats.append(threat)
+        self.severity_counts[threat.severity] += 1
+
     async def deploy_countermeasure(self, threat):
         countermeasures = {
             "DDoS attempt": "Rate limiting and traffic filtering",
@@ -43,29 +71,28 @@ class DefenseAgent:
         }
 
         defense = {
-            "type": countermeasures[threat["type"]],
+            "type": countermeasures[threat.type],
             "deployed_at": datetime.now().strftime("%H:%M:%S"),
-            "target_threat": threat["type"]
+            "target_threat": threat.type
         }
 
         self.active_defenses.add(defense["type"])
         await self.update_defense_status()
 
     async def update_defenses(self):
-        # Remove old threats and update defense status
-        current_time = datetime.now()
-        self.threats = [
-            threat for threat in self.threats 
-            if (current_time - datetime.strptime(threat["timestamp"], "%H:%M:%S")).seconds < 300
-        ]
+        # Pop only the threats that have aged out of the window, then update defense status
+        cutoff = time.monotonic() - THREAT_WINDOW
+        active = self.active_threats
+        while active and active[0].ts < cutoff:
+            self.severity_counts[active.popleft().severity] -= 1
         await self.update_defense_status()
 
     async def update_defense_status(self):
-        if len(self.threats) == 0:
+        if not self.active_threats:
             self.defense_status = "active"
-        elif any(threat["severity"] == "critical" for threat in self.threats):
+        elif self.severity_counts["critical"]:
             self.defense_status = "critical"
-        elif any(threat["severity"] == "high" for threat in self.threats):
+        elif self.severity_counts["high"]:
             self.defense_status = "elevated"
         else:
             self.defense_status = "active"
@@ -73,7 +100,8 @@ class DefenseAgent:
     def get_status(self):
         return {
             "status": self.defense_status,
-            "active_threats": len(self.threats),
+            "active_threats": len(self.active_threats),
             "active_defenses": len(self.active_defenses),
-            "recent_threats": self.threats[-5:] if self.threats else []
+            # The newest 5 still in the window, oldest first like the baseline's threats[-5:]
+            "recent_threats": [threat.as_dict() for threat in list(self.active_threats)[-5:]]
         }
\ No newline at end of file
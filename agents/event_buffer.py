@@ -0,0 +1,115 @@
+import time
+
+
+class Record:
+    """Base for compact agent events: subclasses list their fields in ``__slots__``.
+
+    ``ts`` is a ``time.monotonic()`` stamp used for window queries; the other
+    slots are what ``as_dict()`` exposes to the dashboard.
+    """
+
+    __slots__ = ("ts",)
+
+    def __init__(self, ts=None, **fields):
+        self.ts = time.monotonic() if ts is None else ts
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.as_dict()})"
+
+
+class EventBuffer:
+    """Fixed-capacity, time-ordered ring of records.
+
+    ``append`` is O(1) and overwrites the oldest record once full. Records are
+    appended in ``ts`` order, so window queries (``since``, ``count_since``,
+    ``expire_before``) binary-search the ring in O(log n) instead of scanning
+    it.
+    """
+
+    __slots__ = ("_items", "_head", "_size", "evicted")
+
+    def __init__(self, capacity):
+        if capacity <= 0:
+            raise ValueError(f"EventBuffer capacity must be positive, got {capacity}")
+        self._items = [None] * capacity
+        self._head = 0  # physical index of the oldest record
+        self._size = 0
+        self.evicted = 0
+
+    @property
+    def capacity(self):
+        return len(self._items)
+
+    def __len__(self):
+        return self._size
+
+    def __bool__(self):
+        return self._size > 0
+
+    def _at(self, i):
+        return self._items[(self._head + i) % len(self._items)]
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self._size
+        if not 0 <= i < self._size:
+            raise IndexError("EventBuffer index out of range")
+        return self._at(i)
+
+    def __iter__(self):
+        for i in range(self._size):
+            yield self._at(i)
+
+    def append(self, record):
+        """Add ``record``; returns the record it overwrote when full, else None."""
+        capacity = len(self._items)
+        if self._size == capacity:
+            evicted = self._items[self._head]
+            self._items[self._head] = record
+            self._head = (self._head + 1) % capacity
+            self.evicted += 1
+            return evicted
+        self._items[(self._head + self._size) % capacity] = record
+        self._size += 1
+        return None
+
+    def latest(self, n):
+        """The newest ``n`` records, oldest first (like ``list[-n:]``)."""
+        n = min(n, self._size)
+        return [self._at(i) for i in range(self._size - n, self._size)]
+
+    def _first_at_or_after(self, ts):
+        lo, hi = 0, self._size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._at(mid).ts < ts:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def since(self, ts):
+        """Records with ``ts`` at or after the given monotonic time, oldest first."""
+        return [self._at(i) for i in range(self._first_at_or_after(ts), self._size)]
+
+    def count_since(self, ts):
+        return self._size - self._first_at_or_after(ts)
+
+    def expire_before(self, ts):
+        """Drop records older than ``ts``; returns them, oldest first."""
+        n = self._first_at_or_after(ts)
+        expired = [self._at(i) for i in range(n)]
+        for i in range(n):
+            self._items[(self._head + i) % len(self._items)] = None
+        self._head = (self._head + n) % len(self._items)
+        self._size -= n
+        return expired
+
+    def clear(self):
+        self._items = [None] * len(self._items)
+        self._head = self._size = 0
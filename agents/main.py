@@ -1,48 +1,86 @@
+import argparse
 import asyncio
 import websockets
-import json
 from security_agent import SecurityAgent
 from resource_agent import ResourceAgent
+from metrics_client import MetricsClient
+from publisher import ENCODINGS, SnapshotPublisher
+from scheduler import AgentScheduler
 
 security_agent = SecurityAgent()
 resource_agent = ResourceAgent()
 
-async def send_updates(websocket):
-    try:
-        while True:
-            security_status = security_agent.get_status()
-            resource_metrics = resource_agent.get_metrics()
-
-            data = {
-                "metrics": {
-                    **resource_metrics,
-                    "activeAlerts": len(security_status["alerts"])
-                },
-                "alerts": security_status["alerts"],
-                "health": {
-                    "status": "Good" if security_status["score"] >= 80 else "Warning",
-                    "score": security_status["score"]
-                }
-            }
-
-            await websocket.send(json.dumps(data))
-            await asyncio.sleep(1)
-    except websockets.exceptions.ConnectionClosed:
-        print("Client disconnected.")
-    except Exception as e:
-        print(f"Error in send_updates: {e}")
 
-async def main():
+def build_snapshot():
+    security_status = security_agent.get_status()
+    resource_metrics = resource_agent.get_metrics()
+
+    return {
+        "metrics": {
+            # Two decimals is all the dashboard shows; finer jitter shouldn't produce a delta
+            **{key: round(value, 2) for key, value in resource_metrics.items()},
+            "activeAlerts": len(security_status["alerts"])
+        },
+        # Copy: the agent appends to its list in place, which would hide the change from the diff
+        "alerts": list(security_status["alerts"]),
+        "health": {
+            "status": "Good" if security_status["score"] >= 80 else "Warning",
+            "score": security_status["score"]
+        }
+    }
+
+
+def start_recorder(url):
+    """Send ResourceAgent ticks to the dashboard's metrics history (its /record_metrics endpoint)."""
+    resource_agent.recorder = MetricsClient(url)
+    return resource_agent.recorder
+
+
+async def main(encoding="json", intervals=None, report_interval=60.0, metrics_url=None):
+    intervals = intervals or {}
     try:
-        # Start agent monitoring tasks
-        asyncio.create_task(security_agent.monitor_security())
-        asyncio.create_task(resource_agent.monitor_resources())
+        if metrics_url:
+            start_recorder(metrics_url)
+
+        # One snapshot per tick shared by every client: full frame on connect, deltas after
+        publisher = SnapshotPublisher(build_snapshot, interval=intervals.get("publisher", 1.0),
+                                      encoding=encoding, report_interval=report_interval)
+
+        # Every periodic task runs off one supervised scheduler instead of its own sleep loop
+        scheduler = AgentScheduler()
+        scheduler.add("security", security_agent.tick, intervals.get("security", SecurityAgent.interval))
+        scheduler.add("resource", resource_agent.tick, intervals.get("resource", ResourceAgent.interval))
+        scheduler.add("publisher", publisher.tick, publisher.interval)
+        scheduler.add("report", scheduler.report, report_interval, delay=report_interval)
+        if resource_agent.recorder is not None:
+            scheduler.add("metrics", resource_agent.recorder.tick, intervals.get("metrics", 5.0))
+        scheduler_task = asyncio.create_task(scheduler.run())
 
         # Start WebSocket server
-        async with websockets.serve(send_updates, "localhost", 8765):
-            await asyncio.Future()  # Run forever
+        async with websockets.serve(publisher.serve, "localhost", 8765):
+            await scheduler_task  # Run forever
     except Exception as e:
         print(f"Error in main: {e}")
 
+
+def parse_interval(value):
+    name, _, seconds = value.partition("=")
+    try:
+        return name, float(seconds)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected NAME=SECONDS, got {value!r}")
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Security and resource agents WebSocket feed")
+    parser.add_argument("--encoding", choices=ENCODINGS, default="json",
+                        help="frame encoding; msgpack sends binary frames (needs the msgpack package)")
+    parser.add_argument("--interval", type=parse_interval, action="append", default=[], metavar="NAME=SECONDS",
+                        help="tick interval for security, resource, publisher or metrics (repeatable)")
+    parser.add_argument("--report-interval", type=float, default=60.0,
+                        help="seconds between scheduler and bandwidth reports")
+    parser.add_argument("--metrics-url",
+                        help="command center endpoint to record resource metrics history with "
+                             "(e.g. http://localhost:5000/record_metrics)")
+    args = parser.parse_args()
+    asyncio.run(main(args.encoding, dict(args.interval), args.report_interval, args.metrics_url))
@@ -0,0 +1,65 @@
+import asyncio
+import json
+import threading
+import time
+import urllib.request
+
+
+class MetricsClient:
+    """Buffers agent samples and posts them to the command center's /record_metrics.
+
+    The dashboard owns the metrics store (Hackathon_M/metrics_store.py); the
+    agents only need ``record_many``, the same call MetricsRecorder takes, so
+    they never open its SQLite file or import its modules. Schedule ``tick``
+    to ship the buffer; samples from a failed post are kept for the next one
+    while ``max_buffer`` allows.
+    """
+
+    def __init__(self, url, timeout=2.0, max_buffer=100000):
+        self.url = url
+        self.timeout = timeout
+        self.max_buffer = max_buffer
+        self._buffer = []
+        self._lock = threading.Lock()
+        self.rows = 0
+        self.dropped = 0
+
+    def record(self, name, value, ts=None):
+        self.record_many({name: value}, ts)
+
+    def record_many(self, values, ts=None):
+        """Record several series sampled at the same instant; ``None`` values are skipped."""
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            if len(self._buffer) >= self.max_buffer:
+                self.dropped += len(values)
+                return
+            self._buffer.extend([name, ts, float(value)] for name, value in values.items() if value is not None)
+
+    def flush(self):
+        """POST everything buffered; returns how many samples the server stored."""
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if not batch:
+            return 0
+        request = urllib.request.Request(self.url, data=json.dumps({"samples": batch}).encode("utf-8"),
+                                         headers={"Content-Type": "application/json"}, method="POST")
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                recorded = json.load(response)["recorded"]
+        except Exception:
+            with self._lock:
+                # Put the newest samples back in front of anything recorded meanwhile
+                room = max(self.max_buffer - len(self._buffer), 0)
+                kept = batch[max(len(batch) - room, 0):] if room else []
+                self.dropped += len(batch) - len(kept)
+                self._buffer[:0] = kept
+            raise
+        self.rows += recorded
+        return recorded
+
+    async def tick(self):
+        await asyncio.to_thread(self.flush)
+
+    def stats(self):
+        return {"buffered": len(self._buffer), "rows": self.rows, "dropped": self.dropped}
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import time
+
+try:
+    import msgpack
+except ImportError:  # optional: only needed for encoding="msgpack"
+    msgpack = None
+
+import websockets
+
+# Wire protocol (one frame per message, JSON text or msgpack binary):
+#   {"type": "full",  "seq": n, "data": {...}}                    on connect / resync
+#   {"type": "delta", "seq": n, "changes": {...}, "removed": [...]}  after that
+# "changes" is a nested dict of keys whose values changed: merge it into the
+# last state. Lists are replaced whole. "removed" lists key paths to delete.
+# A delta always has seq = previous seq + 1; a client that sees a gap gets a
+# fresh full frame from the server instead of the deltas it missed.
+
+ENCODINGS = ("json", "msgpack")
+_MISSING = object()
+
+
+def diff(old, new):
+    """Return (changes, removed) turning ``old`` into ``new``; both empty if equal."""
+    changes, removed = {}, []
+    for key, value in new.items():
+        previous = old.get(key, _MISSING)
+        if previous == value:
+            continue
+        if isinstance(value, dict) and isinstance(previous, dict):
+            sub_changes, sub_removed = diff(previous, value)
+            if sub_changes:
+                changes[key] = sub_changes
+            removed.extend([key] + path for path in sub_removed)
+        else:
+            changes[key] = value
+    removed.extend([key] for key in old if key not in new)
+    return changes, removed
+
+
+class SnapshotPublisher:
+    """Builds one snapshot per tick and streams it to every client as deltas.
+
+    The agent scheduler calls ``tick`` every ``interval`` seconds, which calls
+    ``build`` only while anyone is connected. Each
+    delta frame is encoded once and the same bytes go to every client. Ticks
+    where nothing changed send nothing at all.
+    """
+
+    def __init__(self, build, interval=1.0, encoding="json", report_interval=60.0):
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unknown encoding {encoding!r}; expected one of {ENCODINGS}")
+        if encoding == "msgpack" and msgpack is None:
+            raise RuntimeError("encoding='msgpack' needs the msgpack package (pip install msgpack)")
+        self.build = build
+        self.interval = interval
+        self.encoding = encoding
+        self.report_interval = report_interval
+        self.seq = 0
+        self.snapshot = None
+        self.delta_frame = None
+        self._full_frame = None  # encoded lazily, once per seq
+        self._tick = asyncio.Event()
+        self.clients = {}  # websocket -> bytes sent
+        self.ticks = 0
+        self.skipped_ticks = 0
+        self.bytes_sent = 0
+        self._last_report = time.monotonic()
+
+    def encode(self, message):
+        if self.encoding == "msgpack":
+            return msgpack.packb(message, use_bin_type=True)
+        return json.dumps(message, separators=(",", ":"))
+
+    def full_frame(self):
+        if self._full_frame is None:
+            self._full_frame = self.encode({"type": "full", "seq": self.seq, "data": self.snapshot})
+        return self._full_frame
+
+    def publish(self, snapshot):
+        """Advance to ``snapshot``; returns False when nothing changed."""
+        self.ticks += 1
+        if self.snapshot is not None:
+            changes, removed = diff(self.snapshot, snapshot)
+            if not changes and not removed:
+                self.skipped_ticks += 1
+                return False
+            message = {"type": "delta", "seq": self.seq + 1, "changes": changes}
+            if removed:
+                message["removed"] = removed
+            self.delta_frame = self.encode(message)
+        self.seq += 1
+        self.snapshot = snapshot
+        self._full_frame = None
+        # Wake every client waiting on the previous tick
+        self._tick.set()
+        self._tick = asyncio.Event()
+        return True
+
+    def tick(self):
+        """Build and publish one snapshot (skipped while nobody is connected)."""
+        if self.clients or self.snapshot is None:
+            self.publish(self.build())
+        now = time.monotonic()
+        if now - self._last_report >= self.report_interval:
+            self.report(now - self._last_report)
+            self._last_report = now
+
+    async def serve(self, websocket):
+        """Connection handler: full frame first, then one frame per changed tick."""
+        self.clients[websocket] = 0
+        try:
+            seq = self.seq
+            await self._send(websocket, self.full_frame())
+            while True:
+                await self._tick.wait()
+                # Missed a tick (slow client)? Resync from the current state instead
+                frame = self.delta_frame if self.seq == seq + 1 else self.full_frame()
+                seq = self.seq
+                await self._send(websocket, frame)
+        except websockets.exceptions.ConnectionClosed:
+            print("Client disconnected.")
+        finally:
+            del self.clients[websocket]
+
+    async def _send(self, websocket, frame):
+        await websocket.send(frame)
+        self.clients[websocket] += len(frame)
+        self.bytes_sent += len(frame)
+
+    def report(self, elapsed):
+        if not self.clients:
+            return
+        per_minute = 60.0 / elapsed
+        average = sum(self.clients.values()) / len(self.clients)
+        print(f"Publisher: {len(self.clients)} clients, {self.ticks} ticks ({self.skipped_ticks} unchanged), "
+              f"{average * per_minute:,.0f} bytes/client/min ({self.encoding})")
+        for websocket in self.clients:
+            self.clients[websocket] = 0
+        self.ticks = self.skipped_ticks = 0
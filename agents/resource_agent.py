@@ -3,7 +3,11 @@ import random
 from datetime import datetime
 
 class ResourceAgent:
-    def __init__(self):
+    interval = 2  # seconds between samples
+
+    def __init__(self, recorder=None):
+        # Optional recorder (metrics_client.MetricsClient) that keeps the history of every tick
+        self.recorder = recorder
         self.metrics = {
             "cpu_usage": 0,
             "memory_usage": 0,
@@ -13,9 +17,14 @@ class ResourceAgent:
 
     async def monitor_resources(self):
         while True:
-            # Simulate resource monitoring
-            self.update_metrics()
-            await asyncio.sleep(2)  # Update every 2 seconds
+            self.tick()
+            await asyncio.sleep(self.interval)
+
+    def tick(self):
+        # Simulate resource monitoring
+        self.update_metrics()
+        if self.recorder is not None:
+            self.recorder.record_many({f"agent.{key}": value for key, value in self.metrics.items()})
 
     def update_metrics(self):
         # Simulate realistic resource usage patterns
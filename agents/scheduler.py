@@ -0,0 +1,209 @@
+import asyncio
+import heapq
+import inspect
+import itertools
+import time
+import traceback
+
+
+class Job:
+    """One periodic agent tick plus its timing counters."""
+
+    __slots__ = ("name", "tick", "interval", "due", "running", "is_async", "failures", "consecutive_failures",
+                 "ticks", "overruns", "skipped", "total_duration", "max_duration",
+                 "total_jitter", "max_jitter", "last_error")
+
+    def __init__(self, name, tick, interval, due):
+        self.name = name
+        self.tick = tick
+        self.interval = interval
+        self.due = due
+        self.running = False
+        self.is_async = inspect.iscoroutinefunction(tick)
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.total_duration = 0.0
+        self.max_duration = 0.0
+        self.total_jitter = 0.0
+        self.max_jitter = 0.0
+        self.last_error = None
+
+    def stats(self):
+        ticks = max(self.ticks, 1)
+        return {
+            "interval_s": self.interval,
+            "ticks": self.ticks,
+            "failures": self.failures,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+            "avg_duration_ms": round(self.total_duration / ticks * 1000, 3),
+            "max_duration_ms": round(self.max_duration * 1000, 3),
+            "avg_jitter_ms": round(self.total_jitter / ticks * 1000, 3),
+            "max_jitter_ms": round(self.max_jitter * 1000, 3),
+            "last_error": self.last_error,
+        }
+
+
+class AgentScheduler:
+    """Runs many agents' periodic ticks from a single timer loop.
+
+    Each job is a callable (plain or async) run every ``interval`` seconds.
+    Jobs due within ``coalesce_window`` of each other run in the same wake-up.
+    A job that is still running when it falls due again is not started twice
+    (counted as an overrun), and a job that falls more than one interval behind
+    skips the missed ticks instead of bursting to catch up. A tick that raises
+    is logged and the job is restarted after an exponential backoff capped at
+    ``max_backoff``.
+    """
+
+    def __init__(self, coalesce_window=0.005, max_backoff=30.0):
+        self.coalesce_window = coalesce_window
+        self.max_backoff = max_backoff
+        self.jobs = {}
+        self._heap = []
+        self._order = itertools.count()
+        self._wakeup = None
+        self._tasks = set()
+        self.wakeups = 0
+
+    def add(self, name, tick, interval, delay=0.0):
+        """Schedule ``tick`` every ``interval`` seconds, first run after ``delay``."""
+        if name in self.jobs:
+            raise ValueError(f"Job {name!r} is already scheduled")
+        if interval <= 0:
+            raise ValueError(f"Job {name!r} needs a positive interval, got {interval}")
+        job = self.jobs[name] = Job(name, tick, interval, time.monotonic() + delay)
+        heapq.heappush(self._heap, (job.due, next(self._order), job))
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    def remove(self, name):
+        # Dropped from the heap lazily when it next comes due
+        self.jobs.pop(name, None)
+
+    async def run(self):
+        self._wakeup = asyncio.Event()
+        while True:
+            if not self._heap:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            delay = self._heap[0][0] - time.monotonic()
+            if delay > 0:
+                try:
+                    # An add() during the sleep may bring the next due time forward
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                    self._wakeup.clear()
+                    continue
+                except asyncio.TimeoutError:
+                    pass
+
+            now = time.monotonic()
+            self.wakeups += 1
+            while self._heap and self._heap[0][0] <= now + self.coalesce_window:
+                due, _, job = heapq.heappop(self._heap)
+                if self.jobs.get(job.name) is not job or due != job.due:
+                    continue  # removed, or superseded by a backoff reschedule
+                if job.running:
+                    job.overruns += 1
+                elif job.is_async:
+                    job.running = True
+                    task = asyncio.create_task(self._run_tick(job, due))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+                elif not self._run_sync_tick(job, due):
+                    # Plain callables run inline: no task to create, and they'd block the loop anyway.
+                    # A failed one already has its backoff deadline; don't pull it back in
+                    continue
+                self._reschedule(job, due, now)
+
+    def _reschedule(self, job, due, now):
+        job.due = due + job.interval
+        if job.due < now:
+            # Fell more than a tick behind: skip the missed ticks, keep the phase
+            missed = int((now - job.due) // job.interval) + 1
+            job.skipped += missed
+            job.due += missed * job.interval
+        heapq.heappush(self._heap, (job.due, next(self._order), job))
+
+    async def _run_tick(self, job, due):
+        start = time.monotonic()
+        try:
+            await job.tick()
+            job.consecutive_failures = 0
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._failed(job, e)
+        finally:
+            job.running = False
+            self._record(job, due, start)
+
+    def _run_sync_tick(self, job, due):
+        """Run a plain tick; False if it raised (and was rescheduled after a backoff)."""
+        start = time.monotonic()
+        try:
+            result = job.tick()
+            if inspect.isawaitable(result):
+                # Callable that returned a coroutine (e.g. functools.partial of an async def)
+                job.is_async = True
+                job.running = True
+                task = asyncio.create_task(self._finish_tick(job, due, start, result))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+                return True
+            job.consecutive_failures = 0
+        except Exception as e:
+            self._failed(job, e)
+            self._record(job, due, start)
+            return False
+        self._record(job, due, start)
+        return True
+
+    async def _finish_tick(self, job, due, start, awaitable):
+        try:
+            await awaitable
+            job.consecutive_failures = 0
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._failed(job, e)
+        finally:
+            job.running = False
+            self._record(job, due, start)
+
+    def _failed(self, job, error):
+        job.failures += 1
+        job.consecutive_failures += 1
+        job.last_error = f"{type(error).__name__}: {error}"
+        backoff = min(job.interval * 2 ** job.consecutive_failures, self.max_backoff)
+        print(f"Agent {job.name} failed ({job.last_error}); restarting in {backoff:.1f}s")
+        traceback.print_exc()
+        # Supersedes the regular next tick already in the heap
+        job.due = time.monotonic() + backoff
+        heapq.heappush(self._heap, (job.due, next(self._order), job))
+        self._wakeup.set()
+
+    @staticmethod
+    def _record(job, due, start):
+        duration = time.monotonic() - start
+        jitter = max(0.0, start - due)
+        job.ticks += 1
+        job.total_duration += duration
+        job.max_duration = max(job.max_duration, duration)
+        job.total_jitter += jitter
+        job.max_jitter = max(job.max_jitter, jitter)
+
+    def stats(self):
+        return {name: job.stats() for name, job in self.jobs.items()}
+
+    def report(self):
+        print(f"Scheduler: {len(self.jobs)} jobs, {self.wakeups} wake-ups")
+        for name, stats in sorted(self.stats().items()):
+            print(f"  {name:<24} ticks={stats['ticks']:<6} avg={stats['avg_duration_ms']:.3f}ms "
+                  f"max={stats['max_duration_ms']:.3f}ms jitter avg={stats['avg_jitter_ms']:.3f}ms "
+                  f"max={stats['max_jitter_ms']:.3f}ms failures={stats['failures']} overruns={stats['overruns']}")
@@ -4,21 +4,34 @@ import json
 import random
 from datetime import datetime
 
+from event_buffer import EventBuffer, Record
+
+RECENT_ALERTS = 5  # alerts shown on the dashboard and counted against the score
+
+
+class Alert(Record):
+    __slots__ = ("message", "source", "status", "timestamp")
+
+
 class SecurityAgent:
-    def __init__(self):
-        self.alerts = []
+    interval = 2  # seconds between checks
+
+    def __init__(self, history=RECENT_ALERTS):
+        self.alerts = EventBuffer(max(history, RECENT_ALERTS))
         self.security_score = 100
 
     async def monitor_security(self):
         while True:
-            # Simulate security monitoring
-            if random.random() < 0.3:  # 30% chance of detecting an issue
-                self.generate_alert()
-            
-            # Update security score based on alerts
-            self.update_security_score()
-            
-            await asyncio.sleep(2)  # Check every 5 seconds
+            self.tick()
+            await asyncio.sleep(self.interval)
+
+    def tick(self):
+        # Simulate security monitoring
+        if random.random() < 0.3:  # 30% chance of detecting an issue
+            self.generate_alert()
+
+        # Update security score based on alerts
+        self.update_security_score()
 
     def generate_alert(self):
         alert_types = [
@@ -29,23 +42,22 @@ class SecurityAgent:
             "Unauthorized access attempt"
         ]
 
-        alert = {
-            "message": random.choice(alert_types),
-            "source": "Security Monitor",
-            "status": "active",
-            "timestamp": datetime.now().strftime("%H:%M:%S")
-        }
-        
+        alert = Alert(
+            message=random.choice(alert_types),
+            source="Security Monitor",
+            status="active",
+            timestamp=datetime.now().strftime("%H:%M:%S")
+        )
+
+        # Bounded history: the oldest alert is overwritten once full
         self.alerts.append(alert)
-        if len(self.alerts) > 5:  # Keep only recent alerts
-            self.alerts.pop(0)
 
     def update_security_score(self):
         # Reduce score based on active alerts
-        self.security_score = max(60, 100 - (len(self.alerts) * 8))
+        self.security_score = max(60, 100 - (min(len(self.alerts), RECENT_ALERTS) * 8))
 
     def get_status(self):
         return {
-            "alerts": self.alerts,
+            "alerts": [alert.as_dict() for alert in self.alerts.latest(RECENT_ALERTS)],
             "score": self.security_score
         }
\ No newline at end of file
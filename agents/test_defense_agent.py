@@ -0,0 +1,51 @@
+import asyncio
+import time
+import unittest
+
+from defense_agent import THREAT_WINDOW, DefenseAgent, Threat
+
+
+def threat(severity, age=0.0):
+    return Threat(ts=time.monotonic() - age, type="Port scanning", severity=severity,
+                  timestamp="00:00:00", status="detected")
+
+
+class TestDefenseAgent(unittest.TestCase):
+    def test_active_threats_outlive_the_history(self):
+        agent = DefenseAgent(history=10)
+        agent.add_threat(threat("critical"))
+        for _ in range(100):
+            agent.add_threat(threat("low"))
+        asyncio.run(agent.update_defenses())
+        status = agent.get_status()
+        # The critical threat fell out of the recent list but is still active
+        self.assertEqual(status["active_threats"], 101)
+        self.assertEqual(len(status["recent_threats"]), 5)
+        self.assertEqual(status["status"], "critical")
+
+    def test_threats_expire_after_the_window(self):
+        agent = DefenseAgent()
+        agent.add_threat(threat("high", age=THREAT_WINDOW + 1))
+        agent.add_threat(threat("medium"))
+        asyncio.run(agent.update_defenses())
+        self.assertEqual(len(agent.active_threats), 1)
+        self.assertEqual(agent.severity_counts["high"], 0)
+        self.assertEqual(agent.defense_status, "active")
+
+        agent.active_threats[0].ts -= THREAT_WINDOW + 1
+        asyncio.run(agent.update_defenses())
+        self.assertEqual(agent.get_status()["active_threats"], 0)
+        self.assertEqual(sum(agent.severity_counts.values()), 0)
+
+    def test_recent_threats_leave_out_expired_ones(self):
+        agent = DefenseAgent()
+        agent.add_threat(threat("high", age=THREAT_WINDOW + 1))
+        for severity in ("low", "medium"):
+            agent.add_threat(threat(severity))
+        asyncio.run(agent.update_defenses())
+        recent = agent.get_status()["recent_threats"]
+        self.assertEqual([t["severity"] for t in recent], ["low", "medium"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+
+from event_buffer import EventBuffer, Record
+
+
+class Event(Record):
+    __slots__ = ("n",)
+
+
+def filled(capacity, count):
+    buffer = EventBuffer(capacity)
+    for n in range(count):
+        buffer.append(Event(ts=float(n), n=n))
+    return buffer
+
+
+def numbers(records):
+    return [record.n for record in records]
+
+
+class TestEventBuffer(unittest.TestCase):
+    def test_append_overwrites_the_oldest_once_full(self):
+        buffer = filled(3, 2)
+        self.assertIsNone(buffer.append(Event(ts=2.0, n=2)))
+        self.assertEqual(buffer.append(Event(ts=3.0, n=3)).n, 0)
+        self.assertEqual(numbers(buffer), [1, 2, 3])
+        self.assertEqual((len(buffer), buffer.evicted), (3, 1))
+
+    def test_indexing_and_latest_across_the_wrap(self):
+        buffer = filled(4, 10)  # head has wrapped around twice
+        self.assertEqual(numbers(buffer), [6, 7, 8, 9])
+        self.assertEqual((buffer[0].n, buffer[-1].n), (6, 9))
+        self.assertEqual(numbers(buffer.latest(2)), [8, 9])
+        self.assertEqual(numbers(buffer.latest(10)), [6, 7, 8, 9])
+        with self.assertRaises(IndexError):
+            buffer[4]
+
+    def test_window_queries_across_the_wrap(self):
+        buffer = filled(5, 8)  # ts 3..7, stored from physical index 3
+        self.assertEqual(numbers(buffer.since(5.0)), [5, 6, 7])
+        self.assertEqual(buffer.count_since(0.0), 5)
+        self.assertEqual(buffer.count_since(7.5), 0)
+
+    def test_expire_before_then_append_keeps_order(self):
+        buffer = filled(4, 6)  # ts 2..5
+        self.assertEqual(numbers(buffer.expire_before(4.0)), [2, 3])
+        self.assertEqual(numbers(buffer), [4, 5])
+        for n in range(6, 9):
+            buffer.append(Event(ts=float(n), n=n))
+        self.assertEqual(numbers(buffer), [5, 6, 7, 8])
+        self.assertEqual(numbers(buffer.since(6.0)), [6, 7, 8])
+
+    def test_clear_and_bad_capacity(self):
+        buffer = filled(3, 5)
+        buffer.clear()
+        self.assertFalse(buffer)
+        buffer.append(Event(ts=0.0, n=0))
+        self.assertEqual(numbers(buffer), [0])
+        with self.assertRaises(ValueError):
+            EventBuffer(0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from metrics_client import MetricsClient
+
+
+class RecordMetricsHandler(BaseHTTPRequestHandler):
+    """Stands in for the command center's /record_metrics."""
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.posts.append(body["samples"])
+        status = 503 if self.server.failing else 200
+        payload = json.dumps({"error": "down"} if self.server.failing else {"recorded": len(body["samples"])})
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(payload.encode())
+
+    def log_message(self, *args):
+        pass
+
+
+class TestMetricsClient(unittest.TestCase):
+    def setUp(self):
+        self.server = HTTPServer(("127.0.0.1", 0), RecordMetricsHandler)
+        self.server.posts = []
+        self.server.failing = False
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/record_metrics"
+
+    def test_flush_posts_the_buffer(self):
+        client = MetricsClient(self.url)
+        client.record_many({"agent.cpu_usage": 12.5, "agent.memory_usage": None}, ts=100.0)
+        client.record("agent.network_usage", 3, ts=101.0)
+        self.assertEqual(client.flush(), 2)
+        self.assertEqual(self.server.posts, [[["agent.cpu_usage", 100.0, 12.5], ["agent.network_usage", 101.0, 3.0]]])
+        self.assertEqual(client.flush(), 0)  # nothing left, no request
+        self.assertEqual(len(self.server.posts), 1)
+
+    def test_failed_post_keeps_samples_for_the_next_tick(self):
+        client = MetricsClient(self.url, max_buffer=3)
+        self.server.failing = True
+        client.record_many({"agent.a": 1, "agent.b": 2}, ts=1.0)
+        with self.assertRaises(Exception):
+            client.flush()
+        client.record_many({"agent.c": 3}, ts=2.0)
+        self.server.failing = False
+        self.assertEqual(client.flush(), 3)
+        self.assertEqual([name for name, _, _ in self.server.posts[-1]], ["agent.a", "agent.b", "agent.c"])
+        self.assertEqual(client.stats()["dropped"], 0)
+
+    def test_buffer_is_bounded_while_the_server_is_down(self):
+        client = MetricsClient("http://127.0.0.1:9/record_metrics", timeout=0.5, max_buffer=2)
+        client.record_many({"agent.a": 1, "agent.b": 2, "agent.c": 3})
+        client.record_many({"agent.d": 4})
+        with self.assertRaises(OSError):
+            client.flush()
+        self.assertEqual(client.stats()["buffered"], 2)
+        self.assertEqual(client.stats()["dropped"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import asyncio
+import contextlib
+import json
+import unittest
+
+import websockets.exceptions  # noqa: F401  (publisher catches ConnectionClosed)
+
+from publisher import SnapshotPublisher, diff, msgpack
+
+
+def merge(state, changes, removed=()):
+    """Apply a delta frame the way the dashboard does."""
+    state = dict(state)
+    for key, value in changes.items():
+        if isinstance(value, dict) and isinstance(state.get(key), dict):
+            state[key] = merge(state[key], value)
+        else:
+            state[key] = value
+    for path in removed:
+        target = state
+        for key in path[:-1]:
+            target[key] = dict(target[key])
+            target = target[key]
+        del target[path[-1]]
+    return state
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.frames = []
+
+    async def send(self, frame):
+        self.frames.append(json.loads(frame))
+
+
+class TestDiff(unittest.TestCase):
+    def test_only_changed_keys_are_sent(self):
+        old = {"cpu": 10, "memory": {"used": 1, "free": 2}, "top": [1, 2], "gone": 1}
+        new = {"cpu": 10, "memory": {"used": 3, "free": 2}, "top": [1, 3], "new": {"a": 1}}
+        changes, removed = diff(old, new)
+        self.assertEqual(changes, {"memory": {"used": 3}, "top": [1, 3], "new": {"a": 1}})
+        self.assertEqual(removed, [["gone"]])
+        self.assertEqual(merge(old, changes, removed), new)
+
+    def test_nested_removal_has_a_full_path(self):
+        old = {"memory": {"used": 1, "swap": 2}}
+        new = {"memory": {"used": 1}}
+        changes, removed = diff(old, new)
+        self.assertEqual((changes, removed), ({}, [["memory", "swap"]]))
+        self.assertEqual(merge(old, changes, removed), new)
+
+    def test_equal_snapshots_have_no_diff(self):
+        self.assertEqual(diff({"a": {"b": [1]}}, {"a": {"b": [1]}}), ({}, []))
+
+
+class TestSnapshotPublisher(unittest.TestCase):
+    def test_publish_builds_deltas_and_skips_unchanged_ticks(self):
+        publisher = SnapshotPublisher(lambda: None)
+        self.assertTrue(publisher.publish({"cpu": 10, "memory": 50}))
+        self.assertIsNone(publisher.delta_frame)
+        self.assertFalse(publisher.publish({"cpu": 10, "memory": 50}))
+        self.assertTrue(publisher.publish({"cpu": 20, "memory": 50}))
+        self.assertEqual(json.loads(publisher.delta_frame), {"type": "delta", "seq": 2, "changes": {"cpu": 20}})
+        self.assertEqual(json.loads(publisher.full_frame()),
+                         {"type": "full", "seq": 2, "data": {"cpu": 20, "memory": 50}})
+        self.assertEqual(publisher.skipped_ticks, 1)
+
+    def test_tick_builds_only_for_connected_clients(self):
+        builds = []
+        publisher = SnapshotPublisher(lambda: builds.append(1) or {"n": len(builds)})
+        publisher.tick()  # the first snapshot is always built
+        publisher.tick()
+        self.assertEqual(len(builds), 1)
+        publisher.clients[object()] = 0
+        publisher.tick()
+        self.assertEqual(len(builds), 2)
+
+    def test_clients_get_a_full_frame_then_deltas(self):
+        async def main():
+            publisher = SnapshotPublisher(lambda: None)
+            publisher.publish({"cpu": 10, "memory": 50})
+            ws = FakeWebSocket()
+            task = asyncio.create_task(publisher.serve(ws))
+            await asyncio.sleep(0)
+            publisher.publish({"cpu": 20, "memory": 50})
+            await asyncio.sleep(0)
+            # Two ticks before the client runs again: it resyncs from a full frame
+            publisher.publish({"cpu": 30, "memory": 50})
+            publisher.publish({"cpu": 30, "memory": 60})
+            await asyncio.sleep(0)
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+            self.assertEqual(publisher.clients, {})
+            return ws.frames
+
+        frames = asyncio.run(main())
+        self.assertEqual([(frame["type"], frame["seq"]) for frame in frames],
+                         [("full", 1), ("delta", 2), ("full", 4)])
+        self.assertEqual(frames[-1]["data"], {"cpu": 30, "memory": 60})
+
+    @unittest.skipIf(msgpack is None, "msgpack is not installed")
+    def test_msgpack_frames_decode_to_the_same_message(self):
+        publisher = SnapshotPublisher(lambda: None, encoding="msgpack")
+        publisher.publish({"cpu": 10})
+        publisher.publish({"cpu": 11})
+        self.assertEqual(msgpack.unpackb(publisher.delta_frame), {"type": "delta", "seq": 2, "changes": {"cpu": 11}})
+
+    def test_unknown_encoding_is_refused(self):
+        with self.assertRaises(ValueError):
+            SnapshotPublisher(lambda: None, encoding="xml")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import asyncio
+import contextlib
+import io
+import unittest
+
+from scheduler import AgentScheduler
+
+
+def run_for(scheduler, seconds):
+    async def main():
+        task = asyncio.create_task(scheduler.run())
+        await asyncio.sleep(seconds)
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+    # Failing ticks print a traceback each; keep the test output readable
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        asyncio.run(main())
+
+
+class TestAgentScheduler(unittest.TestCase):
+    def test_runs_jobs_every_interval(self):
+        scheduler = AgentScheduler()
+        calls = []
+        scheduler.add("ok", lambda: calls.append(1), 0.05)
+        run_for(scheduler, 0.5)
+        self.assertGreaterEqual(len(calls), 8)
+        self.assertLessEqual(len(calls), 12)
+
+    def test_failing_sync_job_backs_off(self):
+        scheduler = AgentScheduler(max_backoff=10)
+
+        def fail():
+            raise RuntimeError("boom")
+
+        scheduler.add("fail", fail, 0.1)
+        run_for(scheduler, 1.0)
+        # Backoffs of 0.2, 0.4, 0.8 s: runs at 0, 0.2 and 0.6, not every 0.1 s
+        job = scheduler.jobs["fail"]
+        self.assertEqual(job.failures, 3)
+        self.assertEqual(job.consecutive_failures, 3)
+        self.assertEqual(job.last_error, "RuntimeError: boom")
+
+    def test_failing_async_job_backs_off(self):
+        scheduler = AgentScheduler(max_backoff=10)
+
+        async def fail():
+            raise RuntimeError("boom")
+
+        scheduler.add("fail", fail, 0.1)
+        run_for(scheduler, 1.0)
+        self.assertEqual(scheduler.jobs["fail"].failures, 3)
+
+    def test_recovered_job_returns_to_its_interval(self):
+        scheduler = AgentScheduler(max_backoff=10)
+        calls = []
+
+        def flaky():
+            calls.append(1)
+            if len(calls) == 1:
+                raise RuntimeError("first tick fails")
+
+        scheduler.add("flaky", flaky, 0.05)
+        run_for(scheduler, 0.6)
+        job = scheduler.jobs["flaky"]
+        self.assertEqual(job.failures, 1)
+        self.assertEqual(job.consecutive_failures, 0)
+        # One 0.1 s backoff, then every 0.05 s again
+        self.assertGreaterEqual(len(calls), 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
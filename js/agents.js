@@ -1,4 +1,6 @@
 // AI Agents interface
+import { subscribe } from './stream.js';
+
 let systemData = {
     metrics: {
         cpuUsage: 0,
@@ -15,20 +17,15 @@ let systemData = {
 };
 
 export function startAgents() {
-    // Fetch system data periodically from the Flask server on port 5000
-    const fetchData = async () => {
-        try {
-            const response = await fetch('http://localhost:5000/system_info');
-            const data = await response.json();
-            updateData(data);
-        } catch (error) {
+    // System data is pushed by the Flask server on port 5000; polled every 3 seconds only while the stream is down
+    subscribe('system', updateData, {
+        url: 'http://localhost:5000/system_info',
+        interval: 3000,
+        onError: (error) => {
             console.warn('Flask backend offline, using simulated fallback data.', error);
             simulateData();
         }
-    };
-
-    fetchData(); // Initial load
-    setInterval(fetchData, 3000); // Poll every 3 seconds
+    });
 }
 
 function updateData(data) {
@@ -1,5 +1,6 @@
 // Dashboard module
 import { getMetrics, getAlerts, getSystemHealth } from './agents.js';
+import { subscribe } from './stream.js';
 
 export function initDashboard() {
     const metricsGrid = document.getElementById('metricsGrid');
@@ -10,16 +11,6 @@ export function initDashboard() {
         updateMetricsCards();
         updateAlerts();
         updateResourceUtilization();
-
-        try {
-            const response = await fetch('http://localhost:5000/db_status');
-            const data = await response.json();
-            if (data.connected) {
-                showDatabaseStats(data.db);
-            }
-        } catch (error) {
-            // Silence console error on server offline
-        }
     }
 
     async function updateMetricsCards() {
@@ -158,7 +149,15 @@ export function initDashboard() {
 
     // Initial dashboard update
     updateDashboard();
-    setInterval(updateDashboard, 2000); // Update metrics dynamically every 2 seconds
+    setInterval(updateDashboard, 2000); // Re-render from the agents' latest data every 2 seconds
+
+    // DB status is pushed by the server when it changes; polled every 2 seconds only while the stream is down
+    // (fetch errors are silenced while the server is offline)
+    subscribe('db', (data) => {
+        if (data.connected) {
+            showDatabaseStats(data.db);
+        }
+    }, { url: 'http://localhost:5000/db_status', interval: 2000 });
 }
 
 export function showDatabaseStats(dbStats) {
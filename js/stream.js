@@ -0,0 +1,46 @@
+// Server push from the Flask backend's /stream, with polling as the fallback
+const STREAM_URL = 'http://localhost:5000/stream';
+
+const subscriptions = [];
+let source = null;
+
+// Call handler(payload) for every `event` pushed on the stream. While the stream is
+// down (backend offline, or no EventSource support), poll fallback.url every
+// fallback.interval ms instead, passing fetch failures to fallback.onError.
+export function subscribe(event, handler, fallback = null) {
+    const subscription = { handler, fallback, timer: null };
+    subscriptions.push(subscription);
+
+    if (!window.EventSource) {
+        startPolling(subscription);
+        return;
+    }
+    if (!source) {
+        source = new EventSource(STREAM_URL);
+        source.addEventListener('open', () => subscriptions.forEach(stopPolling));
+        // The browser keeps reconnecting in the background; poll until it succeeds
+        source.addEventListener('error', () => subscriptions.forEach(startPolling));
+    }
+    source.addEventListener(event, (message) => handler(JSON.parse(message.data)));
+}
+
+function startPolling(subscription) {
+    const { fallback } = subscription;
+    if (!fallback || subscription.timer) return;
+
+    const poll = async () => {
+        try {
+            const response = await fetch(fallback.url);
+            subscription.handler(await response.json());
+        } catch (error) {
+            if (fallback.onError) fallback.onError(error);
+        }
+    };
+    poll();
+    subscription.timer = setInterval(poll, fallback.interval);
+}
+
+function stopPolling(subscription) {
+    clearInterval(subscription.timer);
+    subscription.timer = null;
+}